@@ -0,0 +1,268 @@
+"""baseline
+
+Brings a database created by the pre-Alembic ``create_all`` + ad-hoc ALTER
+TABLE code in ``core/db.py`` (or an empty database) up to the schema it
+produced last. Every step checks what already exists, so it is safe on any
+of those historical shapes.
+
+Revision ID: 3f2b9c1d7a10
+Revises:
+Create Date: 2026-10-18 09:12:41.503112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f2b9c1d7a10'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+# Columns added over time by the old ALTER TABLE migrations
+LEGACY_COLUMNS = {
+    "issues": [
+        sa.Column("is_anonymous", sa.Boolean(), server_default=sa.text("0")),
+        sa.Column("address_line1", sa.String(200)),
+        sa.Column("address_line2", sa.String(200)),
+        sa.Column("street", sa.String(100)),
+        sa.Column("landmark", sa.String(100)),
+        sa.Column("pincode", sa.String(20)),
+        sa.Column("is_verified", sa.Boolean(), server_default=sa.text("1")),
+        sa.Column("severity_score", sa.Float(), server_default=sa.text("0.5")),
+        sa.Column("geohash", sa.String(12)),
+        sa.Column("resolved_at", sa.DateTime()),
+    ],
+    "users": [
+        sa.Column("profile_picture_url", sa.String(500)),
+    ],
+}
+
+INDEXES = [
+    ("ix_users_id", "users", ["id"], False),
+    ("ix_users_phone_number", "users", ["phone_number"], True),
+    ("ix_issues_id", "issues", ["id"], False),
+    ("ix_issues_geohash_lat_lng", "issues", ["geohash", "lat", "lng"], False),
+    ("ix_issues_department_created_at", "issues", ["assigned_department", "created_at", "id"], False),
+    ("ix_issues_department_resolved_at", "issues", ["assigned_department", "resolved_at"], False),
+    ("ix_issues_created_at_id", "issues", ["created_at", "id"], False),
+    ("ix_issues_upvote_count_id", "issues", ["upvote_count", "id"], False),
+    ("ix_issues_department_upvote_count_id", "issues", ["assigned_department", "upvote_count", "id"], False),
+    ("ix_issues_admin_created_at_id", "issues", ["assigned_admin_id", "created_at", "id"], False),
+    ("ix_issues_admin_updated_at_id", "issues", ["assigned_admin_id", "updated_at", "id"], False),
+    ("ix_issues_admin_priority_id", "issues", ["assigned_admin_id", "priority", "id"], False),
+    ("ix_notifications_id", "notifications", ["id"], False),
+    ("ix_messages_id", "messages", ["id"], False),
+    ("ix_upvotes_id", "upvotes", ["id"], False),
+    ("ix_image_fingerprints_id", "image_fingerprints", ["id"], False),
+    ("ix_image_fingerprints_issue_id", "image_fingerprints", ["issue_id"], False),
+    ("ix_image_fingerprints_media_url", "image_fingerprints", ["media_url"], False),
+    ("ix_image_fingerprints_band0_geohash", "image_fingerprints", ["band0", "geohash"], False),
+    ("ix_image_fingerprints_band1_geohash", "image_fingerprints", ["band1", "geohash"], False),
+    ("ix_image_fingerprints_band2_geohash", "image_fingerprints", ["band2", "geohash"], False),
+    ("ix_image_fingerprints_band3_geohash", "image_fingerprints", ["band3", "geohash"], False),
+    ("ix_issue_stats_rollups_id", "issue_stats_rollups", ["id"], False),
+]
+
+
+def _create_tables(existing) -> None:
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("full_name", sa.String(100), nullable=False),
+            sa.Column("phone_number", sa.String(15), nullable=False),
+            sa.Column("phone_number_hash", sa.String(255), nullable=False),
+            sa.Column("password_hash", sa.String(255), nullable=False),
+            sa.Column("role", sa.String(20), nullable=False),
+            sa.Column("department", sa.String(50)),
+            sa.Column("ward", sa.String(50)),
+            sa.Column("trust_score", sa.Float()),
+            sa.Column("is_active", sa.Boolean()),
+            sa.Column("profile_picture_url", sa.String(500)),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("updated_at", sa.DateTime()),
+        )
+    if "issues" not in existing:
+        op.create_table(
+            "issues",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("reporter_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("category", sa.String(50), nullable=False),
+            sa.Column("description", sa.Text(), nullable=False),
+            sa.Column("status", sa.String(20), nullable=False),
+            sa.Column("priority", sa.String(10), nullable=False),
+            sa.Column("severity_score", sa.Float(), nullable=False),
+            sa.Column("lat", sa.Float(), nullable=False),
+            sa.Column("lng", sa.Float(), nullable=False),
+            sa.Column("geohash", sa.String(12)),
+            sa.Column("media_urls", sa.Text()),
+            sa.Column("is_anonymous", sa.Boolean()),
+            sa.Column("is_verified", sa.Boolean()),
+            sa.Column("assigned_department", sa.String(50)),
+            sa.Column("address_line1", sa.String(200)),
+            sa.Column("address_line2", sa.String(200)),
+            sa.Column("street", sa.String(100)),
+            sa.Column("landmark", sa.String(100)),
+            sa.Column("pincode", sa.String(20)),
+            sa.Column("internal_notes", sa.Text()),
+            sa.Column("upvote_count", sa.Integer()),
+            sa.Column("assigned_admin_id", sa.Integer(), sa.ForeignKey("users.id")),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("updated_at", sa.DateTime()),
+            sa.Column("resolved_at", sa.DateTime()),
+        )
+    if "notifications" not in existing:
+        op.create_table(
+            "notifications",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("issue_id", sa.Integer(), sa.ForeignKey("issues.id")),
+            sa.Column("type", sa.String(50), nullable=False),
+            sa.Column("message", sa.Text(), nullable=False),
+            sa.Column("read", sa.Boolean()),
+            sa.Column("created_at", sa.DateTime()),
+        )
+    if "messages" not in existing:
+        op.create_table(
+            "messages",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("issue_id", sa.Integer(), sa.ForeignKey("issues.id"), nullable=False),
+            sa.Column("sender_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("message", sa.Text(), nullable=False),
+            sa.Column("is_admin_message", sa.Boolean()),
+            sa.Column("created_at", sa.DateTime()),
+        )
+    if "upvotes" not in existing:
+        op.create_table(
+            "upvotes",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("issue_id", sa.Integer(), sa.ForeignKey("issues.id"), nullable=False),
+            sa.Column("created_at", sa.DateTime()),
+        )
+    if "image_fingerprints" not in existing:
+        op.create_table(
+            "image_fingerprints",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("issue_id", sa.Integer(), sa.ForeignKey("issues.id"), nullable=False),
+            sa.Column("media_url", sa.String(500), nullable=False),
+            sa.Column("dhash", sa.BigInteger()),
+            sa.Column("band0", sa.Integer()),
+            sa.Column("band1", sa.Integer()),
+            sa.Column("band2", sa.Integer()),
+            sa.Column("band3", sa.Integer()),
+            sa.Column("geohash", sa.String(12)),
+            sa.Column("created_at", sa.DateTime()),
+        )
+    if "issue_stats_rollups" not in existing:
+        op.create_table(
+            "issue_stats_rollups",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("department", sa.String(50), nullable=False),
+            sa.Column("day", sa.Date(), nullable=False),
+            sa.Column("category", sa.String(50), nullable=False),
+            sa.Column("total_count", sa.Integer(), nullable=False),
+            sa.Column("new_count", sa.Integer(), nullable=False),
+            sa.Column("in_progress_count", sa.Integer(), nullable=False),
+            sa.Column("resolved_count", sa.Integer(), nullable=False),
+            sa.Column("resolution_seconds", sa.Float(), nullable=False),
+            sa.UniqueConstraint("department", "day", "category", name="uq_issue_stats_rollups_key"),
+        )
+
+
+def _backfill_geohashes(bind) -> None:
+    """Populate issues.geohash for rows created before the column existed"""
+    from app.core import geohash
+
+    while True:
+        rows = bind.execute(
+            sa.text("SELECT id, lat, lng FROM issues WHERE geohash IS NULL LIMIT :n"), {"n": BATCH_SIZE}
+        ).fetchall()
+        if not rows:
+            break
+        bind.execute(
+            sa.text("UPDATE issues SET geohash = :geohash WHERE id = :id"),
+            [{"geohash": geohash.encode(lat, lng), "id": issue_id} for issue_id, lat, lng in rows],
+        )
+
+
+def _backfill_stats_rollups(bind) -> None:
+    """Build issue_stats_rollups from existing issues if the table is still empty"""
+    if bind.execute(sa.text("SELECT 1 FROM issue_stats_rollups LIMIT 1")).first() is not None:
+        return
+
+    issues = sa.table(
+        "issues",
+        sa.column("assigned_department", sa.String),
+        sa.column("created_at", sa.DateTime),
+        sa.column("category", sa.String),
+        sa.column("status", sa.String),
+        sa.column("resolved_at", sa.DateTime),
+    )
+    status_columns = {"new": "new_count", "in_progress": "in_progress_count", "resolved": "resolved_count"}
+    buckets = {}
+    result = bind.execution_options(yield_per=BATCH_SIZE).execute(
+        sa.select(issues).where(issues.c.created_at.isnot(None))
+    )
+    for row in result:
+        key = (row.assigned_department or "", row.created_at.date(), row.category)
+        bucket = buckets.setdefault(key, {
+            "total_count": 0, "new_count": 0, "in_progress_count": 0,
+            "resolved_count": 0, "resolution_seconds": 0.0,
+        })
+        bucket["total_count"] += 1
+        if row.status in status_columns:
+            bucket[status_columns[row.status]] += 1
+        if row.status == "resolved" and row.resolved_at:
+            bucket["resolution_seconds"] += (row.resolved_at - row.created_at).total_seconds()
+
+    if buckets:
+        rollups = sa.table(
+            "issue_stats_rollups",
+            *[sa.column(name) for name in ("department", "day", "category", "total_count", "new_count",
+                                           "in_progress_count", "resolved_count", "resolution_seconds")],
+        )
+        op.bulk_insert(rollups, [
+            {"department": department, "day": day, "category": category, **values}
+            for (department, day, category), values in buckets.items()
+        ])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing = set(inspector.get_table_names())
+    _create_tables(existing)
+
+    added = set()
+    for table, columns in LEGACY_COLUMNS.items():
+        if table not in existing:
+            continue
+        present = {c["name"] for c in inspector.get_columns(table)}
+        for column in columns:
+            if column.name not in present:
+                op.add_column(table, column.copy())
+                added.add((table, column.name))
+
+    inspector = sa.inspect(bind)
+    for name, table, columns, unique in INDEXES:
+        if name not in {ix["name"] for ix in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns, unique=unique)
+
+    _backfill_geohashes(bind)
+    if ("issues", "resolved_at") in added:
+        op.execute("UPDATE issues SET resolved_at = updated_at WHERE status = 'resolved' AND resolved_at IS NULL")
+    _backfill_stats_rollups(bind)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The baseline describes pre-existing data; there is nothing earlier to return to
+    pass
@@ -0,0 +1,68 @@
+"""hot path indexes
+
+Composite indexes for the filters issue_service.py and the notification
+inbox run on every request, and a unique (issue_id, user_id) index on
+upvotes. Duplicate upvotes left behind by the old check-then-insert toggle
+are removed (keeping the earliest) and the affected issues' upvote_count is
+recounted before the unique index is built.
+
+Revision ID: 8c41e5a0b2d7
+Revises: 3f2b9c1d7a10
+Create Date: 2026-10-18 09:40:05.118327
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c41e5a0b2d7'
+down_revision: Union[str, Sequence[str], None] = '3f2b9c1d7a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    # Admin triage: issues assigned to me with a given status
+    ("ix_issues_admin_status", "issues", ["assigned_admin_id", "status"]),
+    # Department lists filtered by status, newest first
+    ("ix_issues_department_status_created_at", "issues", ["assigned_department", "status", "created_at", "id"]),
+    # "My issues" for a reporter, newest first
+    ("ix_issues_reporter_created_at", "issues", ["reporter_id", "created_at"]),
+    # Unread notifications for a user, newest first
+    ("ix_notifications_user_read_created_at", "notifications", ["user_id", "read", "created_at"]),
+    # Conversation for an issue in order
+    ("ix_messages_issue_created_at", "messages", ["issue_id", "created_at"]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+    duplicates = sa.text(
+        "SELECT issue_id FROM upvotes GROUP BY issue_id, user_id HAVING COUNT(*) > 1"
+    )
+    affected = {row[0] for row in op.get_bind().execute(duplicates)}
+    if affected:
+        op.execute(
+            "DELETE FROM upvotes WHERE id NOT IN "
+            "(SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM upvotes GROUP BY issue_id, user_id) AS keep)"
+        )
+        op.get_bind().execute(
+            sa.text(
+                "UPDATE issues SET upvote_count = "
+                "(SELECT COUNT(*) FROM upvotes WHERE upvotes.issue_id = issues.id) WHERE id = :id"
+            ),
+            [{"id": issue_id} for issue_id in affected],
+        )
+    op.create_index("uq_upvotes_issue_id_user_id", "upvotes", ["issue_id", "user_id"], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("uq_upvotes_issue_id_user_id", table_name="upvotes")
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,33 @@
+"""issue full-text search
+
+Adds the full-text index behind GET /issues?search= (app/core/fulltext.py):
+an FTS5 table kept in sync by triggers on SQLite, a generated tsvector column
+with a GIN index on PostgreSQL. Existing descriptions are indexed here.
+
+Revision ID: a8c2e4f6b1d9
+Revises: e6a2c4d8b1f3
+Create Date: 2026-10-18 17:21:09.518364
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.core.fulltext import create_issue_search_index, drop_issue_search_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c2e4f6b1d9'
+down_revision: Union[str, Sequence[str], None] = 'e6a2c4d8b1f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    create_issue_search_index(op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_issue_search_index(op.get_bind())
@@ -0,0 +1,41 @@
+"""admin open issue count
+
+Adds users.open_issue_count, the per-admin workload counter the assignment
+engine picks the least-loaded admin from, and fills it from the issues
+currently assigned with status new or in_progress.
+
+Revision ID: b7d3e91f4c25
+Revises: 8c41e5a0b2d7
+Create Date: 2026-10-18 11:02:37.640218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d3e91f4c25'
+down_revision: Union[str, Sequence[str], None] = '8c41e5a0b2d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "users",
+        sa.Column("open_issue_count", sa.Integer(), nullable=False, server_default=sa.text("0")),
+    )
+    op.execute(
+        "UPDATE users SET open_issue_count = ("
+        "SELECT COUNT(*) FROM issues WHERE issues.assigned_admin_id = users.id "
+        "AND issues.status IN ('new', 'in_progress'))"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("open_issue_count")
@@ -0,0 +1,50 @@
+"""notification outbox
+
+Turns the notifications table into a transactional outbox: dispatched_at,
+attempts and next_attempt_at track push/WebSocket delivery, and a partial
+index covers the undelivered rows the dispatcher polls. Existing
+notifications are marked as already dispatched so they are not pushed again.
+
+Revision ID: c4e8a2f61d93
+Revises: b7d3e91f4c25
+Create Date: 2026-10-18 13:21:44.902516
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a2f61d93'
+down_revision: Union[str, Sequence[str], None] = 'b7d3e91f4c25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("notifications", sa.Column("dispatched_at", sa.DateTime(), nullable=True))
+    op.add_column(
+        "notifications",
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default=sa.text("0")),
+    )
+    op.add_column("notifications", sa.Column("next_attempt_at", sa.DateTime(), nullable=True))
+    op.execute("UPDATE notifications SET dispatched_at = COALESCE(created_at, CURRENT_TIMESTAMP)")
+    op.create_index(
+        "ix_notifications_outbox",
+        "notifications",
+        ["next_attempt_at", "id"],
+        sqlite_where=sa.text("dispatched_at IS NULL"),
+        postgresql_where=sa.text("dispatched_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_notifications_outbox", table_name="notifications")
+    with op.batch_alter_table("notifications") as batch_op:
+        batch_op.drop_column("next_attempt_at")
+        batch_op.drop_column("attempts")
+        batch_op.drop_column("dispatched_at")
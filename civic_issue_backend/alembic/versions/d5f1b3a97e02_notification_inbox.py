@@ -0,0 +1,61 @@
+"""notification inbox
+
+Adds users.unread_notification_count (the inbox badge, maintained
+incrementally and filled here from the unread rows), an index for paging a
+user's inbox newest first, and the notification_archive table the retention
+job moves old read notifications into.
+
+Revision ID: d5f1b3a97e02
+Revises: c4e8a2f61d93
+Create Date: 2026-10-18 14:47:12.330871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5f1b3a97e02'
+down_revision: Union[str, Sequence[str], None] = 'c4e8a2f61d93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "users",
+        sa.Column("unread_notification_count", sa.Integer(), nullable=False, server_default=sa.text("0")),
+    )
+    op.execute(
+        "UPDATE users SET unread_notification_count = ("
+        "SELECT COUNT(*) FROM notifications WHERE notifications.user_id = users.id "
+        "AND notifications.read = false)"
+    )
+    op.create_index("ix_notifications_user_created_at_id", "notifications", ["user_id", "created_at", "id"])
+
+    op.create_table(
+        "notification_archive",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("issue_id", sa.Integer(), nullable=True),
+        sa.Column("type", sa.String(length=50), nullable=False),
+        sa.Column("message", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("archived_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_notification_archive_user_created_at", "notification_archive", ["user_id", "created_at"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_notification_archive_user_created_at", table_name="notification_archive")
+    op.drop_table("notification_archive")
+    op.drop_index("ix_notifications_user_created_at_id", table_name="notifications")
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("unread_notification_count")
@@ -0,0 +1,59 @@
+"""phone number digest
+
+users.phone_number_hash switches from a salted bcrypt hash (unsearchable, one
+bcrypt round per registration) to a keyed HMAC-SHA256 digest
+(app/core/phone_digest.py) with a unique index, so user lookups are a single
+index probe. Existing rows are recomputed from phone_number in id batches,
+which keeps each statement short on large tables. Rerun this backfill
+(downgrade/upgrade) after rotating PHONE_DIGEST_KEY.
+
+Revision ID: e6a2c4d8b1f3
+Revises: d5f1b3a97e02
+Create Date: 2026-10-18 16:05:41.902217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.phone_digest import phone_digest
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6a2c4d8b1f3'
+down_revision: Union[str, Sequence[str], None] = 'd5f1b3a97e02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    conn = op.get_bind()
+    users = sa.table("users", sa.column("id", sa.Integer), sa.column("phone_number", sa.String),
+                     sa.column("phone_number_hash", sa.String))
+    update = (
+        sa.update(users)
+        .where(users.c.id == sa.bindparam("b_id"))
+        .values(phone_number_hash=sa.bindparam("b_digest"))
+    )
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(users.c.id, users.c.phone_number)
+            .where(users.c.id > last_id).order_by(users.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        conn.execute(update, [{"b_id": row.id, "b_digest": phone_digest(row.phone_number)} for row in rows])
+        last_id = rows[-1].id
+
+    op.create_index("ix_users_phone_number_hash", "users", ["phone_number_hash"], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The bcrypt hashes are gone; the digests stay as opaque values
+    op.drop_index("ix_users_phone_number_hash", table_name="users")
@@ -1,18 +1,21 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from sqlalchemy.orm import Session
 from app.schemas.issue import IssueOut, IssueUpdate
 from app.schemas.user import UserOut
 from app.schemas.notification import NotificationOut
 from app.services.issue_service import IssueService
 from app.services.auth_service import AuthService
-from app.core.security import get_current_user
+from app.services.inbox_service import InboxService
+from app.core.security import get_current_principal
 from app.core.db import get_db
+from app.core.pagination import NEXT_CURSOR_HEADER
 from typing import List, Optional
 
 router = APIRouter()
 
 @router.get("/issues", response_model=List[IssueOut])
 def get_admin_issues(
+    response: Response,
     status: Optional[str] = Query(None, description="Filter by status"),
     category: Optional[str] = Query(None, description="Filter by category"),
     priority: Optional[str] = Query(None, description="Filter by priority"),
@@ -20,35 +23,38 @@ def get_admin_issues(
     sort_order: Optional[str] = Query("desc", description="Sort order (asc/desc)"),
     limit: Optional[int] = Query(50, description="Number of issues to return"),
     offset: Optional[int] = Query(0, description="Offset for pagination"),
-    current_user: dict = Depends(get_current_user),
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} response header"),
+    current_user: dict = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Get all issues from admin's department"""
-    from app.models.user import User
-    
-    # Get admin's department
-    admin = db.query(User).filter(User.id == current_user["id"]).first()
-    if not admin or not admin.department:
+    if not current_user["department"]:
         raise HTTPException(status_code=400, detail="Admin department not found")
     
     issue_service = IssueService(db)
-    issues = issue_service.get_department_issues(
-        department=admin.department,
-        status=status,
-        category=category,
-        priority=priority,
-        sort_by=sort_by,
-        sort_order=sort_order,
-        limit=limit,
-        offset=offset
-    )
+    try:
+        issues = issue_service.get_department_issues(
+            department=current_user["department"],
+            status=status,
+            category=category,
+            priority=priority,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            limit=limit,
+            offset=offset,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if issue_service.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = issue_service.next_cursor
     return issues
 
 @router.patch("/issues/{issue_id}", response_model=IssueOut)
 def update_issue(
     issue_id: int, 
     issue_update: IssueUpdate,
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Update issue with admin actions and trust score management - only for assigned issues"""
@@ -82,6 +88,7 @@ def update_issue(
 
 @router.get("/my-issues", response_model=List[IssueOut])
 def get_my_assigned_issues(
+    response: Response,
     status: Optional[str] = Query(None, description="Filter by status"),
     category: Optional[str] = Query(None, description="Filter by category"),
     priority: Optional[str] = Query(None, description="Filter by priority"),
@@ -89,25 +96,32 @@ def get_my_assigned_issues(
     sort_order: Optional[str] = Query("desc", description="Sort order (asc/desc)"),
     limit: Optional[int] = Query(50, description="Number of issues to return"),
     offset: Optional[int] = Query(0, description="Offset for pagination"),
-    current_user: dict = Depends(get_current_user),
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} response header"),
+    current_user: dict = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Get issues assigned to current admin"""
     issue_service = IssueService(db)
-    issues = issue_service.get_admin_issues(
-        admin_id=current_user["id"],
-        status=status,
-        category=category,
-        priority=priority,
-        sort_by=sort_by,
-        sort_order=sort_order,
-        limit=limit,
-        offset=offset
-    )
+    try:
+        issues = issue_service.get_admin_issues(
+            admin_id=current_user["id"],
+            status=status,
+            category=category,
+            priority=priority,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            limit=limit,
+            offset=offset,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if issue_service.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = issue_service.next_cursor
     return issues
 
 @router.delete("/issues/{issue_id}")
-def delete_issue(issue_id: int, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+def delete_issue(issue_id: int, current_user: dict = Depends(get_current_principal), db: Session = Depends(get_db)):
     """Delete an issue (for spam/invalid reports) - only for assigned issues"""
     issue_service = IssueService(db)
     
@@ -130,7 +144,7 @@ def get_admin_users(
     role: Optional[str] = Query(None, description="Filter by role"),
     limit: Optional[int] = Query(50, description="Number of users to return"),
     offset: Optional[int] = Query(0, description="Offset for pagination"),
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Get all users for user management"""
@@ -140,63 +154,41 @@ def get_admin_users(
 
 @router.get("/notifications", response_model=List[NotificationOut])
 def get_notifications(
-    current_user: dict = Depends(get_current_user),
+    response: Response,
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} response header"),
+    current_user: dict = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
-    """Get notifications for current user"""
-    from app.models.issue import Notification
-    notifications = db.query(Notification).filter(
-        Notification.user_id == current_user["id"]
-    ).order_by(Notification.created_at.desc()).limit(50).all()
-    
-    return [
-        {
-            "id": n.id,
-            "user_id": n.user_id,
-            "issue_id": n.issue_id,
-            "type": n.type,
-            "message": n.message,
-            "read": n.read,
-            "created_at": n.created_at
-        }
-        for n in notifications
-    ]
+    """Get notifications for current user (see also /notifications/inbox)"""
+    inbox_service = InboxService(db)
+    try:
+        notifications = inbox_service.get_notifications(current_user["id"], limit=50, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if inbox_service.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = inbox_service.next_cursor
+    return notifications
 
 @router.patch("/notifications/{notification_id}/read")
 def mark_notification_read(
     notification_id: int,
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Mark a notification as read"""
-    from app.models.issue import Notification
-    
-    notification = db.query(Notification).filter(
-        Notification.id == notification_id,
-        Notification.user_id == current_user["id"]
-    ).first()
-    
-    if not notification:
+    unread_count = InboxService(db).mark_read(current_user["id"], notification_id)
+    if unread_count is None:
         raise HTTPException(status_code=404, detail="Notification not found")
     
-    notification.read = True
-    db.commit()
-    
-    return {"success": True, "message": "Notification marked as read"}
+    return {"success": True, "message": "Notification marked as read", "unread_count": unread_count}
 
 @router.patch("/notifications/mark-all-read")
 def mark_all_notifications_read(
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Mark all notifications as read for current user"""
-    from app.models.issue import Notification
-    
-    db.query(Notification).filter(
-        Notification.user_id == current_user["id"],
-        Notification.read == False
-    ).update({"read": True})
-    
-    db.commit()
+    inbox_service = InboxService(db)
+    inbox_service.mark_all_read(current_user["id"])
     
-    return {"success": True, "message": "All notifications marked as read"}
+    return {"success": True, "message": "All notifications marked as read", "unread_count": inbox_service.unread_count(current_user["id"])}
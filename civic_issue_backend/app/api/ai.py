@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, Query, HTTPException, Request
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, List, Optional
 import os
 import json
 
@@ -17,15 +17,19 @@ from app.schemas.ai import (
     SentimentRequest,
     SentimentResponse,
 )
-from app.services.ai_service import AIService
+from app.services.ai_service import AIService, ImageTooLarge, decode_image_data_url
 from app.services.issue_service import IssueService
 from app.core.db import get_db
-from app.core.rate_limiter import limiter
 
 
 router = APIRouter()
 ai = AIService()
 
+
+def shutdown_ai():
+    """Stop the inference worker and fail any detections still queued"""
+    ai.engine.shutdown()
+
 # Demo mode check
 DEMO_MODE = os.getenv('DEMO_MODE', 'false').lower() == 'true'
 
@@ -62,65 +66,43 @@ def load_mock_text_analysis():
         return {'keywords': ['waste', 'pollution', 'garbage']}
 
 
+def _image_source(image_url: Optional[str], image_data_url: Optional[str]) -> Any:
+    """Resolve a request's image to something the detector accepts.
+
+    Data URLs are decoded in memory into a BGR array (no temp files); image_url
+    is passed through, with relative local paths made absolute.
+    """
+    if image_data_url and image_data_url.startswith("data:"):
+        try:
+            return decode_image_data_url(image_data_url)
+        except ImageTooLarge as e:
+            raise HTTPException(status_code=413, detail=f"Invalid image data: {e}")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid image data: {e}")
+    if image_url:
+        src = image_url
+        # Convert relative path to absolute path if it's a local file
+        if not src.startswith(('http://', 'https://', 'file://')) and not os.path.isabs(src):
+            # Make it relative to the backend directory
+            src = os.path.join(os.getcwd(), src)
+        return src
+    raise HTTPException(status_code=400, detail="Provide image_url or image_data_url")
+
+
 @router.post("/detect", response_model=ImageDetectResponse)
-@limiter.limit("30/minute")  # Rate limit: 30 AI detections per minute
 def detect_image(req: ImageDetectRequest, request: Request):
     # Demo mode: return mock data
     if DEMO_MODE:
         detections = load_mock_ai_detection()
         return ImageDetectResponse(detections=[Detection(label=d.label, confidence=d.confidence, bbox=d.bbox) for d in detections])
     
-    src: Optional[str] = None
-    temp_path: Optional[str] = None
-    # Support data URLs to avoid backend file persistence
-    if req.image_data_url and req.image_data_url.startswith("data:"):
-        try:
-            import base64, re, os, tempfile
-            match = re.match(r"^data:(.*?);base64,(.*)$", req.image_data_url)
-            if not match:
-                raise ValueError("Invalid data URL")
-            mime = (match.group(1) or "").lower()
-            b64 = match.group(2)
-            data = base64.b64decode(b64)
-            ext = ".jpg"
-            if "png" in mime:
-                ext = ".png"
-            elif "jpeg" in mime or "jpg" in mime:
-                ext = ".jpg"
-            elif "webp" in mime:
-                ext = ".webp"
-            fd, temp_path = tempfile.mkstemp(prefix="upload_", suffix=ext)
-            with os.fdopen(fd, "wb") as f:
-                f.write(data)
-            src = temp_path
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Invalid image data: {e}")
-    elif req.image_url:
-        src = req.image_url
-        # Convert relative path to absolute path if it's a local file
-        if not src.startswith(('http://', 'https://', 'file://')):
-            import os
-            if not os.path.isabs(src):
-                # Make it relative to the backend directory
-                src = os.path.join(os.getcwd(), src)
-    else:
-        raise HTTPException(status_code=400, detail="Provide image_url or image_data_url")
-
+    src = _image_source(req.image_url, req.image_data_url)
     detections = ai.detect_issue_from_image(src)
 
-    # Clean up temporary file if used
-    if temp_path:
-        try:
-            import os
-            os.remove(temp_path)
-        except Exception:
-            pass
-
     return ImageDetectResponse(detections=[Detection(label=d.label, confidence=d.confidence, bbox=d.bbox) for d in detections])
 
 
 @router.post("/analyze-text", response_model=TextAnalyzeResponse)
-@limiter.limit("30/minute")  # Rate limit: 30 text analyses per minute
 def analyze_text(req: TextAnalyzeRequest, request: Request):
     # Demo mode: return mock data
     if DEMO_MODE:
@@ -132,18 +114,11 @@ def analyze_text(req: TextAnalyzeRequest, request: Request):
 
 
 @router.post("/severity", response_model=SeverityResponse)
-@limiter.limit("30/minute")  # Rate limit: 30 severity estimations per minute
 def severity(req: SeverityRequest, request: Request):
     detections = []
-    # Reuse detection on data URL if provided
-    if req.image_data_url:
-        det_resp = detect_image(ImageDetectRequest(image_data_url=req.image_data_url))
-        detections = [
-            type("_D", (), {"label": d.label, "confidence": d.confidence, "bbox": d.bbox})
-            for d in det_resp.detections
-        ]
-    elif req.image_url:
-        detections = ai.detect_issue_from_image(req.image_url)
+    # Share the in-memory decoding path with /detect
+    if req.image_data_url or req.image_url:
+        detections = ai.detect_issue_from_image(_image_source(req.image_url, req.image_data_url))
     out = ai.estimate_severity(detections, req.text or "")
     return SeverityResponse(score=out["score"], level=out["level"])
 
@@ -162,6 +137,16 @@ def duplicates(req: DuplicateCheckRequest, db: Session = Depends(get_db)):
     return DuplicateCheckResponse(duplicate_issue_ids=ids)
 
 
+@router.get("/engine-stats")
+def engine_stats():
+    """Inference engine queue-depth and batch-size metrics"""
+    return {
+        "model_loaded": ai.backend is not None,
+        "backend": ai.backend.name if ai.backend is not None else None,
+        **ai.engine.stats(),
+    }
+
+
 @router.post("/sentiment", response_model=SentimentResponse)
 def sentiment(req: SentimentRequest):
     res = ai.sentiment(req.text)
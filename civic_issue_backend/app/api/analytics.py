@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
-from app.schemas.analytics import StatsResponse, HeatmapPoint
+from app.schemas.analytics import StatsResponse, HeatmapPoint, HeatmapGrid
 from app.services.analytics_service import AnalyticsService
-from app.core.security import get_current_user
+from app.core.security import get_current_principal
 from app.core.db import get_db
 from typing import List, Optional
 from datetime import datetime
@@ -69,7 +69,7 @@ def load_mock_analytics():
 def get_stats(
     start_date: Optional[datetime] = Query(None, description="Start date for stats"),
     end_date: Optional[datetime] = Query(None, description="End date for stats"),
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Get key KPI numbers for dashboard header - department specific"""
@@ -77,30 +77,43 @@ def get_stats(
     if DEMO_MODE:
         return load_mock_analytics()
     
-    from app.models.user import User
-    
-    # Get admin's department
-    admin = db.query(User).filter(User.id == current_user["id"]).first()
-    department = admin.department if admin else None
-    
     analytics_service = AnalyticsService(db)
-    stats = analytics_service.get_stats(start_date, end_date, department)
+    stats = analytics_service.get_stats(start_date, end_date, current_user["department"])
     return stats
 
 @router.get("/heatmap", response_model=List[HeatmapPoint])
 def get_heatmap_data(
     status: Optional[str] = Query(None, description="Filter by status"),
     category: Optional[str] = Query(None, description="Filter by category"),
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Get issue coordinates for heatmap visualization - department specific"""
-    from app.models.user import User
-    
-    # Get admin's department
-    admin = db.query(User).filter(User.id == current_user["id"]).first()
-    department = admin.department if admin else None
-    
     analytics_service = AnalyticsService(db)
-    heatmap_data = analytics_service.get_heatmap_data(status, category, department)
+    heatmap_data = analytics_service.get_heatmap_data(status, category, current_user["department"])
     return heatmap_data
+
+@router.get("/heatmap/grid", response_model=HeatmapGrid)
+def get_heatmap_grid(
+    zoom: int = Query(12, ge=0, le=22, description="Map zoom level; selects the cell size"),
+    min_lat: Optional[float] = Query(None, ge=-90, le=90, description="Viewport south edge"),
+    min_lng: Optional[float] = Query(None, ge=-180, le=180, description="Viewport west edge"),
+    max_lat: Optional[float] = Query(None, ge=-90, le=90, description="Viewport north edge"),
+    max_lng: Optional[float] = Query(None, ge=-180, le=180, description="Viewport east edge"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    category: Optional[str] = Query(None, description="Filter by category"),
+    current_user: dict = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Get SQL-aggregated heatmap cells in columnar form - department specific"""
+    bounds = (min_lat, min_lng, max_lat, max_lng)
+    bbox = None
+    if any(v is not None for v in bounds):
+        if any(v is None for v in bounds):
+            raise HTTPException(status_code=400, detail="Provide all of min_lat, min_lng, max_lat, max_lng")
+        if min_lat > max_lat or min_lng > max_lng:
+            raise HTTPException(status_code=400, detail="Invalid bounding box")
+        bbox = bounds
+    
+    analytics_service = AnalyticsService(db)
+    return analytics_service.get_heatmap_grid(zoom, bbox, status, category, current_user["department"])
@@ -1,18 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
-import base64
 from app.schemas.auth import Token, LoginRequest, RegisterRequest, EncryptedRequest, EncryptedResponse, LoginWithEncryptedSecret
-from app.core.encryption import decrypt_payload
+from app.core.encryption import decrypt_packed, decrypt_packed_many, decrypt_payload
+from app.core.password_hasher import HasherBusy
 from app.schemas.user import UserOut
 from app.services.auth_service import AuthService
 from app.services.hcaptcha_service import HCaptchaService
 from app.core.db import get_db
-from app.core.rate_limiter import limiter
 
 router = APIRouter()
 
+def _looks_packed(value) -> bool:
+    """Whether a login field looks like a packed base64(nonce||ciphertext) rather than plain text"""
+    return isinstance(value, str) and len(value) > 20 and value.replace('+', '').replace('/', '').replace('=', '').isalnum()
+
 @router.post("/register", response_model=UserOut)
-@limiter.limit("10/minute")  # Rate limit: 10 registrations per minute
 async def register(data: dict, request: Request, db: Session = Depends(get_db)):
     # Accept packed format like login: { full_name, phone_number, password: base64(nonce||ciphertext), fp_check: base64(nonce||ciphertext) }
     if 'password' in data and 'phone_number' in data and 'full_name' in data:
@@ -22,22 +24,15 @@ async def register(data: dict, request: Request, db: Session = Depends(get_db)):
         
         # Helper function to unpack and decrypt
         def unpack_and_decrypt(packed_b64: str):
-            import base64
-            padding = '=' * ((4 - (len(packed_b64) % 4)) % 4)
-            raw = base64.b64decode(packed_b64 + padding)
-            if len(raw) < 12:
-                raise HTTPException(status_code=400, detail="Invalid packed data")
-            nonce = base64.b64encode(raw[:12]).decode('ascii')
-            ciphertext = base64.b64encode(raw[12:]).decode('ascii')
             try:
-                return decrypt_payload(nonce, ciphertext)
+                return decrypt_packed(packed_b64, kid=data.get('kid'))
             except ValueError:
                 raise HTTPException(status_code=400, detail="Invalid encrypted payload")
         
         # Try to detect if password is encrypted (base64 packed format)
         try:
             # If it's base64 and longer than typical plain text, assume it's encrypted
-            if len(password_value) > 20 and password_value.replace('+', '').replace('/', '').replace('=', '').isalnum():
+            if _looks_packed(password_value):
                 secret_obj = unpack_and_decrypt(password_value)
                 password = secret_obj.get('secret') or secret_obj.get('password')
                 if not password:
@@ -51,7 +46,7 @@ async def register(data: dict, request: Request, db: Session = Depends(get_db)):
             
         # Try to detect if phone_number is encrypted
         try:
-            if len(phone_value) > 20 and phone_value.replace('+', '').replace('/', '').replace('=', '').isalnum():
+            if _looks_packed(phone_value):
                 phone_obj = unpack_and_decrypt(phone_value)
                 phone_number = phone_obj.get('secret') or phone_obj.get('phone_number')
                 if not phone_number:
@@ -62,19 +57,6 @@ async def register(data: dict, request: Request, db: Session = Depends(get_db)):
         except Exception:
             # If unpacking fails, treat as plain text
             phone_number = phone_value
-        try:
-            print("[register] Decrypted password:", password)
-        except Exception:
-            pass
-        fp_plain = None
-        if 'fp_check' in data and data['fp_check']:
-            try:
-                fp_obj = unpack_and_decrypt(data['fp_check'])
-                # Print/log decrypted fp_check text
-                fp_plain = str(fp_obj)
-                print("[register] Decrypted fp_check:", fp_plain)
-            except Exception:
-                pass
         # Verify hCaptcha - TEMPORARILY DISABLED
         # hcaptcha_token = data.get('hcaptcha_token')
         # if not hcaptcha_token:
@@ -90,7 +72,7 @@ async def register(data: dict, request: Request, db: Session = Depends(get_db)):
         service = AuthService(db)
         role = data.get('role', 'citizen')
         department = data.get('department')
-        user = service.create_user(data['full_name'], phone_number, password, role, department)
+        user = await service.create_user_async(data['full_name'], phone_number, password, role, department)
         return user
     else:
         # Fallback: plain data or fully encrypted body
@@ -100,8 +82,10 @@ async def register(data: dict, request: Request, db: Session = Depends(get_db)):
             service = AuthService(db)
             role = data.get('role', 'citizen')
             department = data.get('department')
-            user = service.create_user(register_schema.full_name, register_schema.phone_number, register_schema.password, role, department)
+            user = await service.create_user_async(register_schema.full_name, register_schema.phone_number, register_schema.password, role, department)
             return user
+        except HasherBusy:
+            raise
         except Exception:
             # Fallback to encrypted data
             try:
@@ -114,11 +98,10 @@ async def register(data: dict, request: Request, db: Session = Depends(get_db)):
                 raise HTTPException(status_code=400, detail="Invalid encrypted payload")
             register_schema = RegisterRequest(**decrypted)
             service = AuthService(db)
-            user = service.create_user(register_schema.full_name, register_schema.phone_number, register_schema.password)
+            user = await service.create_user_async(register_schema.full_name, register_schema.phone_number, register_schema.password)
             return user
 
 @router.post("/login", response_model=Token)
-@limiter.limit("10/minute")  # Rate limit: 10 login attempts per minute (prevent brute force)
 async def login(data: dict, request: Request, db: Session = Depends(get_db)):
     # Support three forms:
     # 1) Fully encrypted: {nonce,ciphertext} -> {username/password} or {phone_number/secret}
@@ -126,87 +109,57 @@ async def login(data: dict, request: Request, db: Session = Depends(get_db)):
     # 3) Plain (fallback): {username,password}
     if 'nonce' in data and 'ciphertext' in data and 'phone_number' not in data:
         try:
-            decrypted = decrypt_payload(data['nonce'], data['ciphertext'])
+            decrypted = decrypt_payload(data['nonce'], data['ciphertext'], kid=data.get('kid'))
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid encrypted payload")
         if 'phone_number' in decrypted and 'secret' in decrypted:
-            try:
-                print("[login] Decrypted password:", decrypted['secret'])
-            except Exception:
-                pass
             login_schema = LoginRequest(username=decrypted['phone_number'], password=decrypted['secret'])
         else:
             login_schema = LoginRequest(**decrypted)
     elif 'phone_number' in data and 'nonce' in data and 'ciphertext' in data:
         try:
-            decrypted = decrypt_payload(data['nonce'], data['ciphertext'])
+            decrypted = decrypt_payload(data['nonce'], data['ciphertext'], kid=data.get('kid'))
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid encrypted payload")
         secret = decrypted.get('secret')
         if not secret:
             raise HTTPException(status_code=400, detail="Missing secret in decrypted payload")
-        try:
-            print("[login] Decrypted password:", secret)
-        except Exception:
-            pass
         login_schema = LoginRequest(username=data['phone_number'], password=secret)
     elif 'phone_number' in data and 'password' in data:
         # Check if password is encrypted (packed base64) or plain text
         password_value = data['password']
         phone_value = data['phone_number']
         
-        # Try to detect if password is encrypted
-        password = None
-        try:
-            if len(password_value) > 20 and password_value.replace('+', '').replace('/', '').replace('=', '').isalnum():
-                # Password appears to be encrypted (packed base64)
-                packed_password = password_value
-                padding = '=' * ((4 - (len(packed_password) % 4)) % 4)
-                raw = base64.b64decode(packed_password + padding)
-                if len(raw) < 12:
-                    raise ValueError('Invalid packed password length')
-                nonce = raw[:12]
-                ciphertext = raw[12:]
-                from_base = base64.b64encode
-                decrypted_password = decrypt_payload(from_base(nonce).decode('ascii'), from_base(ciphertext).decode('ascii'))
-                secret = decrypted_password.get('secret')
-                if not secret:
-                    raise ValueError('Missing secret in decrypted payload')
-                password = secret
-            else:
-                # Password is plain text
-                password = password_value
-        except Exception as e:
-            # If decryption fails, log error and reject
-            print(f"[login] Password decryption failed: {e}")
-            raise HTTPException(status_code=400, detail="Invalid encrypted password format")
+        # Decrypt whichever fields are packed (base64 nonce||ciphertext) in one pass
+        password_packed = _looks_packed(password_value)
+        phone_packed = _looks_packed(phone_value)
+        decrypted_password, decrypted_phone = decrypt_packed_many(
+            [password_value if password_packed else None, phone_value if phone_packed else None],
+            kid=data.get('kid')
+        )
+        
+        if password_packed:
+            secret = decrypted_password.get('secret') if decrypted_password else None
+            if not secret:
+                # If decryption fails, log error and reject
+                print("[login] Password decryption failed")
+                raise HTTPException(status_code=400, detail="Invalid encrypted password format")
+            password = secret
+        else:
+            # Password is plain text
+            password = password_value
         
         if not password:
             raise HTTPException(status_code=400, detail="Password is required")
         
-        # Check if phone_number is also encrypted
+        # Phone number may also be encrypted
         phone_number = None
-        try:
-            if len(phone_value) > 20 and phone_value.replace('+', '').replace('/', '').replace('=', '').isalnum():
-                # Phone number is encrypted
-                packed_phone = phone_value
-                padding = '=' * ((4 - (len(packed_phone) % 4)) % 4)
-                raw = base64.b64decode(packed_phone + padding)
-                if len(raw) < 12:
-                    raise ValueError('Invalid packed phone length')
-                nonce = raw[:12]
-                ciphertext = raw[12:]
-                from_base = base64.b64encode
-                decrypted_phone = decrypt_payload(from_base(nonce).decode('ascii'), from_base(ciphertext).decode('ascii'))
-                phone_number = decrypted_phone.get('secret') or decrypted_phone.get('phone_number')
-                if not phone_number:
-                    raise ValueError('Missing phone number in decrypted payload')
-            else:
-                # Phone number is plain text
-                phone_number = phone_value
-        except Exception as e:
-            # If phone decryption fails, log and use as-is (might be plain text)
-            print(f"[login] Phone decryption failed, using as plain text: {e}")
+        if phone_packed and decrypted_phone:
+            phone_number = decrypted_phone.get('secret') or decrypted_phone.get('phone_number')
+        if not phone_number:
+            if phone_packed:
+                # If phone decryption fails, log and use as-is (might be plain text)
+                print("[login] Phone decryption failed, using as plain text")
             phone_number = phone_value
         
         if not phone_number:
@@ -221,14 +174,9 @@ async def login(data: dict, request: Request, db: Session = Depends(get_db)):
         if len(password_bytes) > 72:
             # If password is still too long after decryption, something is wrong
             # Log for debugging but truncate to prevent error
-            print(f"Warning: Password length {len(password_bytes)} exceeds bcrypt limit, truncating")
+            print("Warning: password exceeds bcrypt limit, truncating")
             password = password_bytes[:72].decode('utf-8', errors='ignore')
         
-        try:
-            print("[login] Password length:", len(password.encode('utf-8')), "bytes")
-            print("[login] Phone number:", phone_number)
-        except Exception:
-            pass
         login_schema = LoginRequest(username=phone_number, password=password)
     else:
         # Plain JSON fallback - handle both phone_number and username formats
@@ -252,7 +200,7 @@ async def login(data: dict, request: Request, db: Session = Depends(get_db)):
     #     raise HTTPException(status_code=400, detail="hCaptcha verification failed")
     
     service = AuthService(db)
-    tokens = service.authenticate_user(login_schema.username, login_schema.password)
+    tokens = await service.authenticate_user_async(login_schema.username, login_schema.password)
     if not tokens:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     return tokens
@@ -263,10 +211,12 @@ async def login_plain(data: dict, db: Session = Depends(get_db)):
     try:
         login_schema = LoginRequest(**data)
         service = AuthService(db)
-        tokens = service.authenticate_user(login_schema.username, login_schema.password)
+        tokens = await service.authenticate_user_async(login_schema.username, login_schema.password)
         if not tokens:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
         return tokens
+    except HasherBusy:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Login error: {str(e)}")
 
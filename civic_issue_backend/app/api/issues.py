@@ -1,13 +1,13 @@
-from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Query, Request, Response
 from fastapi import UploadFile, File, Body
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from app.schemas.issue import IssueCreate, IssueOut, UploadInitiateResponse
-from app.services.issue_service import IssueService
+from app.services.issue_service import MAX_RADIUS_KM, IssueService, fill_remote_fingerprints
 from app.services.storage_service import StorageService
-from app.core.security import get_current_user
+from app.core.security import get_current_principal
 from app.core.db import get_db
-from app.core.rate_limiter import limiter
+from app.core.pagination import NEXT_CURSOR_HEADER
 from typing import List, Optional
 
 router = APIRouter()
@@ -28,8 +28,7 @@ async def upload_file_local(filename: str, file: bytes = Body(...)):
     raise HTTPException(status_code=400, detail="Local uploads are disabled. Use presigned S3/MinIO uploads.")
 
 @router.post("", response_model=IssueOut)
-@limiter.limit("20/minute")  # Rate limit: 20 issue creations per minute per user
-def create_issue(payload: IssueCreate, request: Request, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+def create_issue(payload: IssueCreate, request: Request, background_tasks: BackgroundTasks, current_user: dict = Depends(get_current_principal), db: Session = Depends(get_db)):
     """Step 2: Create issue after photo upload"""
     # Set reporter_id from current user
     payload.reporter_id = current_user["id"]
@@ -48,25 +47,52 @@ def create_issue(payload: IssueCreate, request: Request, current_user: dict = De
     
     if not result:
         raise HTTPException(status_code=500, detail="Could not create issue")
+    # Storage images that missed the submit fetch budget are hashed after the response
+    if issue_service.pending_remote_fingerprints:
+        background_tasks.add_task(fill_remote_fingerprints, result["id"])
     return result
 
 @router.get("", response_model=List[IssueOut])
 def get_issues(
+    response: Response,
     lat: Optional[float] = Query(None, description="Latitude for nearby issues"),
     lng: Optional[float] = Query(None, description="Longitude for nearby issues"),
-    radius: Optional[float] = Query(5.0, description="Radius in km for nearby issues"),
+    radius: Optional[float] = Query(5.0, gt=0, le=MAX_RADIUS_KM, description="Radius in km for nearby issues"),
     category: Optional[str] = Query(None, description="Filter by category"),
     status: Optional[str] = Query(None, description="Filter by status"),
+    search: Optional[str] = Query(None, max_length=200, description="Full-text search in descriptions; the last word matches as a prefix"),
+    min_lat: Optional[float] = Query(None, ge=-90, le=90, description="Bounding box south edge"),
+    min_lng: Optional[float] = Query(None, ge=-180, le=180, description="Bounding box west edge"),
+    max_lat: Optional[float] = Query(None, ge=-90, le=90, description="Bounding box north edge"),
+    max_lng: Optional[float] = Query(None, ge=-180, le=180, description="Bounding box east edge"),
+    sort: Optional[str] = Query(None, description="Sort by relevance (default with search), created_at, upvote_count or distance"),
+    limit: int = Query(50, ge=1, le=200, description="Number of issues to return"),
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} response header"),
     db: Session = Depends(get_db)
 ):
     """Get list of issues with optional filtering"""
+    bounds = (min_lat, min_lng, max_lat, max_lng)
+    bbox = None
+    if any(v is not None for v in bounds):
+        if any(v is None for v in bounds):
+            raise HTTPException(status_code=400, detail="Provide all of min_lat, min_lng, max_lat, max_lng")
+        if min_lat > max_lat or min_lng > max_lng:
+            raise HTTPException(status_code=400, detail="Invalid bounding box")
+        bbox = bounds
+    
     issue_service = IssueService(db)
-    issues = issue_service.get_issues(lat, lng, radius, category, status)
+    try:
+        issues = issue_service.get_issues(lat, lng, radius, category, status, search=search, sort=sort,
+                                          limit=limit, cursor=cursor, bbox=bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if issue_service.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = issue_service.next_cursor
     return issues
 
 @router.get("/my-issues", response_model=List[IssueOut])
 def get_user_issues(
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Get issues reported by current user"""
@@ -83,16 +109,16 @@ def get_issue(issue_id: int, db: Session = Depends(get_db)):
     return issue
 
 @router.post("/{issue_id}/upvote")
-def upvote_issue(issue_id: int, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+def upvote_issue(issue_id: int, current_user: dict = Depends(get_current_principal), db: Session = Depends(get_db)):
     """Upvote an issue (same issue counter)"""
     issue_service = IssueService(db)
     result = issue_service.upvote_issue(issue_id, current_user["id"])
     if not result.get("success"):
         raise HTTPException(status_code=404, detail="Issue not found")
-    return {"success": True, "message": "Issue upvoted successfully", "upvoted_at": result.get("upvoted_at"), "issue_updated_at": result.get("issue_updated_at")}
+    return {"success": True, "message": "Issue upvoted successfully", "action": result.get("action"), "upvote_count": result.get("upvote_count"), "upvoted_at": result.get("upvoted_at"), "issue_updated_at": result.get("issue_updated_at")}
 
 @router.patch("/{issue_id}/status")
-def update_status(issue_id: int, status_update: dict, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+def update_status(issue_id: int, status_update: dict, current_user: dict = Depends(get_current_principal), db: Session = Depends(get_db)):
     """Update issue status - only for assigned admins"""
     issue_service = IssueService(db)
     
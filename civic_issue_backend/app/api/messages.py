@@ -1,12 +1,11 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
-from app.core.security import get_current_user
-from app.core.db import get_db
+from app.core.security import get_current_principal
+from app.core.db import get_db, get_async_db
 from app.services.issue_service import IssueService
-from app.services.message_service import MessageService
-from app.models.user import User
+from app.services.message_service import MessageService, can_access_chat
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
 router = APIRouter()
@@ -26,40 +25,34 @@ class MessageOut(BaseModel):
     class Config:
         from_attributes = True
 
+def _require_chat_access(access: Optional[dict], principal: dict, admin_detail: str):
+    """Raise unless the caller is the issue's reporter or its assigned admin"""
+    if access is None:
+        raise HTTPException(status_code=404, detail="Issue not found")
+    if not can_access_chat(access, principal):
+        raise HTTPException(status_code=403, detail=admin_detail if principal["role"] == "admin" else "Access denied")
+
 @router.post("/issues/{issue_id}/messages")
 async def send_message(
     issue_id: int,
     message_data: MessageCreate,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: dict = Depends(get_current_principal),
+    db = Depends(get_async_db)
 ):
     """Send a message in issue chat"""
-    issue_service = IssueService(db)
     message_service = MessageService(db)
     
-    # Check if user has access to this issue
-    issue = issue_service.get_issue(issue_id)
-    if not issue:
-        raise HTTPException(status_code=404, detail="Issue not found")
-    
     # Check if user is the reporter or assigned admin
     user_id = current_user["id"]
-    is_admin = db.query(User).filter(User.id == user_id, User.role == "admin").first()
-    
-    # If user is admin, check if they are assigned to this issue
-    if is_admin and issue.get("assigned_admin_id") != user_id:
-        raise HTTPException(status_code=403, detail="You can only chat on issues assigned to you")
-    
-    # If user is not admin, check if they are the reporter
-    if not is_admin and issue["reporter_id"] != user_id:
-        raise HTTPException(status_code=403, detail="Access denied")
+    access = await message_service.get_chat_access(issue_id)
+    _require_chat_access(access, current_user, "You can only chat on issues assigned to you")
     
     # Send message
     result = await message_service.send_message(
         issue_id=issue_id,
         sender_id=user_id,
         message_text=message_data.message,
-        is_admin_message=bool(is_admin)
+        is_admin_message=current_user["role"] == "admin"
     )
     
     if not result["success"]:
@@ -68,39 +61,24 @@ async def send_message(
     return {"success": True, "message_id": result["message_id"]}
 
 @router.get("/issues/{issue_id}/messages", response_model=List[MessageOut])
-def get_issue_messages(
+async def get_issue_messages(
     issue_id: int,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: dict = Depends(get_current_principal),
+    db = Depends(get_async_db)
 ):
     """Get all messages for an issue"""
-    issue_service = IssueService(db)
     message_service = MessageService(db)
     
-    # Check if user has access to this issue
-    issue = issue_service.get_issue(issue_id)
-    if not issue:
-        raise HTTPException(status_code=404, detail="Issue not found")
-    
     # Check if user is the reporter or assigned admin
-    user_id = current_user["id"]
-    is_admin = db.query(User).filter(User.id == user_id, User.role == "admin").first()
-    
-    # If user is admin, check if they are assigned to this issue
-    if is_admin and issue.get("assigned_admin_id") != user_id:
-        raise HTTPException(status_code=403, detail="You can only view messages for issues assigned to you")
-    
-    # If user is not admin, check if they are the reporter
-    if not is_admin and issue["reporter_id"] != user_id:
-        raise HTTPException(status_code=403, detail="Access denied")
+    access = await message_service.get_chat_access(issue_id)
+    _require_chat_access(access, current_user, "You can only view messages for issues assigned to you")
     
-    messages = message_service.get_issue_messages(issue_id)
-    return messages
+    return await message_service.get_issue_messages(issue_id)
 
 @router.patch("/issues/{issue_id}/read")
 def mark_messages_as_read(
     issue_id: int,
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Mark all messages for an issue as read"""
@@ -114,7 +92,7 @@ def mark_messages_as_read(
     
     # Check if user is the reporter or assigned admin
     user_id = current_user["id"]
-    is_admin = db.query(User).filter(User.id == user_id, User.role == "admin").first()
+    is_admin = current_user["role"] == "admin"
     
     # If user is admin, check if they are assigned to this issue
     if is_admin and issue.get("assigned_admin_id") != user_id:
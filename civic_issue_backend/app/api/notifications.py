@@ -1,12 +1,56 @@
-from fastapi import APIRouter, WebSocket, Depends, Query, HTTPException
-from app.core.websocket import manager
-from app.core.security import get_current_user
+from fastapi import APIRouter, WebSocket, Depends, Query, HTTPException, Response
+from app.core.websocket import issue_channel, manager
+from app.core.security import decode_token, get_current_principal
 from app.core.db import get_db
+from app.core.pagination import NEXT_CURSOR_HEADER
 from sqlalchemy.orm import Session
 from app.models.user import User
+from app.schemas.notification import NotificationOut
+from app.services.inbox_service import InboxService
+from app.services.message_service import MessageService, can_access_chat
+from typing import List, Optional
 
 router = APIRouter()
 
+@router.get("/inbox", response_model=List[NotificationOut])
+def get_inbox(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200, description="Number of notifications to return"),
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} response header"),
+    unread_only: bool = Query(False, description="Only unread notifications"),
+    current_user: dict = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Current user's notifications, newest first; unread count changes arrive as inbox_changed over /ws/updates"""
+    inbox_service = InboxService(db)
+    try:
+        notifications = inbox_service.get_notifications(current_user["id"], limit=limit, cursor=cursor, unread_only=unread_only)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if inbox_service.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = inbox_service.next_cursor
+    return notifications
+
+@router.get("/inbox/unread-count")
+def get_unread_count(current_user: dict = Depends(get_current_principal), db: Session = Depends(get_db)):
+    """Unread badge count (a counter lookup, not a COUNT query)"""
+    return {"unread_count": InboxService(db).unread_count(current_user["id"])}
+
+@router.patch("/inbox/{notification_id}/read")
+def mark_inbox_notification_read(notification_id: int, current_user: dict = Depends(get_current_principal), db: Session = Depends(get_db)):
+    """Mark one notification read"""
+    unread_count = InboxService(db).mark_read(current_user["id"], notification_id)
+    if unread_count is None:
+        raise HTTPException(status_code=404, detail="Notification not found")
+    return {"success": True, "unread_count": unread_count}
+
+@router.patch("/inbox/read-all")
+def mark_inbox_read(current_user: dict = Depends(get_current_principal), db: Session = Depends(get_db)):
+    """Mark every notification read"""
+    inbox_service = InboxService(db)
+    marked = inbox_service.mark_all_read(current_user["id"])
+    return {"success": True, "marked": marked, "unread_count": inbox_service.unread_count(current_user["id"])}
+
 @router.websocket("/ws/updates/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: int, token: str = Query(...)):
     """WebSocket for user-specific live updates with authentication"""
@@ -43,13 +87,13 @@ async def websocket_endpoint(websocket: WebSocket, user_id: int, token: str = Qu
         await websocket.accept()
         await manager.connect(websocket, user_id)
         
-        await websocket.send_json({"message": f"Connected to updates for user {user_id}"})
+        await manager.send_personal(websocket, {"message": f"Connected to updates for user {user_id}"})
         
         try:
             while True:
                 data = await websocket.receive_text()
                 # Echo back for testing, in production this would handle specific commands
-                await websocket.send_json({"user_id": user_id, "message": data})
+                await manager.send_personal(websocket, {"user_id": user_id, "message": data})
         except Exception as e:
             print(f"WebSocket connection error: {e}")
             await manager.disconnect(websocket, user_id)
@@ -58,14 +102,38 @@ async def websocket_endpoint(websocket: WebSocket, user_id: int, token: str = Qu
         print(f"WebSocket error: {e}")
         await manager.disconnect(websocket, user_id)
 
+async def _issue_chat_access(issue_id: int) -> Optional[dict]:
+    from app.core.db import SessionLocal
+    db = SessionLocal()
+    try:
+        return await MessageService(db).get_chat_access(issue_id)
+    finally:
+        db.close()
+
 @router.websocket("/updates/{issue_id}")
-async def issue_websocket_endpoint(websocket: WebSocket, issue_id: int):
-    """WebSocket for issue-specific updates (legacy support)"""
-    await manager.connect(websocket)
+async def issue_websocket_endpoint(websocket: WebSocket, issue_id: int, token: str = Query(...)):
+    """WebSocket for one issue's status and upvote updates (legacy support).
+
+    Open to the same users as the issue's chat (reporter or assigned admin);
+    chat messages themselves arrive per user over /ws/updates.
+    """
+    try:
+        payload = decode_token(token)
+        principal = await get_current_principal({"id": int(payload.get("sub"))})
+    except (HTTPException, TypeError, ValueError):
+        await websocket.close(code=1008, reason="Invalid token")
+        return
+    if not can_access_chat(await _issue_chat_access(issue_id), principal):
+        await websocket.close(code=1008, reason="Access denied")
+        return
+
+    await websocket.accept()
+    await manager.connect(websocket, broadcast=False)
+    manager.subscribe(websocket, issue_channel(issue_id))
     try:
-        await websocket.send_json({"message": f"Subscribed to updates for issue {issue_id}"})
+        await manager.send_personal(websocket, {"message": f"Subscribed to updates for issue {issue_id}"})
         while True:
-            data = await websocket.receive_text()
-            await manager.broadcast({"issue_id": issue_id, "message": data})
+            # Subscribers only listen; inbound frames are keep-alives
+            await websocket.receive_text()
     except Exception:
         await manager.disconnect(websocket)
@@ -4,14 +4,14 @@ from app.schemas.user import UserOut, UserUpdate
 from app.schemas.issue import IssueOut
 from app.services.auth_service import AuthService
 from app.services.issue_service import IssueService
-from app.core.security import get_current_user
+from app.core.security import get_current_principal
 from app.core.db import get_db
 from typing import List
 
 router = APIRouter()
 
 @router.get("/me", response_model=UserOut)
-def get_me(current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_me(current_user: dict = Depends(get_current_principal), db: Session = Depends(get_db)):
     auth_service = AuthService(db)
     user = auth_service.get_user(current_user["id"])
     if not user:
@@ -21,7 +21,7 @@ def get_me(current_user: dict = Depends(get_current_user), db: Session = Depends
 @router.put("/me", response_model=UserOut)
 def update_profile(
     user_update: UserUpdate,
-    current_user: dict = Depends(get_current_user), 
+    current_user: dict = Depends(get_current_principal), 
     db: Session = Depends(get_db)
 ):
     auth_service = AuthService(db)
@@ -31,7 +31,7 @@ def update_profile(
     return user
 
 @router.get("/me/issues", response_model=List[IssueOut])
-def get_my_issues(current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_my_issues(current_user: dict = Depends(get_current_principal), db: Session = Depends(get_db)):
     issue_service = IssueService(db)
     issues = issue_service.get_user_issues(current_user["id"])
     return issues
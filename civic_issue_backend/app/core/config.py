@@ -32,13 +32,97 @@ def get_obfuscated_encryption_key():
 
 class Settings(BaseSettings):
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./civic_issues.db")
+    # Async engine for chat routes (aiosqlite / asyncpg). Derived from DATABASE_URL
+    # unless set; routes fall back to the sync engine in a threadpool without a driver.
+    DB_ASYNC_ENABLED: bool = os.getenv("DB_ASYNC_ENABLED", "true").lower() == "true"
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")
+    # Connection pool for server databases (PostgreSQL etc.)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds; -1 disables
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    # SQLite connection pragmas: WAL lets readers run alongside the single writer
+    SQLITE_WAL: bool = os.getenv("SQLITE_WAL", "true").lower() == "true"
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    # Rate limits (RATE_LIMITS in core/rate_limiter.py) shared across workers via Redis;
+    # "memory" keeps them per process. Each Redis round-trip leases this fraction of a limit.
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_STORAGE: str = os.getenv("RATE_LIMIT_STORAGE", "redis").lower()
+    RATE_LIMIT_REDIS_URL: str = os.getenv("RATE_LIMIT_REDIS_URL", "")  # defaults to REDIS_URL
+    RATE_LIMIT_LEASE_FRACTION: float = float(os.getenv("RATE_LIMIT_LEASE_FRACTION", "0.1"))
+    # WebSocket fan-out across workers ("redis" pub/sub or "memory" for a single worker).
+    # Each connection buffers up to WS_SEND_QUEUE_SIZE messages; when full the oldest is
+    # dropped ("drop") or the client is disconnected ("disconnect").
+    WS_PUBSUB_BACKEND: str = os.getenv("WS_PUBSUB_BACKEND", "redis").lower()
+    WS_PUBSUB_REDIS_URL: str = os.getenv("WS_PUBSUB_REDIS_URL", "")  # defaults to REDIS_URL
+    WS_SEND_QUEUE_SIZE: int = int(os.getenv("WS_SEND_QUEUE_SIZE", "100"))
+    WS_SEND_TIMEOUT_SECONDS: float = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "5"))
+    WS_SLOW_CONSUMER_POLICY: str = os.getenv("WS_SLOW_CONSUMER_POLICY", "drop").lower()
+    # Updates to one issue within this window go out as a single message to its subscribers
+    WS_ISSUE_COALESCE_MS: int = int(os.getenv("WS_ISSUE_COALESCE_MS", "100"))
+    # Notification outbox: the dispatcher pushes queued notifications in batches, retrying
+    # failures after NOTIFICATION_RETRY_BASE_SECONDS * 2^(attempt-1) up to MAX_ATTEMPTS tries
+    NOTIFICATION_DISPATCH_ENABLED: bool = os.getenv("NOTIFICATION_DISPATCH_ENABLED", "true").lower() == "true"
+    NOTIFICATION_BATCH_SIZE: int = int(os.getenv("NOTIFICATION_BATCH_SIZE", "100"))
+    NOTIFICATION_POLL_INTERVAL_MS: int = int(os.getenv("NOTIFICATION_POLL_INTERVAL_MS", "1000"))
+    NOTIFICATION_MAX_ATTEMPTS: int = int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", "5"))
+    NOTIFICATION_RETRY_BASE_SECONDS: float = float(os.getenv("NOTIFICATION_RETRY_BASE_SECONDS", "2"))
+    # Read notifications older than this are moved to notification_archive (scripts/archive_notifications.py)
+    NOTIFICATION_RETENTION_DAYS: int = int(os.getenv("NOTIFICATION_RETENTION_DAYS", "30"))
+    # Key anonymous clients by X-Real-IP / X-Forwarded-For (only behind the bundled nginx)
+    RATE_LIMIT_TRUST_PROXY: bool = os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() == "true"
     S3_BUCKET: str = os.getenv("S3_BUCKET", "civic-issues")
+    # Hosts (comma separated) whose image URLs may be fetched for duplicate fingerprints,
+    # i.e. the S3/MinIO storage. Issue creation hashes up to IMAGE_FETCH_MAX_PER_ISSUE of them
+    # in parallel and waits at most IMAGE_FETCH_SUBMIT_TIMEOUT_SECONDS; the rest are hashed
+    # after the response (IssueService.fill_remote_fingerprints)
+    IMAGE_FETCH_ALLOWED_HOSTS: str = os.getenv("IMAGE_FETCH_ALLOWED_HOSTS", "")
+    IMAGE_FETCH_MAX_PER_ISSUE: int = int(os.getenv("IMAGE_FETCH_MAX_PER_ISSUE", "5"))
+    IMAGE_FETCH_SUBMIT_TIMEOUT_SECONDS: float = float(os.getenv("IMAGE_FETCH_SUBMIT_TIMEOUT_SECONDS", "2"))
+    IMAGE_FETCH_WORKERS: int = int(os.getenv("IMAGE_FETCH_WORKERS", "8"))
+    # Password hashing pool (core/password_hasher.py): threads running bcrypt, calls allowed to
+    # wait for one before /auth answers 503, and the bcrypt cost (older hashes upgrade on login)
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
     SECRET_KEY: str = os.getenv("SECRET_KEY", "supersecret")
+    # HMAC key for users.phone_number_hash lookups (core/phone_digest.py); defaults to SECRET_KEY
+    PHONE_DIGEST_KEY: str = os.getenv("PHONE_DIGEST_KEY", "")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ENCRYPTION_KEY: str = ""  # Will be set by property
+    # Retired encryption keys (comma separated, same formats as ENCRYPTION_KEY) that still
+    # decrypt during a rotation; see core/encryption.py
+    ENCRYPTION_PREVIOUS_KEYS: str = os.getenv("ENCRYPTION_PREVIOUS_KEYS", "")
     YOLO_MODEL_PATH: str = os.getenv("YOLO_MODEL_PATH", "models/yolo/best.pt")
+    # Detector backend: "ultralytics" (best.pt via torch) or "onnx" (best.onnx via onnxruntime)
+    AI_DETECTOR_BACKEND: str = os.getenv("AI_DETECTOR_BACKEND", "ultralytics").lower()
+    YOLO_ONNX_PATH: str = os.getenv("YOLO_ONNX_PATH", "app/models/yolo/best.onnx")
+    AI_INPUT_SIZE: int = int(os.getenv("AI_INPUT_SIZE", "640"))
+    ONNX_INTRA_OP_THREADS: int = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))  # 0 = onnxruntime default
+    ONNX_INTER_OP_THREADS: int = int(os.getenv("ONNX_INTER_OP_THREADS", "0"))
     AI_ENABLE_AUTOTAG: bool = os.getenv("AI_ENABLE_AUTOTAG", "false").lower() == "true"
+    # Inference engine micro-batching: max images per forward pass, and how long
+    # the first queued image may wait for others to join its batch
+    AI_BATCH_MAX_SIZE: int = int(os.getenv("AI_BATCH_MAX_SIZE", "8"))
+    AI_BATCH_MAX_WAIT_MS: float = float(os.getenv("AI_BATCH_MAX_WAIT_MS", "10"))
+    AI_QUEUE_MAX_SIZE: int = int(os.getenv("AI_QUEUE_MAX_SIZE", "256"))
+
+    # Coalesce issues.upvote_count updates in memory and write them every interval
+    UPVOTE_WRITE_BEHIND: bool = os.getenv("UPVOTE_WRITE_BEHIND", "false").lower() == "true"
+    UPVOTE_FLUSH_INTERVAL_MS: float = float(os.getenv("UPVOTE_FLUSH_INTERVAL_MS", "500"))
+
+    # Department -> admin candidate lists are cached per process; local user
+    # changes invalidate immediately, changes made by other workers within this TTL
+    ADMIN_CACHE_TTL_SECONDS: float = float(os.getenv("ADMIN_CACHE_TTL_SECONDS", "60"))
+
+    # Role/department/is_active of callers are cached per process (core/security.py); local
+    # changes evict immediately, changes made by other workers show within this TTL
+    PRINCIPAL_CACHE_TTL_SECONDS: float = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "30"))
+    PRINCIPAL_CACHE_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
     
     # ✅ Load from .env, not hardcoded
     HCAPTCHA_SECRET_KEY: str = os.getenv("HCAPTCHA_SECRET_KEY", "")
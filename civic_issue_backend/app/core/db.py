@@ -1,18 +1,55 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
+from starlette.concurrency import run_in_threadpool
 from app.core.config import settings
 
-# Configure SQLite for better compatibility
-connect_args = {}
-if settings.DATABASE_URL.startswith("sqlite"):
-    connect_args = {"check_same_thread": False}
-
-engine = create_engine(
-    settings.DATABASE_URL, 
-    echo=False, 
-    future=True,
-    connect_args=connect_args
-)
+try:
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+except ImportError:  # greenlet not installed
+    AsyncSession = None
+
+SQLITE_SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Per-connection SQLite tuning; WAL persists in the file, the rest is per connection"""
+    synchronous = settings.SQLITE_SYNCHRONOUS
+    if synchronous not in SQLITE_SYNCHRONOUS_MODES:
+        raise ValueError(f"SQLITE_SYNCHRONOUS must be one of {', '.join(SQLITE_SYNCHRONOUS_MODES)}")
+    cursor = dbapi_connection.cursor()
+    if settings.SQLITE_WAL:
+        cursor.execute("PRAGMA journal_mode=WAL")
+    # NORMAL is durable under WAL except for the last commits on power loss
+    cursor.execute(f"PRAGMA synchronous={synchronous}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.close()
+
+def pool_options(url: str) -> dict:
+    """create_engine pool arguments from Settings (server databases only)"""
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+def make_engine(url: str, tune_sqlite: bool = True, **kwargs):
+    """Engine for url with pool settings, or connection pragmas for SQLite"""
+    is_sqlite = url.startswith("sqlite")
+    if is_sqlite:
+        # Configure SQLite for better compatibility
+        kwargs.setdefault("connect_args", {"check_same_thread": False})
+    new_engine = create_engine(url, echo=False, future=True, **pool_options(url), **kwargs)
+    if is_sqlite and tune_sqlite:
+        event.listen(new_engine, "connect", _set_sqlite_pragmas)
+    return new_engine
+
+engine = make_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -23,39 +60,85 @@ def get_db():
     finally:
         db.close()
 
+# Async drivers used for the optional async engine, by URL scheme
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+def async_database_url(url: str):
+    """Async-driver equivalent of a sync DATABASE_URL, or None if unsupported"""
+    scheme, sep, rest = url.partition("://")
+    driver = ASYNC_DRIVERS.get(scheme.split("+")[0])
+    return f"{driver}://{rest}" if sep and driver else None
+
+async_engine = None
+AsyncSessionLocal = None
+_async_url = settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL)
+if settings.DB_ASYNC_ENABLED and AsyncSession is not None and _async_url:
+    try:
+        async_engine = create_async_engine(_async_url, echo=False, **pool_options(_async_url))
+        if _async_url.startswith("sqlite"):
+            event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+        # Objects stay usable after commit; async sessions cannot lazy-load expired attributes
+        AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+    except ImportError:  # aiosqlite / asyncpg not installed
+        async_engine = None
+
+async def get_async_db():
+    """Session for async routes: an AsyncSession when an async driver is
+    installed, otherwise a sync Session. Use run_db() to work with either."""
+    if AsyncSessionLocal is None:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+        return
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def run_db(db, fn, *args, **kwargs):
+    """Run fn(sync_session, *args) without blocking the event loop.
+
+    With an AsyncSession the function runs through ``run_sync`` on the async
+    driver; with a sync Session it runs in the threadpool.
+    """
+    if AsyncSession is not None and isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+async def dispose_async_engine():
+    if async_engine is not None:
+        await async_engine.dispose()
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "alembic.ini")
+
+def alembic_config(connection=None):
+    """Alembic config for this backend, optionally bound to an open connection"""
+    from alembic.config import Config
+
+    config = Config(ALEMBIC_INI)
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
 def create_tables():
-    """Create all database tables"""
+    """Create or migrate all database tables.
+
+    A brand-new database is built from the models and stamped at the latest
+    revision; any existing database (including ones created before Alembic was
+    introduced) is brought up to date with ``alembic upgrade head``.
+    """
+    from alembic import command
+    from sqlalchemy import inspect
     from app.models import User, Issue, Upvote
-    Base.metadata.create_all(bind=engine)
-    # Lightweight migrations for SQLite: add missing columns if needed
-    try:
-        if settings.DATABASE_URL.startswith("sqlite"):
-            with engine.connect() as conn:
-                cols = conn.exec_driver_sql("PRAGMA table_info(issues)").fetchall()
-                col_names = {c[1] for c in cols}
-                if "is_anonymous" not in col_names:
-                    conn.exec_driver_sql("ALTER TABLE issues ADD COLUMN is_anonymous BOOLEAN DEFAULT 0")
-                # Address columns
-                if "address_line1" not in col_names:
-                    conn.exec_driver_sql("ALTER TABLE issues ADD COLUMN address_line1 VARCHAR(200)")
-                if "address_line2" not in col_names:
-                    conn.exec_driver_sql("ALTER TABLE issues ADD COLUMN address_line2 VARCHAR(200)")
-                if "street" not in col_names:
-                    conn.exec_driver_sql("ALTER TABLE issues ADD COLUMN street VARCHAR(100)")
-                if "landmark" not in col_names:
-                    conn.exec_driver_sql("ALTER TABLE issues ADD COLUMN landmark VARCHAR(100)")
-                if "pincode" not in col_names:
-                    conn.exec_driver_sql("ALTER TABLE issues ADD COLUMN pincode VARCHAR(20)")
-                if "is_verified" not in col_names:
-                    conn.exec_driver_sql("ALTER TABLE issues ADD COLUMN is_verified BOOLEAN DEFAULT 1")
-                if "severity_score" not in col_names:
-                    conn.exec_driver_sql("ALTER TABLE issues ADD COLUMN severity_score FLOAT DEFAULT 0.5")
-                
-                # Check users table for profile picture
-                user_cols = conn.exec_driver_sql("PRAGMA table_info(users)").fetchall()
-                user_col_names = {c[1] for c in user_cols}
-                if "profile_picture_url" not in user_col_names:
-                    conn.exec_driver_sql("ALTER TABLE users ADD COLUMN profile_picture_url VARCHAR(500)")
-    except Exception:
-        # Best-effort migration; ignore if fails
-        pass
+
+    with engine.begin() as conn:
+        config = alembic_config(conn)
+        if not inspect(conn).has_table("issues"):
+            Base.metadata.create_all(bind=conn)
+            command.stamp(config, "head")
+        else:
+            command.upgrade(config, "head")
@@ -1,8 +1,23 @@
-import os
+"""
+AES-256-GCM for the encrypted login/register protocol.
+
+The key material is resolved and the AESGCM objects are built once, into an
+immutable CryptoContext that every call shares (AESGCM is safe to use from
+several threads). reload_crypto_context() builds a new context and swaps it
+in, so a rotated key takes effect without a restart.
+
+Each key has an ID: the first 8 bytes of SHA-256 of the key, in hex. The
+active key encrypts; keys listed in ENCRYPTION_PREVIOUS_KEYS still decrypt, so
+ciphertexts made with the old key keep working while clients pick up the new
+one from /encryption/config. A ciphertext that names its key ID is opened
+with that key alone. Otherwise the active key is tried first, then the
+previous keys; GCM authentication rejects a wrong key.
+"""
 import json
 import base64
 import secrets
-from typing import Any, Dict
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from hashlib import sha256
@@ -10,6 +25,8 @@ from hashlib import sha256
 from app.core.config import settings
 from app.core.key_manager import get_aad_string
 
+NONCE_SIZE = 12
+
 
 def _get_aad_value() -> bytes:
     """Get the obfuscated AAD string"""
@@ -24,12 +41,12 @@ def _get_aad_value() -> bytes:
 AAD_VALUE: bytes = _get_aad_value()
 
 
-def _get_aesgcm_key() -> bytes:
+def derive_key(key_source: Optional[str]) -> bytes:
     """
-    Returns a 32-byte key for AES-256-GCM. If ENCRYPTION_KEY is provided in settings,
-    it may be a raw 32-byte value (base64 or hex). Otherwise derive from SECRET_KEY via SHA-256.
+    Returns a 32-byte key for AES-256-GCM. key_source may be a raw 32-byte value
+    (base64 or hex); any other string is hashed, and no key at all derives one
+    from SECRET_KEY via SHA-256.
     """
-    key_source = getattr(settings, "ENCRYPTION_KEY", None)
     if key_source:
         # Try base64 then hex, otherwise use raw bytes of the string (padded/hashed)
         try:
@@ -50,43 +67,165 @@ def _get_aesgcm_key() -> bytes:
     return sha256(settings.SECRET_KEY.encode("utf-8")).digest()
 
 
+def key_id(key: bytes) -> str:
+    return sha256(key).hexdigest()[:16]
+
+
+def _b64decode_padded(value: str) -> bytes:
+    padding = '=' * ((4 - (len(value) % 4)) % 4)
+    return base64.b64decode(value + padding)
+
+
+class CryptoContext:
+    """The active key plus the retired keys that may still decrypt"""
+
+    def __init__(self, active_key: bytes, previous_keys: Sequence[bytes] = (), aad: bytes = AAD_VALUE):
+        self.aad = aad
+        self.active_key = active_key
+        self.active_kid = key_id(active_key)
+        self.previous_keys: Tuple[bytes, ...] = tuple(
+            key for key in dict.fromkeys(previous_keys) if key != active_key
+        )
+        self._ciphers: Dict[str, AESGCM] = {self.active_kid: AESGCM(active_key)}
+        for key in previous_keys:
+            self._ciphers.setdefault(key_id(key), AESGCM(key))
+        # Decryption order when the ciphertext does not say which key it used
+        self._order: Tuple[AESGCM, ...] = tuple(self._ciphers.values())
+
+    @property
+    def key_ids(self) -> List[str]:
+        return list(self._ciphers)
+
+    def encrypt(self, payload: Dict[str, Any]) -> Dict[str, str]:
+        nonce = secrets.token_bytes(NONCE_SIZE)
+        plaintext = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        ciphertext = self._ciphers[self.active_kid].encrypt(nonce, plaintext, self.aad)
+        return {
+            "nonce": base64.b64encode(nonce).decode("ascii"),
+            "ciphertext": base64.b64encode(ciphertext).decode("ascii"),
+            "kid": self.active_kid,
+        }
+
+    def decrypt(self, nonce: bytes, ciphertext: bytes, kid: Optional[str] = None) -> Dict[str, Any]:
+        if kid is not None and not isinstance(kid, str):
+            # kid comes from the request body; anything but a string is an unknown key
+            raise ValueError("Decryption failed")
+        if kid:
+            cipher = self._ciphers.get(kid)
+            candidates = (cipher,) if cipher is not None else ()
+        else:
+            candidates = self._order
+        for cipher in candidates:
+            try:
+                plaintext = cipher.decrypt(nonce, ciphertext, self.aad)
+            except Exception:
+                continue
+            try:
+                return json.loads(plaintext.decode("utf-8"))
+            except Exception as exc:
+                raise ValueError("Decryption failed") from exc
+        raise ValueError("Decryption failed")
+
+
+def _load_context() -> CryptoContext:
+    previous = [part.strip() for part in settings.ENCRYPTION_PREVIOUS_KEYS.split(",") if part.strip()]
+    return CryptoContext(derive_key(getattr(settings, "ENCRYPTION_KEY", None)), [derive_key(p) for p in previous])
+
+
+_context: CryptoContext = _load_context()
+_context_lock = threading.Lock()
+
+
+def get_crypto_context() -> CryptoContext:
+    return _context
+
+
+def reload_crypto_context(active_key: Optional[str] = None, previous_keys: Optional[Iterable[str]] = None) -> CryptoContext:
+    """Swap in a new context after a key rotation.
+
+    With no arguments the keys are read from settings again. Given only a new
+    active_key, the current active and previous keys all stay decryptable; pass
+    previous_keys explicitly (e.g. []) to choose which retired keys remain.
+    """
+    global _context
+    if active_key is None and previous_keys is None:
+        context = _load_context()
+    else:
+        current = _context
+        if previous_keys is None:
+            previous = (current.active_key, *current.previous_keys)
+        else:
+            previous = [derive_key(key) for key in previous_keys]
+        context = CryptoContext(
+            derive_key(active_key) if active_key is not None else current.active_key,
+            previous,
+        )
+    with _context_lock:
+        _context = context
+    return context
+
+
 def encrypt_payload(payload: Dict[str, Any]) -> Dict[str, str]:
     """
-    Encrypts a JSON-serializable dict and returns base64 strings for nonce and ciphertext.
-    The ciphertext includes the GCM authentication tag (cryptography AESGCM behavior).
+    Encrypts a JSON-serializable dict and returns base64 strings for nonce and ciphertext,
+    and the ID of the key used. The ciphertext includes the GCM authentication tag.
     """
-    key = _get_aesgcm_key()
-    aesgcm = AESGCM(key)
-    nonce = secrets.token_bytes(12)
-    plaintext = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
-    ciphertext = aesgcm.encrypt(nonce, plaintext, AAD_VALUE)
-    return {
-        "nonce": base64.b64encode(nonce).decode("ascii"),
-        "ciphertext": base64.b64encode(ciphertext).decode("ascii"),
-    }
-
-
-def decrypt_payload(nonce_b64: str, ciphertext_b64: str) -> Dict[str, Any]:
+    return _context.encrypt(payload)
+
+
+def decrypt_payload(nonce_b64: str, ciphertext_b64: str, kid: Optional[str] = None) -> Dict[str, Any]:
     """
     Decrypts base64-encoded nonce and ciphertext (with GCM tag) and returns the dict payload.
     Raises ValueError on failure.
     """
-    key = _get_aesgcm_key()
-    aesgcm = AESGCM(key)
-    def _pad_b64(value: str) -> bytes:
-        padding = '=' * ((4 - (len(value) % 4)) % 4)
-        return base64.b64decode(value + padding)
     try:
-        nonce = _pad_b64(nonce_b64)
-        ciphertext = _pad_b64(ciphertext_b64)
-        plaintext = aesgcm.decrypt(nonce, ciphertext, AAD_VALUE)
-        return json.loads(plaintext.decode("utf-8"))
+        nonce = _b64decode_padded(nonce_b64)
+        ciphertext = _b64decode_padded(ciphertext_b64)
+    except Exception as exc:
+        raise ValueError("Decryption failed") from exc
+    return _context.decrypt(nonce, ciphertext, kid)
+
+
+def decrypt_packed(packed_b64: str, kid: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Decrypts the packed form base64(nonce || ciphertext) used for single login fields.
+    Raises ValueError on failure.
+    """
+    try:
+        raw = _b64decode_padded(packed_b64)
     except Exception as exc:
         raise ValueError("Decryption failed") from exc
+    if len(raw) < NONCE_SIZE:
+        raise ValueError("Invalid packed data")
+    return _context.decrypt(raw[:NONCE_SIZE], raw[NONCE_SIZE:], kid)
+
+
+def decrypt_packed_many(packed_values: Iterable[Optional[str]], kid: Optional[str] = None) -> List[Optional[Dict[str, Any]]]:
+    """
+    Decrypts several packed fields against one context snapshot, so a key
+    rotation mid-request cannot split them across keys. Entries that are None
+    or fail to decrypt come back as None.
+    """
+    context = _context
+    results: List[Optional[Dict[str, Any]]] = []
+    for packed_b64 in packed_values:
+        result = None
+        if packed_b64 is not None:
+            try:
+                raw = _b64decode_padded(packed_b64)
+                if len(raw) >= NONCE_SIZE:
+                    result = context.decrypt(raw[:NONCE_SIZE], raw[NONCE_SIZE:], kid)
+            except Exception:
+                pass
+        results.append(result)
+    return results
 
 
 def get_key_b64() -> str:
     """Returns the active 32-byte AES-GCM key in base64 (for client use)."""
-    return base64.b64encode(_get_aesgcm_key()).decode("ascii")
+    return base64.b64encode(_context.active_key).decode("ascii")
 
 
+def get_key_id() -> str:
+    """ID of the active key"""
+    return _context.active_kid
@@ -0,0 +1,83 @@
+"""
+Full-text index over issue descriptions.
+
+SQLite: issues_fts, an FTS5 table with external content (the text lives only
+in issues) using the porter stemmer and prefix indexes for 2 and 3 character
+prefixes. Triggers on issues keep it in sync on insert, delete and changes to
+description; upvote and status updates do not touch it. Ranked by bm25().
+
+PostgreSQL: issues.search_vector, a stored generated tsvector ('english'
+config) with a GIN index; the database maintains it. Ranked by ts_rank_cd().
+
+Other databases fall back to LIKE '%term%'. The index is created by the
+a8c2e4f6b1d9 migration, or with the issues table on a brand-new database.
+Note that SQLite batch migrations that rebuild issues drop the triggers;
+such a migration must call create_issue_search_index() again.
+"""
+import re
+from typing import List, Optional
+
+FTS_TABLE = "issues_fts"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "description, content='issues', content_rowid='id', "
+    "tokenize='porter unicode61 remove_diacritics 2', prefix='2 3')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON issues BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, description) VALUES (new.id, new.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON issues BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description) VALUES ('delete', old.id, old.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF description ON issues BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description) VALUES ('delete', old.id, old.description); "
+    f"INSERT INTO {FTS_TABLE}(rowid, description) VALUES (new.id, new.description); END",
+    # Index the rows that already exist
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+_POSTGRES_DDL = [
+    "ALTER TABLE issues ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('english', coalesce(description, ''))) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_issues_search_vector ON issues USING gin (search_vector)",
+]
+
+
+def backend(dialect_name: str) -> Optional[str]:
+    """'fts5', 'tsvector', or None when only LIKE is available"""
+    return {"sqlite": "fts5", "postgresql": "tsvector"}.get(dialect_name)
+
+
+def create_issue_search_index(connection):
+    """Create the full-text index for the connection's database and index existing rows"""
+    kind = backend(connection.dialect.name)
+    statements = _SQLITE_DDL if kind == "fts5" else _POSTGRES_DDL if kind == "tsvector" else []
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+
+
+def drop_issue_search_index(connection):
+    kind = backend(connection.dialect.name)
+    if kind == "fts5":
+        for suffix in ("ai", "ad", "au"):
+            connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif kind == "tsvector":
+        connection.exec_driver_sql("DROP INDEX IF EXISTS ix_issues_search_vector")
+        connection.exec_driver_sql("ALTER TABLE issues DROP COLUMN IF EXISTS search_vector")
+
+
+def search_terms(search: str) -> List[str]:
+    """Words of a user's search string; punctuation and query operators are dropped"""
+    return _TOKEN_RE.findall(search or "")
+
+
+def match_query(terms: List[str], kind: str) -> str:
+    """All terms must match; the last one also as a prefix, for search-as-you-type"""
+    if kind == "fts5":
+        quoted = ['"' + term.replace('"', '') + '"' for term in terms]
+        quoted[-1] += "*"
+        return " AND ".join(quoted)
+    parts = list(terms)
+    parts[-1] += ":*"
+    return " & ".join(parts)
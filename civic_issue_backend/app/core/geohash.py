@@ -0,0 +1,138 @@
+"""
+Geohash helpers used for spatial indexing of issues.
+
+Issues store a geohash of their coordinates so radius queries can be answered
+with indexed prefix-range scans instead of a bounding box over unindexed
+lat/lng columns.
+"""
+import math
+from typing import List, Tuple
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+STORED_PRECISION = 9  # ~4.8m x 4.8m cells
+MAX_COVER_CELLS = 16
+
+# Web-map zoom level -> geohash precision for heatmap cells (roughly 8-32 cells per tile edge)
+ZOOM_PRECISION = ((2, 1), (5, 2), (7, 3), (10, 4), (12, 5), (15, 6), (17, 7))
+
+KM_PER_DEGREE = 111.32
+
+
+def encode(lat: float, lng: float, precision: int = STORED_PRECISION) -> str:
+    """Encode a coordinate pair as a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # geohash interleaves bits starting with longitude
+
+    while len(chars) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if lng >= mid:
+                bits = (bits << 1) | 1
+                lng_range[0] = mid
+            else:
+                bits <<= 1
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if lat >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """Return the (lat, lng) size in degrees of a cell at the given precision"""
+    total_bits = precision * 5
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def bounding_boxes(lat: float, lng: float, radius_km: float) -> List[Tuple[float, float, float, float]]:
+    """Return one or two boxes enclosing a circle, split at the antimeridian"""
+    lat_delta = radius_km / KM_PER_DEGREE
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    lng_delta = radius_km / (KM_PER_DEGREE * cos_lat)
+    min_lat, max_lat = max(lat - lat_delta, -90.0), min(lat + lat_delta, 90.0)
+    if lng_delta >= 180.0:
+        return [(min_lat, -180.0, max_lat, 180.0)]
+    west, east = lng - lng_delta, lng + lng_delta
+    if west < -180.0:
+        return [(min_lat, -180.0, max_lat, east), (min_lat, west + 360.0, max_lat, 180.0)]
+    if east > 180.0:
+        return [(min_lat, west, max_lat, 180.0), (min_lat, -180.0, max_lat, east - 360.0)]
+    return [(min_lat, west, max_lat, east)]
+
+
+def cells_for_bbox(min_lat: float, min_lng: float, max_lat: float, max_lng: float,
+                   max_cells: int = MAX_COVER_CELLS) -> List[str]:
+    """Return the finest set of geohash prefixes (at most max_cells) covering a bbox"""
+    for precision in range(STORED_PRECISION, 0, -1):
+        lat_step, lng_step = cell_size(precision)
+        lat_start = -90.0 + math.floor((min_lat + 90.0) / lat_step) * lat_step
+        lng_start = -180.0 + math.floor((min_lng + 180.0) / lng_step) * lng_step
+        rows = int(math.floor((max_lat - lat_start) / lat_step)) + 1
+        cols = int(math.floor((max_lng - lng_start) / lng_step)) + 1
+        if rows * cols > max_cells and precision > 1:
+            continue
+
+        cells = []
+        for row in range(rows):
+            cell_lat = min(lat_start + (row + 0.5) * lat_step, 90.0)
+            for col in range(cols):
+                cell_lng = min(lng_start + (col + 0.5) * lng_step, 180.0)
+                cell = encode(cell_lat, cell_lng, precision)
+                if cell not in cells:
+                    cells.append(cell)
+        return cells
+    return []
+
+
+def cells_for_radius(lat: float, lng: float, radius_km: float,
+                     max_cells: int = MAX_COVER_CELLS) -> List[str]:
+    """Return geohash prefixes whose union covers a circle around (lat, lng)"""
+    boxes = bounding_boxes(lat, lng, radius_km)
+    cells = []
+    for box in boxes:
+        for cell in cells_for_bbox(*box, max_cells=max(max_cells // len(boxes), 1)):
+            if cell not in cells:
+                cells.append(cell)
+    return cells
+
+
+def precision_for_zoom(zoom: int) -> int:
+    """Return the geohash precision used to bucket a heatmap at a map zoom level"""
+    for max_zoom, precision in ZOOM_PRECISION:
+        if zoom <= max_zoom:
+            return precision
+    return min(8, STORED_PRECISION)
+
+
+def prefix_upper_bound(prefix: str) -> str:
+    """Return the smallest string greater than every geohash starting with prefix.
+
+    Lets prefix lookups run as ``geohash >= prefix AND geohash < upper`` range
+    scans, which use a B-tree index on every backend (unlike ``LIKE 'x%'``).
+    """
+    chars = list(prefix)
+    while chars:
+        idx = BASE32.index(chars[-1])
+        if idx + 1 < len(BASE32):
+            chars[-1] = BASE32[idx + 1]
+            return "".join(chars)
+        chars.pop()
+    return "~"
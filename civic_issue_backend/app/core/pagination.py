@@ -0,0 +1,128 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is an opaque, URL-safe token encoding the sort key name and
+direction plus the (sort value, id) of the last row on a page. The next page is fetched with an
+indexed ``(sort_value, id) < (last_value, last_id)`` range condition instead of
+OFFSET, so every page costs the same regardless of depth and pages do not shift
+when new rows are inserted.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import and_, or_, tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _direction(descending: bool) -> str:
+    return "desc" if descending else "asc"
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def encode_cursor(sort_name: str, value: Any, row_id: int, descending: bool = True) -> str:
+    """Build an opaque cursor for the row (value, row_id) under sort_name"""
+    payload = json.dumps([sort_name, _to_json(value), row_id, _direction(descending)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_name: str, descending: bool = True) -> Tuple[Any, int]:
+    """Return the (value, row_id) stored in a cursor; raises ValueError if invalid.
+
+    The value is returned as decoded from JSON; callers check it against the
+    type of their sort key (see cursor_value).
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        name, value, row_id, direction = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if name != sort_name or direction != _direction(descending):
+        raise ValueError("Cursor does not match the requested sort order")
+    if not isinstance(row_id, int) or isinstance(row_id, bool):
+        raise ValueError("Invalid cursor")
+    return value, row_id
+
+
+def cursor_value(value: Any, sort_column) -> Any:
+    """Check a decoded cursor value against the sort column's type and convert it"""
+    if value is None:
+        return None
+    try:
+        python_type = sort_column.type.python_type
+    except NotImplementedError:
+        python_type = None
+    if python_type is datetime and isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    elif python_type is int and isinstance(value, int) and not isinstance(value, bool):
+        return value
+    elif python_type is float and _is_number(value):
+        return float(value)
+    elif python_type is str and isinstance(value, str):
+        return value
+    raise ValueError("Invalid cursor")
+
+
+def keyset_paginate(query, sort_name: str, sort_column, id_column, descending: bool = True,
+                    cursor: Optional[str] = None, limit: int = 50, offset: int = 0) -> Tuple[List[Any], Optional[str]]:
+    """Order query by (sort_column, id_column) and return (rows, next_cursor).
+
+    With a cursor, rows after it are selected with a row-value comparison that
+    the matching composite index can seek to. Without one, ``offset`` is still
+    honoured for backwards compatibility. next_cursor is None on the last page.
+
+    NULLs in a nullable sort column sort below every value (last when
+    descending), as SQLite orders them natively, and a cursor on a NULL row
+    continues through the remaining NULLs by id.
+    """
+    nullable = getattr(sort_column, "nullable", True)
+    if descending:
+        order = sort_column.desc().nulls_last() if nullable else sort_column.desc()
+        query = query.order_by(order, id_column.desc())
+    else:
+        order = sort_column.asc().nulls_first() if nullable else sort_column.asc()
+        query = query.order_by(order, id_column.asc())
+
+    if cursor:
+        value, row_id = decode_cursor(cursor, sort_name, descending)
+        value = cursor_value(value, sort_column)
+        query = query.filter(_after(sort_column, id_column, value, row_id, descending, nullable))
+    elif offset:
+        query = query.offset(offset)
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(sort_name, getattr(last, sort_column.key), getattr(last, id_column.key), descending)
+
+
+def _after(sort_column, id_column, value, row_id, descending: bool, nullable: bool):
+    """Condition selecting the rows that follow (value, row_id) in keyset order"""
+    if value is None:
+        if not nullable:
+            raise ValueError("Invalid cursor")
+        if descending:
+            return and_(sort_column.is_(None), id_column < row_id)
+        return or_(sort_column.is_not(None), and_(sort_column.is_(None), id_column > row_id))
+    key = tuple_(sort_column, id_column)
+    if descending:
+        after = key < (value, row_id)
+        # NULL never compares true, so the trailing NULL rows need their own branch
+        return or_(after, sort_column.is_(None)) if nullable else after
+    return key > (value, row_id)
@@ -0,0 +1,107 @@
+"""
+Password hashing off the event loop.
+
+bcrypt costs ~100-300 ms of CPU per call by design. Done inline in an async
+route it stalls every other request and WebSocket on the worker, so
+PasswordHasher runs hash/verify in a dedicated, bounded thread pool (the
+bcrypt C extension releases the GIL, so threads run in parallel).
+PASSWORD_HASH_WORKERS caps how many cores a login storm may take;
+PASSWORD_HASH_MAX_QUEUE caps how many calls may wait behind them, beyond which
+HasherBusy is raised (503) instead of letting latency grow without bound.
+
+verify_and_update() also returns a new hash when the stored one was made with
+other cost parameters (BCRYPT_ROUNDS), so logins upgrade hashes transparently.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from passlib.context import CryptContext
+
+from app.core.config import settings
+
+pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+
+class HasherBusy(Exception):
+    """Too many password hash/verify calls are already waiting"""
+
+
+class PasswordHasher:
+    def __init__(self, context: CryptContext = pwd_ctx, max_workers: int = 4, max_queue: int = 64):
+        self.context = context
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._pending = 0  # running + queued
+
+        # Metrics
+        self._completed = 0
+        self._rejected = 0
+        self._rehashed = 0
+        self._max_pending = 0
+        self._wait_ms_total = 0.0
+        self._wait_ms_max = 0.0
+        self._run_ms_total = 0.0
+
+    async def hash(self, secret: str) -> str:
+        return await self._run(self.context.hash, secret)
+
+    async def verify_and_update(self, secret: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """(matches, new hash if the stored one should be upgraded)"""
+        verified, new_hash = await self._run(self.context.verify_and_update, secret, hashed)
+        if verified and new_hash:
+            self._rehashed += 1
+        return verified, new_hash
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            completed = self._completed
+            return {
+                "workers": self.max_workers,
+                "pending": self._pending,
+                "max_pending": self._max_pending,
+                "completed": completed,
+                "rejected": self._rejected,
+                "rehashed": self._rehashed,
+                "avg_wait_ms": self._wait_ms_total / completed if completed else 0.0,
+                "max_wait_ms": self._wait_ms_max,
+                "avg_run_ms": self._run_ms_total / completed if completed else 0.0,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, fn: Callable, *args):
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise HasherBusy("Password hashing queue is full")
+            self._pending += 1
+            self._max_pending = max(self._max_pending, self._pending)
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    wait_ms = (started - submitted) * 1000.0
+                    self._completed += 1
+                    self._wait_ms_total += wait_ms
+                    self._wait_ms_max = max(self._wait_ms_max, wait_ms)
+                    self._run_ms_total += (finished - started) * 1000.0
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+
+hasher = PasswordHasher(max_workers=settings.PASSWORD_HASH_WORKERS, max_queue=settings.PASSWORD_HASH_MAX_QUEUE)
@@ -0,0 +1,24 @@
+"""
+Keyed phone-number digest used to look users up.
+
+users.phone_number_hash holds HMAC-SHA256(PHONE_DIGEST_KEY, phone number) as
+hex: deterministic, so it can carry a unique index and answer a login with one
+indexed probe, yet useless without the server key. It replaces a salted
+bcrypt hash that cost a full bcrypt round per registration and could not be
+searched. Changing PHONE_DIGEST_KEY invalidates every stored digest; they
+must be recomputed (see the e6a2c4d8b1f3 migration) before logins work again.
+"""
+import hashlib
+import hmac
+
+from app.core.config import settings
+
+
+def _key() -> bytes:
+    # Falls back to SECRET_KEY so existing deployments need no new setting
+    return (settings.PHONE_DIGEST_KEY or settings.SECRET_KEY).encode("utf-8")
+
+
+def phone_digest(phone_number: str) -> str:
+    """Hex HMAC-SHA256 of a phone number under the server key"""
+    return hmac.new(_key(), str(phone_number).encode("utf-8"), hashlib.sha256).hexdigest()
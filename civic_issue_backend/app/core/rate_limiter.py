@@ -1,37 +1,31 @@
 """
 Rate limiting middleware for FastAPI
-Uses slowapi for in-memory rate limiting (simple and effective for demo)
+
+RateLimitMiddleware applies RATE_LIMITS to every HTTP request, keyed by the
+authenticated user ID from the JWT, or by client address for anonymous calls.
+
+Limits are shared by all worker processes through Redis without a round-trip
+per request: a process leases a batch of tokens from the per-window Redis
+counter (one pipelined INCRBY + EXPIRE) and spends them from a local bucket,
+going back to Redis only when the lease is used up. Leases never add up to
+more than the limit. Without Redis (not installed, unreachable) each process
+enforces the limits on its own until Redis is back.
 """
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from fastapi import Request
+import math
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
 from fastapi.responses import JSONResponse
+from jose import jwt
+from starlette.concurrency import run_in_threadpool
 
-# Create limiter instance
-limiter = Limiter(key_func=get_remote_address)
+from app.core.config import settings
 
-# Custom rate limit exceeded handler
-def rate_limit_handler(request: Request, exc: RateLimitExceeded):
-    """Custom handler for rate limit exceeded errors"""
-    response = JSONResponse(
-        status_code=429,
-        content={
-            "error": "rate_limit_exceeded",
-            "detail": f"Rate limit exceeded: {exc.detail}",
-            "retry_after": getattr(exc, 'retry_after', None)
-        }
-    )
-    # Try to inject rate limit headers if available
-    try:
-        if hasattr(request.state, 'view_rate_limit') and hasattr(request.app.state.limiter, '_inject_headers'):
-            response = request.app.state.limiter._inject_headers(
-                response, request.state.view_rate_limit
-            )
-    except Exception:
-        # If header injection fails, just return the response without headers
-        pass
-    return response
+try:
+    import redis
+except ImportError:  # Optional dependency
+    redis = None
 
 # Rate limit configurations
 # Format: "count/period" where period can be: second, minute, hour, day
@@ -43,16 +37,240 @@ RATE_LIMITS = {
     "analytics": "60/minute",  # Analytics: 60 per minute
 }
 
-def get_rate_limit_for_endpoint(endpoint: str) -> str:
-    """Determine rate limit based on endpoint path"""
-    if "/auth/" in endpoint or "/login" in endpoint or "/signup" in endpoint:
-        return RATE_LIMITS["auth"]
-    elif "/issues" in endpoint and "POST" in endpoint:
-        return RATE_LIMITS["issue_creation"]
-    elif "/ai/" in endpoint:
-        return RATE_LIMITS["ai_endpoints"]
-    elif "/analytics/" in endpoint:
-        return RATE_LIMITS["analytics"]
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# Static frontend and API docs are never limited
+EXEMPT_PREFIXES = ("/static", "/docs", "/redoc", "/openapi.json")
+
+# Local buckets kept before expired ones are swept
+MAX_BUCKETS = 10000
+
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """Parse "10/minute" into (10, 60)"""
+    count, _, period = rate.partition("/")
+    return int(count), PERIODS[period.strip()]
+
+def rate_limit_scope(method: str, path: str) -> str:
+    """RATE_LIMITS key that applies to a request"""
+    if "/auth/" in path or "/login" in path or "/signup" in path:
+        return "auth"
+    elif method == "POST" and path.rstrip("/") == "/issues":
+        return "issue_creation"
+    elif path.startswith("/ai/"):
+        return "ai_endpoints"
+    elif path.startswith("/analytics/"):
+        return "analytics"
     else:
-        return RATE_LIMITS["default"]
+        return "default"
+
+def get_rate_limit_for_endpoint(endpoint: str) -> str:
+    """Determine rate limit based on endpoint ("POST /issues" or just a path)"""
+    method, _, path = endpoint.rpartition(" ")
+    return RATE_LIMITS[rate_limit_scope(method.upper() or "GET", path)]
+
+
+class _Bucket:
+    """Tokens this process may still spend for one key in one window"""
+    __slots__ = ("window", "expires_at", "tokens", "exhausted")
+
+    def __init__(self, window: int, expires_at: float):
+        self.window = window
+        self.expires_at = expires_at
+        self.tokens = 0
+        self.exhausted = False  # the shared limit is used up for this window
+
+
+class RateLimiter:
+    """Fixed-window limiter with batched token leases from a shared counter"""
+
+    def __init__(self, redis_client=None, lease_fraction: float = 0.1,
+                 prefix: str = "ratelimit", retry_interval: float = 5.0):
+        self.redis = redis_client
+        self.lease_fraction = lease_fraction
+        self.prefix = prefix
+        self.retry_interval = retry_interval
+        self._buckets: Dict[Tuple[str, str], _Bucket] = {}
+        self._local_counters: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+        self._redis_retry_at = 0.0
+
+        # Metrics
+        self._allowed = 0
+        self._denied = 0
+        self._leases = 0
+        self._redis_errors = 0
+
+    def hit(self, scope: str, identity: str, now: Optional[float] = None) -> Tuple[bool, int]:
+        """Spend one token; returns (allowed, seconds until the window resets)"""
+        limit, period, window, retry_after = self._window(scope, now)
+        allowed = self._take_local(scope, identity, window, period)
+        if allowed is None:
+            allowed = self._add_lease(scope, identity, window, self._lease(scope, identity, window, limit, period))
+        return allowed, retry_after
+
+    async def hit_async(self, scope: str, identity: str) -> Tuple[bool, int]:
+        """hit() for the event loop; only a Redis lease leaves it (to the threadpool)"""
+        limit, period, window, retry_after = self._window(scope, None)
+        allowed = self._take_local(scope, identity, window, period)
+        if allowed is None:
+            if self.redis is None:
+                granted = self._lease(scope, identity, window, limit, period)
+            else:
+                granted = await run_in_threadpool(self._lease, scope, identity, window, limit, period)
+            allowed = self._add_lease(scope, identity, window, granted)
+        return allowed, retry_after
+
+    def lease_size(self, limit: int) -> int:
+        return max(1, int(limit * self.lease_fraction))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "allowed": self._allowed,
+            "denied": self._denied,
+            "leases": self._leases,
+            "redis_errors": self._redis_errors,
+            "buckets": len(self._buckets),
+        }
+
+    @staticmethod
+    def _window(scope: str, now: Optional[float]):
+        limit, period = parse_rate(RATE_LIMITS[scope])
+        now = time.time() if now is None else now
+        window = int(now // period)
+        retry_after = max(1, math.ceil((window + 1) * period - now))
+        return limit, period, window, retry_after
+
+    def _take_local(self, scope: str, identity: str, window: int, period: int) -> Optional[bool]:
+        """Decide from the local bucket; None when a new lease is needed"""
+        with self._lock:
+            bucket = self._buckets.get((scope, identity))
+            if bucket is None or bucket.window != window:
+                if len(self._buckets) >= MAX_BUCKETS:
+                    self._sweep(time.time())
+                bucket = self._buckets[(scope, identity)] = _Bucket(window, (window + 1) * period)
+            if bucket.tokens > 0:
+                bucket.tokens -= 1
+                self._allowed += 1
+                return True
+            if bucket.exhausted:
+                self._denied += 1
+                return False
+            return None
+
+    def _add_lease(self, scope: str, identity: str, window: int, granted: int) -> bool:
+        """Spend one token of a fresh lease and keep the rest locally"""
+        with self._lock:
+            bucket = self._buckets.get((scope, identity))
+            if bucket is not None and bucket.window == window:
+                if granted:
+                    bucket.tokens += granted - 1
+                else:
+                    bucket.exhausted = True
+            if granted:
+                self._allowed += 1
+                return True
+            self._denied += 1
+            return False
+
+    def _lease(self, scope: str, identity: str, window: int, limit: int, period: int) -> int:
+        """Take up to lease_size tokens from the shared window counter"""
+        wanted = self.lease_size(limit)
+        key = f"{self.prefix}:{scope}:{identity}:{window}"
+        total = None
+        if self.redis is not None and time.monotonic() >= self._redis_retry_at:
+            try:
+                pipe = self.redis.pipeline()
+                pipe.incrby(key, wanted)
+                pipe.expire(key, period + 1)
+                total = int(pipe.execute()[0])
+            except Exception:
+                self._redis_errors += 1
+                self._redis_retry_at = time.monotonic() + self.retry_interval
+        if total is None:
+            total = self._incr_local(key, wanted, (window + 1) * period)
+        self._leases += 1
+        return max(0, min(wanted, limit - (total - wanted)))
+
+    def _incr_local(self, key: str, amount: int, expires_at: float) -> int:
+        """In-process stand-in for the Redis counter"""
+        with self._lock:
+            total = self._local_counters.get(key, (expires_at, 0))[1] + amount
+            self._local_counters[key] = (expires_at, total)
+            return total
+
+    def _sweep(self, now: float):
+        """Drop buckets and local counters of finished windows (caller holds the lock)"""
+        for key in [k for k, b in self._buckets.items() if b.expires_at <= now]:
+            del self._buckets[key]
+        for key in [k for k, (expires_at, _) in self._local_counters.items() if expires_at <= now]:
+            del self._local_counters[key]
+
+
+def _create_limiter() -> RateLimiter:
+    client = None
+    if redis is not None and settings.RATE_LIMIT_STORAGE == "redis":
+        client = redis.Redis.from_url(
+            settings.RATE_LIMIT_REDIS_URL or settings.REDIS_URL,
+            socket_connect_timeout=0.25,
+            socket_timeout=0.25,
+        )
+    return RateLimiter(client, lease_fraction=settings.RATE_LIMIT_LEASE_FRACTION)
+
+# Create limiter instance
+limiter = _create_limiter()
+
+
+def request_identity(scope) -> str:
+    """Rate limit key: "user:<id>" for a valid bearer token, else "ip:<address>" """
+    headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope.get("headers", [])}
+    authorization = headers.get("authorization")
+    if authorization:
+        token = authorization.split()[-1]
+        try:
+            user_id = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]).get("sub")
+        except Exception:
+            user_id = None
+        if user_id is not None:
+            return f"user:{user_id}"
+
+    address = None
+    if settings.RATE_LIMIT_TRUST_PROXY:
+        # Set by the bundled nginx; only trusted when the app is not directly reachable
+        address = headers.get("x-real-ip") or headers.get("x-forwarded-for", "").split(",")[0].strip()
+    if not address and scope.get("client"):
+        address = scope["client"][0]
+    return f"ip:{address or 'unknown'}"
+
+
+def rate_limit_response(rule: str, retry_after: int) -> JSONResponse:
+    """429 response for an exceeded limit"""
+    limit, _ = parse_rate(RATE_LIMITS[rule])
+    return JSONResponse(
+        status_code=429,
+        content={
+            "error": "rate_limit_exceeded",
+            "detail": f"Rate limit exceeded: {RATE_LIMITS[rule]}",
+            "retry_after": retry_after
+        },
+        headers={"Retry-After": str(retry_after), "X-RateLimit-Limit": str(limit)},
+    )
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying RATE_LIMITS to every HTTP request"""
+
+    def __init__(self, app, rate_limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self.rate_limiter = rate_limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED or scope["path"].startswith(EXEMPT_PREFIXES):
+            await self.app(scope, receive, send)
+            return
 
+        rule = rate_limit_scope(scope["method"], scope["path"])
+        allowed, retry_after = await (self.rate_limiter or limiter).hit_async(rule, request_identity(scope))
+        if not allowed:
+            await rate_limit_response(rule, retry_after)(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
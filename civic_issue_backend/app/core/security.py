@@ -1,7 +1,15 @@
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status, Header
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from app.core.config import settings
+from app.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
@@ -25,3 +33,118 @@ async def get_current_user(authorization: str | None = Header(None)):
     payload = decode_token(token)
     user_id = payload.get("sub")
     return {"id": int(user_id)}
+
+
+# -----------------------
+# Principal
+# -----------------------
+_PRINCIPAL_FIELDS = ("role", "department", "is_active")
+
+
+class PrincipalCache:
+    """In-process TTL cache of the authorization fields of users.
+
+    Role and department are read on nearly every authenticated request but
+    change rarely, so routes take them from get_current_principal instead of
+    querying users each time. Changes committed through this process's ORM
+    sessions evict the user at once; changes made by other workers (or by
+    bulk UPDATEs) are picked up within PRINCIPAL_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_size: int = 10000):
+        self.ttl = ttl
+        self.max_size = max(1, max_size)
+        self._entries: Dict[int, Tuple[float, dict]] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, user_id: int) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._hits += 1
+                return entry[1]
+            self._misses += 1
+            return None
+
+    def put(self, principal: dict):
+        with self._lock:
+            if len(self._entries) >= self.max_size and principal["id"] not in self._entries:
+                # Drop the oldest entry (dicts keep insertion order)
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[principal["id"]] = (time.monotonic(), principal)
+
+    def invalidate(self, user_ids: Optional[Iterable[int]] = None):
+        """Evict the given users, or everyone"""
+        with self._lock:
+            if user_ids is None:
+                self._entries.clear()
+            else:
+                for user_id in user_ids:
+                    self._entries.pop(user_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self._hits, "misses": self._misses}
+
+
+principal_cache = PrincipalCache(ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS, max_size=settings.PRINCIPAL_CACHE_SIZE)
+
+
+def load_principal(user_id: int) -> Optional[dict]:
+    """Read a user's authorization fields; None if the user does not exist"""
+    from app.core.db import SessionLocal
+    db = SessionLocal()
+    try:
+        row = db.execute(
+            select(User.role, User.department, User.is_active).where(User.id == user_id)
+        ).first()
+    finally:
+        db.close()
+    if row is None:
+        return None
+    return {"id": user_id, "role": row.role, "department": row.department, "is_active": bool(row.is_active)}
+
+
+async def get_current_principal(current_user: dict = Depends(get_current_user)):
+    """The caller's id, role, department and is_active, served from principal_cache; 403 if deactivated"""
+    principal = principal_cache.get(current_user["id"])
+    if principal is None:
+        principal = await run_in_threadpool(load_principal, current_user["id"])
+        if principal is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        principal_cache.put(principal)
+    if not principal["is_active"]:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Inactive user")
+    return principal
+
+
+def _mark_principal_changed(target: User):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault("principals_changed", set()).add(target.id)
+
+
+@event.listens_for(User, "after_delete")
+def _principal_removed(mapper, connection, target):
+    _mark_principal_changed(target)
+
+
+@event.listens_for(User, "after_update")
+def _principal_updated(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in _PRINCIPAL_FIELDS):
+        _mark_principal_changed(target)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_principals_after_commit(session):
+    changed = session.info.pop("principals_changed", None)
+    if changed:
+        principal_cache.invalidate(changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_principals_on_rollback(session):
+    session.info.pop("principals_changed", None)
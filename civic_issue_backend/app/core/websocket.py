@@ -1,53 +1,388 @@
-from typing import List, Dict
+"""
+WebSocket connection manager with cross-worker fan-out.
+
+Every message is published on a channel ("user:<id>", "issue:<id>" or
+"broadcast") through a broker. With Redis, all workers receive every published
+message and deliver it to whichever of their local connections subscribe to
+that channel, so a client connected to worker A gets updates produced on
+worker B. InProcessBroker delivers straight back to this process (single
+worker, tests) and is also the fallback while Redis is unreachable.
+
+Delivery never awaits a socket: each connection has a bounded send queue
+drained by its own sender task. When a slow client's queue is full the
+oldest queued message is dropped, or the client is disconnected
+(WS_SLOW_CONSUMER_POLICY).
+
+Issue updates (status, upvote count) go only to the connections subscribed
+to that issue's channel; chat messages are private and go per user instead.
+publish_issue_update() may be called from any thread; updates to the same
+issue are merged for one tick (WS_ISSUE_COALESCE_MS) and published as a single
+"issue_update" message, so a busy issue costs one fan-out per tick rather than
+one per event.
+"""
+import asyncio
+import json
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
 from fastapi import WebSocket
 
-class ConnectionManager:
+from app.core.config import settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Optional dependency
+    aioredis = None
+
+BROADCAST_CHANNEL = "broadcast"
+
+Handler = Callable[[str, dict], Awaitable[None]]
+
+
+def user_channel(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def issue_channel(issue_id: int) -> str:
+    return f"issue:{issue_id}"
+
+
+class InProcessBroker:
+    """Delivers published messages to this process only"""
+
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.user_connections: Dict[int, List[WebSocket]] = {}
+        self._handler: Optional[Handler] = None
+
+    async def start(self, handler: Handler):
+        self._handler = handler
+
+    async def publish(self, channel: str, message: dict):
+        await self._handler(channel, message)
+
+    async def stop(self):
+        self._handler = None
+
+
+class RedisBroker:
+    """Redis pub/sub: every worker pattern-subscribes to all channels under prefix"""
+
+    def __init__(self, url: Optional[str] = None, prefix: str = "ws:", client=None, retry_interval: float = 1.0):
+        if client is None:
+            if aioredis is None:
+                raise RuntimeError("redis is not installed")
+            client = aioredis.from_url(url, socket_connect_timeout=1)
+        self.client = client
+        self.prefix = prefix
+        self.retry_interval = retry_interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, handler: Handler):
+        # Fail fast here if Redis is unreachable, so the manager can fall back
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.psubscribe(self.prefix + "*")
+        self._task = asyncio.create_task(self._listen(pubsub, handler))
+
+    async def publish(self, channel: str, message: dict):
+        await self.client.publish(self.prefix + channel, json.dumps(message, default=str))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    async def _listen(self, pubsub, handler: Handler):
+        while True:
+            try:
+                async for item in pubsub.listen():
+                    if item.get("type") != "pmessage":
+                        continue
+                    channel = item["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    await handler(channel[len(self.prefix):], json.loads(item["data"]))
+            except asyncio.CancelledError:
+                await pubsub.close()
+                raise
+            except Exception as e:
+                print(f"WebSocket pub/sub listener error: {e}")
+            # Resubscribe after a dropped connection
+            await asyncio.sleep(self.retry_interval)
+            try:
+                await pubsub.close()
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                await pubsub.psubscribe(self.prefix + "*")
+            except Exception:
+                pass
+
+
+class Connection:
+    """A local WebSocket with its bounded send queue and sender task"""
+
+    def __init__(self, websocket: WebSocket, queue_size: int, send_timeout: float,
+                 on_failure: Callable[["Connection"], Awaitable[None]]):
+        self.websocket = websocket
+        self.queue: "asyncio.Queue[dict]" = asyncio.Queue(maxsize=max(1, queue_size))
+        self.send_timeout = send_timeout
+        self.channels: Set[str] = set()
+        self.dropped = 0
+        self._on_failure = on_failure
+        self._task = asyncio.create_task(self._sender())
+
+    def enqueue(self, message: dict, policy: str = "drop") -> bool:
+        """Queue a message without waiting; False if the client is too slow and must be disconnected"""
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            if policy == "disconnect":
+                return False
+            # Drop the oldest queued message to make room for the newest
+            self.queue.get_nowait()
+            self.queue.put_nowait(message)
+            self.dropped += 1
+            return True
 
-    async def connect(self, websocket: WebSocket, user_id: int = None):
+    def cancel(self):
+        # Not from inside the sender itself (it is already finishing after a failed send)
+        if self._task is not asyncio.current_task():
+            self._task.cancel()
+
+    async def _sender(self):
+        try:
+            while True:
+                message = await self.queue.get()
+                await asyncio.wait_for(self.websocket.send_json(message), self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            await self._on_failure(self)
+
+
+class ConnectionManager:
+    def __init__(self, broker=None, queue_size: int = 100, send_timeout: float = 5.0,
+                 slow_consumer_policy: str = "drop", coalesce_interval: float = 0.1):
+        self.broker = broker
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.slow_consumer_policy = slow_consumer_policy
+        self.coalesce_interval = coalesce_interval
+        self.connections: Dict[WebSocket, Connection] = {}
+        # Subscriber index: channel ("issue:<id>", "user:<id>", "broadcast") -> local connections
+        self.channels: Dict[str, Set[Connection]] = {}
+        self._started = False
+        self._start_lock: Optional[asyncio.Lock] = None
+
+        # Issue updates waiting for the next tick, filled from any thread
+        self._pending_issues: Dict[int, Dict[str, Any]] = {}
+        self._pending_lock = threading.Lock()
+        self._pending_event: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self._published = 0
+        self._delivered = 0
+        self._publish_errors = 0
+        self._slow_disconnects = 0
+        self._issue_updates = 0
+        self._issue_messages = 0
+
+    async def start(self):
+        """Start receiving published messages; falls back to in-process delivery if the broker is down"""
+        if self._started:
+            return
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._started:
+                return
+            if self.broker is None:
+                self.broker = _create_broker()
+            try:
+                await self.broker.start(self._deliver)
+            except Exception as e:
+                print(f"WebSocket pub/sub unavailable ({e}); delivering to this worker only")
+                self.broker = InProcessBroker()
+                await self.broker.start(self._deliver)
+            self._loop = asyncio.get_running_loop()
+            self._pending_event = asyncio.Event()
+            self._flush_task = asyncio.create_task(self._flush_issue_updates())
+            self._started = True
+
+    async def stop(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        self._loop = None
+        for connection in list(self.connections.values()):
+            connection.cancel()
+        if self.broker is not None:
+            await self.broker.stop()
+        self._started = False
+
+    async def connect(self, websocket: WebSocket, user_id: int = None, broadcast: bool = True) -> Connection:
         # Don't accept here - the endpoint should handle acceptance
-        self.active_connections.append(websocket)
-        
+        await self.start()
+        connection = Connection(websocket, self.queue_size, self.send_timeout, self._on_send_failure)
+        self.connections[websocket] = connection
+        if broadcast:
+            self.subscribe(websocket, BROADCAST_CHANNEL)
         if user_id:
-            if user_id not in self.user_connections:
-                self.user_connections[user_id] = []
-            self.user_connections[user_id].append(websocket)
+            self.subscribe(websocket, user_channel(user_id))
+        return connection
+
+    def subscribe(self, websocket: WebSocket, channel: str):
+        connection = self.connections.get(websocket)
+        if connection is None:
+            return
+        connection.channels.add(channel)
+        self.channels.setdefault(channel, set()).add(connection)
 
     async def disconnect(self, websocket: WebSocket, user_id: int = None):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        
-        if user_id and user_id in self.user_connections:
-            if websocket in self.user_connections[user_id]:
-                self.user_connections[user_id].remove(websocket)
-            if not self.user_connections[user_id]:
-                del self.user_connections[user_id]
+        connection = self.connections.pop(websocket, None)
+        if connection is None:
+            return
+        connection.cancel()
+        for channel in connection.channels:
+            subscribers = self.channels.get(channel)
+            if subscribers is not None:
+                subscribers.discard(connection)
+                if not subscribers:
+                    del self.channels[channel]
+
+    async def send_personal(self, websocket: WebSocket, message: dict):
+        """Queue a message for one local connection (keeps its sends ordered with fan-out)"""
+        connection = self.connections.get(websocket)
+        if connection is not None and not connection.enqueue(message, self.slow_consumer_policy):
+            await self._drop_slow(connection)
+
+    async def publish(self, channel: str, message: dict):
+        """Deliver to every subscriber of channel on any worker"""
+        await self.start()
+        self._published += 1
+        try:
+            await self.broker.publish(channel, message)
+        except Exception:
+            self._publish_errors += 1
+            await self._deliver(channel, message)
+
+    def publish_threadsafe(self, channel: str, message: dict):
+        """Schedule publish() from any thread (sync routes); dropped when the manager is not running"""
+        loop = self._loop
+        if loop is None:
+            return
+        coroutine = self.publish(channel, message)
+        try:
+            asyncio.run_coroutine_threadsafe(coroutine, loop)
+        except RuntimeError:  # Loop closed during shutdown
+            coroutine.close()
 
     async def broadcast(self, message: dict):
         """Broadcast to all connections"""
-        for connection in list(self.active_connections):
-            try:
-                await connection.send_json(message)
-            except Exception:
-                try:
-                    await connection.close()
-                finally:
-                    if connection in self.active_connections:
-                        self.active_connections.remove(connection)
+        await self.publish(BROADCAST_CHANNEL, message)
 
     async def send_to_user(self, user_id: int, message: dict):
         """Send message to specific user's connections"""
-        if user_id in self.user_connections:
-            for connection in list(self.user_connections[user_id]):
+        await self.publish(user_channel(user_id), message)
+
+    async def send_to_issue(self, issue_id: int, message: dict):
+        """Send message to the subscribers of one issue, right away"""
+        await self.publish(issue_channel(issue_id), message)
+
+    def publish_issue_update(self, issue_id: int, **fields):
+        """Queue an update for an issue's subscribers; callable from any thread.
+
+        Fields such as status or upvote_count replace values queued earlier in
+        the same tick. Dropped when the manager is not running in this process
+        (scripts, tests), as nobody could receive it.
+        """
+        loop = self._loop
+        if loop is None:
+            return
+        with self._pending_lock:
+            first = not self._pending_issues
+            update = self._pending_issues.setdefault(issue_id, {})
+            update.update(fields)
+            self._issue_updates += 1
+        if first:
+            try:
+                loop.call_soon_threadsafe(self._pending_event.set)
+            except RuntimeError:  # Loop closed during shutdown
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connections": len(self.connections),
+            "channels": len(self.channels),
+            "issue_channels": sum(1 for channel in self.channels if channel.startswith("issue:")),
+            "issue_updates": self._issue_updates,
+            "issue_messages": self._issue_messages,
+            "published": self._published,
+            "delivered": self._delivered,
+            "publish_errors": self._publish_errors,
+            "dropped": sum(c.dropped for c in self.connections.values()),
+            "slow_disconnects": self._slow_disconnects,
+            "broker": type(self.broker).__name__ if self.broker is not None else None,
+        }
+
+    async def _flush_issue_updates(self):
+        """Publish the updates queued during each tick, one message per issue"""
+        while True:
+            await self._pending_event.wait()
+            await asyncio.sleep(self.coalesce_interval)
+            self._pending_event.clear()
+            with self._pending_lock:
+                pending, self._pending_issues = self._pending_issues, {}
+            for issue_id, update in pending.items():
+                self._issue_messages += 1
                 try:
-                    await connection.send_json(message)
-                except Exception:
-                    try:
-                        await connection.close()
-                    finally:
-                        if connection in self.user_connections[user_id]:
-                            self.user_connections[user_id].remove(connection)
-
-manager = ConnectionManager()
+                    await self.send_to_issue(issue_id, {"type": "issue_update", "issue_id": issue_id, **update})
+                except Exception as e:
+                    print(f"Issue update fan-out error: {e}")
+
+    async def _deliver(self, channel: str, message: dict):
+        """Queue a published message for this worker's subscribers of channel"""
+        slow = []
+        for connection in list(self.channels.get(channel, ())):
+            if connection.enqueue(message, self.slow_consumer_policy):
+                self._delivered += 1
+            else:
+                slow.append(connection)
+        for connection in slow:
+            await self._drop_slow(connection)
+
+    async def _drop_slow(self, connection: Connection):
+        self._slow_disconnects += 1
+        await self._close(connection, code=1013, reason="Client too slow")
+
+    async def _on_send_failure(self, connection: Connection):
+        await self._close(connection, code=1011, reason="Send failed")
+
+    async def _close(self, connection: Connection, code: int, reason: str):
+        await self.disconnect(connection.websocket)
+        try:
+            await connection.websocket.close(code=code, reason=reason)
+        except Exception:
+            pass
+
+
+def _create_broker():
+    if settings.WS_PUBSUB_BACKEND == "redis" and aioredis is not None:
+        return RedisBroker(settings.WS_PUBSUB_REDIS_URL or settings.REDIS_URL)
+    return InProcessBroker()
+
+
+manager = ConnectionManager(
+    queue_size=settings.WS_SEND_QUEUE_SIZE,
+    send_timeout=settings.WS_SEND_TIMEOUT_SECONDS,
+    slow_consumer_policy=settings.WS_SLOW_CONSUMER_POLICY,
+    coalesce_interval=settings.WS_ISSUE_COALESCE_MS / 1000,
+)
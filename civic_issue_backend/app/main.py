@@ -2,16 +2,19 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, JSONResponse
-from app.core.encryption import get_key_b64, AAD_VALUE
+from app.core.encryption import get_key_b64, get_key_id, AAD_VALUE
 from app.api import auth, issues, users, notifications, admin, analytics, ai, messages
-from app.core.db import create_tables
-from app.core.rate_limiter import limiter, RateLimitExceeded, rate_limit_handler
+from app.core.db import create_tables, dispose_async_engine
+from app.services.upvote_buffer import shutdown_upvote_buffer
+from app.services.notification_service import start_notification_dispatcher, stop_notification_dispatcher
+from app.core.rate_limiter import RateLimitMiddleware
+from app.core.websocket import manager
+from app.core.password_hasher import HasherBusy, hasher
 
 app = FastAPI(title="Civic Issue Reporting Backend")
 
-# Add rate limiter to app
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, rate_limit_handler)
+# Apply RATE_LIMITS to every request (shared across workers via Redis)
+app.add_middleware(RateLimitMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -36,6 +39,24 @@ async def startup_event():
         print("✅ Database tables created successfully!")
     except Exception as e:
         print(f"❌ Error creating database tables: {e}")
+    # Receive WebSocket fan-out published by other workers
+    await manager.start()
+    # Deliver queued notifications off the request path
+    await start_notification_dispatcher()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    shutdown_upvote_buffer()
+    await stop_notification_dispatcher()
+    await manager.stop()
+    await dispose_async_engine()
+    hasher.shutdown()
+    ai.shutdown_ai()
+
+@app.exception_handler(HasherBusy)
+async def hasher_busy_handler(request: Request, exc: HasherBusy):
+    # Login storm beyond PASSWORD_HASH_MAX_QUEUE: shed load instead of queueing forever
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
 
 # Mount static files for frontend
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -63,5 +84,6 @@ async def frontend():
 async def encryption_config():
     return JSONResponse({
         "key_b64": get_key_b64(),
+        "kid": get_key_id(),
         "aad": AAD_VALUE.decode('ascii')
     })
@@ -1,9 +1,17 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Date, DateTime, Text, ForeignKey, Boolean, Index, UniqueConstraint, event, text
 from sqlalchemy.orm import relationship
 from app.core.db import Base
+from app.core import fulltext, geohash
 from datetime import datetime
 import json
 
+def _default_geohash(context):
+    """Derive the geohash from the row's coordinates when not set explicitly"""
+    params = context.get_current_parameters()
+    if params.get("lat") is None or params.get("lng") is None:
+        return None
+    return geohash.encode(params["lat"], params["lng"])
+
 class Issue(Base):
     __tablename__ = "issues"
     
@@ -16,6 +24,7 @@ class Issue(Base):
     severity_score = Column(Float, default=0.5, nullable=False)  # 0-1 severity score from NLP
     lat = Column(Float, nullable=False)
     lng = Column(Float, nullable=False)
+    geohash = Column(String(12), default=_default_geohash)  # Spatial index key for radius queries
     media_urls = Column(Text, default="[]")  # JSON string for SQLite compatibility
     is_anonymous = Column(Boolean, default=False)
     is_verified = Column(Boolean, default=True)  # All issues are verified by default
@@ -30,6 +39,7 @@ class Issue(Base):
     assigned_admin_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    resolved_at = Column(DateTime, nullable=True)  # Set when status becomes 'resolved', cleared if reopened
     
     # Relationships
     reporter = relationship("User", back_populates="issues", foreign_keys=[reporter_id])
@@ -37,6 +47,25 @@ class Issue(Base):
     upvotes = relationship("Upvote", back_populates="issue")
     messages = relationship("Message", back_populates="issue")
     
+    __table_args__ = (
+        # Covering index: radius queries resolve candidates without touching the table
+        Index("ix_issues_geohash_lat_lng", "geohash", "lat", "lng"),
+        # Boundary-day stats and resolved-today/this-week counts
+        Index("ix_issues_department_created_at", "assigned_department", "created_at", "id"),
+        Index("ix_issues_department_resolved_at", "assigned_department", "resolved_at"),
+        # Keyset pagination: one (filter, sort key, id) index per listing sort order
+        Index("ix_issues_created_at_id", "created_at", "id"),
+        Index("ix_issues_upvote_count_id", "upvote_count", "id"),
+        Index("ix_issues_department_upvote_count_id", "assigned_department", "upvote_count", "id"),
+        Index("ix_issues_admin_created_at_id", "assigned_admin_id", "created_at", "id"),
+        Index("ix_issues_admin_updated_at_id", "assigned_admin_id", "updated_at", "id"),
+        Index("ix_issues_admin_priority_id", "assigned_admin_id", "priority", "id"),
+        # Hot filters in issue_service.py
+        Index("ix_issues_admin_status", "assigned_admin_id", "status"),
+        Index("ix_issues_department_status_created_at", "assigned_department", "status", "created_at", "id"),
+        Index("ix_issues_reporter_created_at", "reporter_id", "created_at"),
+    )
+    
     @property
     def media_urls_list(self):
         """Convert JSON string to list"""
@@ -50,6 +79,9 @@ class Issue(Base):
         """Convert list to JSON string"""
         self.media_urls = json.dumps(value) if value else "[]"
 
+# Fresh databases get the full-text index with the table (migrations add it otherwise)
+event.listen(Issue.__table__, "after_create", lambda target, connection, **kw: fulltext.create_issue_search_index(connection))
+
 class Notification(Base):
     __tablename__ = "notifications"
     
@@ -60,10 +92,42 @@ class Notification(Base):
     message = Column(Text, nullable=False)
     read = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Outbox state: rows with dispatched_at NULL are pushed by the notification dispatcher
+    dispatched_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     user = relationship("User")
     issue = relationship("Issue")
+    
+    __table_args__ = (
+        Index("ix_notifications_user_read_created_at", "user_id", "read", "created_at"),
+        # Inbox pages, newest first
+        Index("ix_notifications_user_created_at_id", "user_id", "created_at", "id"),
+        # Undelivered notifications due for a (re)try; partial, so it stays tiny
+        Index(
+            "ix_notifications_outbox", "next_attempt_at", "id",
+            sqlite_where=text("dispatched_at IS NULL"),
+            postgresql_where=text("dispatched_at IS NULL"),
+        ),
+    )
+
+class NotificationArchive(Base):
+    """Read notifications moved out of the notifications table by the retention job"""
+    __tablename__ = "notification_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)  # Same id as in notifications
+    user_id = Column(Integer, nullable=False)
+    issue_id = Column(Integer, nullable=True)
+    type = Column(String(50), nullable=False)
+    message = Column(Text, nullable=False)
+    created_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_notification_archive_user_created_at", "user_id", "created_at"),
+    )
 
 class Message(Base):
     __tablename__ = "messages"
@@ -78,6 +142,10 @@ class Message(Base):
     # Relationships
     issue = relationship("Issue", back_populates="messages")
     sender = relationship("User")
+    
+    __table_args__ = (
+        Index("ix_messages_issue_created_at", "issue_id", "created_at"),
+    )
 
 class Upvote(Base):
     __tablename__ = "upvotes"
@@ -93,6 +161,49 @@ class Upvote(Base):
     
     # Unique constraint to prevent duplicate upvotes
     __table_args__ = (
-        {"extend_existing": True}
+        Index("uq_upvotes_issue_id_user_id", "issue_id", "user_id", unique=True),
+        {"extend_existing": True},
+    )
+
+class ImageFingerprint(Base):
+    __tablename__ = "image_fingerprints"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    issue_id = Column(Integer, ForeignKey("issues.id"), nullable=False, index=True)
+    media_url = Column(String(500), nullable=False, index=True)
+    dhash = Column(BigInteger, nullable=True)  # Signed 64-bit dHash; NULL if the image could not be read
+    # 16-bit slices of dhash for multi-index Hamming lookups
+    band0 = Column(Integer, nullable=True)
+    band1 = Column(Integer, nullable=True)
+    band2 = Column(Integer, nullable=True)
+    band3 = Column(Integer, nullable=True)
+    geohash = Column(String(12), nullable=True)  # Copied from the issue for the spatial prefilter
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    issue = relationship("Issue")
+    
+    __table_args__ = (
+        Index("ix_image_fingerprints_band0_geohash", "band0", "geohash"),
+        Index("ix_image_fingerprints_band1_geohash", "band1", "geohash"),
+        Index("ix_image_fingerprints_band2_geohash", "band2", "geohash"),
+        Index("ix_image_fingerprints_band3_geohash", "band3", "geohash"),
     )
 
+class IssueStatsRollup(Base):
+    __tablename__ = "issue_stats_rollups"
+    
+    # One row per (department, creation day, category); maintained incrementally
+    # by IssueService so dashboard KPIs never scan the issues table
+    id = Column(Integer, primary_key=True, index=True)
+    department = Column(String(50), nullable=False, default="")  # '' for unassigned issues
+    day = Column(Date, nullable=False)  # UTC date of Issue.created_at
+    category = Column(String(50), nullable=False)
+    total_count = Column(Integer, default=0, nullable=False)
+    new_count = Column(Integer, default=0, nullable=False)
+    in_progress_count = Column(Integer, default=0, nullable=False)
+    resolved_count = Column(Integer, default=0, nullable=False)
+    resolution_seconds = Column(Float, default=0.0, nullable=False)  # Sum of resolved_at - created_at
+    
+    __table_args__ = (
+        UniqueConstraint("department", "day", "category", name="uq_issue_stats_rollups_key"),
+    )
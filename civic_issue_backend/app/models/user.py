@@ -1,21 +1,29 @@
 from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean
 from sqlalchemy.orm import relationship
 from app.core.db import Base
+from app.core.phone_digest import phone_digest
 from datetime import datetime
 
+def _default_phone_digest(context):
+    """Derive the lookup digest from the row's phone number when not set explicitly"""
+    phone_number = context.get_current_parameters().get("phone_number")
+    return phone_digest(phone_number) if phone_number is not None else None
+
 class User(Base):
     __tablename__ = "users"
     
     id = Column(Integer, primary_key=True, index=True)
     full_name = Column(String(100), nullable=False)
     phone_number = Column(String(15), unique=True, index=True, nullable=False)
-    phone_number_hash = Column(String(255), nullable=False)  # Encrypted phone number
+    phone_number_hash = Column(String(255), unique=True, index=True, nullable=False, default=_default_phone_digest)  # HMAC digest, used for lookups
     password_hash = Column(String(255), nullable=False)
     role = Column(String(20), default="citizen", nullable=False)
     department = Column(String(50), nullable=True)  # For admin department assignment
     ward = Column(String(50), nullable=True)  # For ward-specific admin assignment
     trust_score = Column(Float, default=100.0)
     is_active = Column(Boolean, default=True)
+    open_issue_count = Column(Integer, default=0, nullable=False)  # Assigned issues still new/in_progress (admins)
+    unread_notification_count = Column(Integer, default=0, nullable=False)  # Maintained by InboxService
     profile_picture_url = Column(String(500), nullable=True)  # URL to profile picture
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
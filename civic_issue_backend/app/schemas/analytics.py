@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 class StatsResponse(BaseModel):
@@ -17,3 +17,13 @@ class HeatmapPoint(BaseModel):
     count: int
     category: str
     status: str
+
+class HeatmapGrid(BaseModel):
+    """Columnar heatmap: index i of every list describes the same cell"""
+    precision: int
+    cell_size: List[float]  # [lat degrees, lng degrees]
+    lat: List[float]
+    lng: List[float]
+    count: List[int]
+    by_category: Dict[str, List[int]]
+    by_status: Dict[str, List[int]]
@@ -40,6 +40,7 @@ class IssueOut(BaseModel):
     landmark: Optional[str] = None
     pincode: Optional[str] = None
     upvote_count: int = 0
+    distance_km: Optional[float] = None  # Only set for radius queries
     created_at: datetime
     updated_at: datetime
 
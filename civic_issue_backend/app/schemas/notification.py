@@ -1,9 +1,11 @@
 from pydantic import BaseModel
 from datetime import datetime
+from typing import Optional
 
 class NotificationOut(BaseModel):
     id: int
     user_id: int
+    issue_id: Optional[int] = None
     type: str
     message: str
     read: bool
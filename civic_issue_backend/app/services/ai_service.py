@@ -1,17 +1,55 @@
 from __future__ import annotations
 
+import abc
+import ast
+import base64
+import binascii
+import io
 import os
+import re
+import urllib.request
 from dataclasses import dataclass
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 
 import math
 
+from app.core.config import settings
+from app.services.inference_engine import InferenceEngine
+
 try:
     # Optional import; handled gracefully if not available
     from ultralytics import YOLO  # type: ignore
 except Exception:  # pragma: no cover
     YOLO = None  # type: ignore
 
+try:
+    # Optional imports for the ONNX Runtime backend
+    import numpy as np  # type: ignore
+    import onnxruntime as ort  # type: ignore
+except Exception:  # pragma: no cover
+    np = None  # type: ignore
+    ort = None  # type: ignore
+
+try:
+    import cv2  # type: ignore
+except Exception:  # pragma: no cover
+    cv2 = None  # type: ignore
+
+try:
+    from PIL import Image  # type: ignore
+except Exception:  # pragma: no cover
+    Image = None  # type: ignore
+
+
+AI_INFERENCE_TIMEOUT_SECONDS = 30
+DETECTION_CONF_THRESHOLD = 0.1  # Low threshold to catch more detections
+DETECTION_IOU_THRESHOLD = 0.7
+DETECTION_MAX_DET = 300
+
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+MAX_IMAGE_PIXELS = 40_000_000  # ~8K x 5K; rejects decompression bombs before decoding
+DATA_URL_RE = re.compile(r"^data:([^;,]*)[^,]*;base64,", re.I)
+
 
 @dataclass
 class DetectionResult:
@@ -20,6 +58,279 @@ class DetectionResult:
     bbox: Optional[List[float]] = None  # [x1, y1, x2, y2] if available
 
 
+class DetectorBackend(abc.ABC):
+    """Runs a batch of images (paths, URLs or BGR numpy arrays) through a detector."""
+
+    name = "base"
+
+    @abc.abstractmethod
+    def predict(self, sources: List[Any]) -> List[List[DetectionResult]]:
+        """Return one list of detections per source, in input order"""
+
+
+class UltralyticsBackend(DetectorBackend):
+    """PyTorch detector loaded through ultralytics (``best.pt``)."""
+
+    name = "ultralytics"
+
+    def __init__(self, model_path: str, conf: float = DETECTION_CONF_THRESHOLD):
+        self.model = YOLO(model_path)
+        self.conf = conf
+
+    def predict(self, sources: List[Any]) -> List[List[DetectionResult]]:
+        results = self.model(list(sources), conf=self.conf, verbose=False)
+        return [self._parse_result(result) for result in results]
+
+    @staticmethod
+    def _parse_result(result: Any) -> List[DetectionResult]:
+        """Convert one ultralytics Results object into DetectionResults"""
+        detections: List[DetectionResult] = []
+        names = result.names  # index->label mapping
+        boxes = result.boxes  # boxes with .cls and .conf
+        if boxes is None:
+            return detections
+        for b in boxes:
+            cls_idx = int(b.cls)
+            label = names.get(cls_idx, str(cls_idx)) if isinstance(names, dict) else str(cls_idx)
+            xyxy = b.xyxy[0].tolist() if hasattr(b, "xyxy") else None
+            detections.append(DetectionResult(label=label, confidence=float(b.conf), bbox=xyxy))
+        return detections
+
+
+class OnnxBackend(DetectorBackend):
+    """CPU detector running the exported ``best.onnx`` with ONNX Runtime.
+
+    Mirrors the ultralytics pipeline without torch: letterbox to a square input,
+    one batched session run, confidence filtering, class-aware NMS and rescaling
+    of boxes back to the original image.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_path: str, intra_op_threads: int = 0, inter_op_threads: int = 0,
+                 imgsz: int = 640, conf: float = DETECTION_CONF_THRESHOLD,
+                 iou: float = DETECTION_IOU_THRESHOLD, max_det: int = DETECTION_MAX_DET):
+        options = ort.SessionOptions()
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        if inter_op_threads:
+            options.inter_op_num_threads = inter_op_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_dtype = np.float16 if "float16" in model_input.type else np.float32
+
+        # ultralytics stores class names and input size in the ONNX metadata
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = self._parse_metadata(metadata.get("names"), {})
+        exported_size = self._parse_metadata(metadata.get("imgsz"), None)
+        self.imgsz = int(exported_size[0]) if exported_size else imgsz
+        self.conf = conf
+        self.iou = iou
+        self.max_det = max_det
+
+    @staticmethod
+    def _parse_metadata(value: Optional[str], default: Any) -> Any:
+        if not value:
+            return default
+        try:
+            return ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return default
+
+    def predict(self, sources: List[Any]) -> List[List[DetectionResult]]:
+        images = [self._load_image(source) for source in sources]
+        batch = []
+        transforms = []
+        for image in images:
+            padded, gain, pad = self._letterbox(image)
+            batch.append(padded)
+            transforms.append((gain, pad, image.shape[:2]))
+
+        # HWC BGR uint8 -> NCHW RGB float in [0, 1]
+        tensor = np.ascontiguousarray(np.stack(batch)[..., ::-1].transpose(0, 3, 1, 2))
+        tensor = tensor.astype(self.input_dtype) / 255.0
+        output = self.session.run(None, {self.input_name: tensor})[0]
+
+        return [self._postprocess(output[i], *transforms[i]) for i in range(len(images))]
+
+    @staticmethod
+    def _load_image(source: Any):
+        """Return an HWC BGR uint8 array for a numpy array, path or URL"""
+        if isinstance(source, np.ndarray):
+            return source
+        if isinstance(source, str) and source.startswith(("http://", "https://")):
+            with urllib.request.urlopen(source, timeout=10) as resp:
+                data = np.frombuffer(resp.read(), dtype=np.uint8)
+            image = cv2.imdecode(data, cv2.IMREAD_COLOR) if cv2 is not None else None
+        else:
+            path = source[len("file://"):] if str(source).startswith("file://") else str(source)
+            image = cv2.imread(path, cv2.IMREAD_COLOR) if cv2 is not None else None
+            if image is None and cv2 is None:
+                image = np.asarray(Image.open(path).convert("RGB"))[..., ::-1]
+        if image is None:
+            raise ValueError(f"Could not read image: {source}")
+        return image
+
+    def _letterbox(self, image) -> Tuple[Any, float, Tuple[int, int]]:
+        """Resize keeping aspect ratio and pad to a square input (ultralytics LetterBox)"""
+        h, w = image.shape[:2]
+        gain = min(self.imgsz / h, self.imgsz / w)
+        new_w, new_h = int(round(w * gain)), int(round(h * gain))
+        dw, dh = (self.imgsz - new_w) / 2, (self.imgsz - new_h) / 2
+        if (w, h) != (new_w, new_h):
+            if cv2 is not None:
+                image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+            else:
+                image = np.asarray(Image.fromarray(image).resize((new_w, new_h), Image.BILINEAR))
+        top, left = int(round(dh - 0.1)), int(round(dw - 0.1))
+        padded = np.full((self.imgsz, self.imgsz, 3), 114, dtype=np.uint8)
+        padded[top:top + new_h, left:left + new_w] = image
+        return padded, gain, (left, top)
+
+    def _postprocess(self, prediction, gain: float, pad: Tuple[int, int], shape: Tuple[int, int]) -> List[DetectionResult]:
+        """Filter, NMS and rescale one image's (4 + classes, anchors) output"""
+        prediction = prediction.T.astype(np.float32)
+        class_scores = prediction[:, 4:]
+        class_ids = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(class_ids)), class_ids]
+        keep = scores > self.conf
+        if not keep.any():
+            return []
+        xywh, scores, class_ids = prediction[keep, :4], scores[keep], class_ids[keep]
+
+        boxes = np.empty_like(xywh)
+        boxes[:, 0] = xywh[:, 0] - xywh[:, 2] / 2
+        boxes[:, 1] = xywh[:, 1] - xywh[:, 3] / 2
+        boxes[:, 2] = xywh[:, 0] + xywh[:, 2] / 2
+        boxes[:, 3] = xywh[:, 1] + xywh[:, 3] / 2
+
+        # Offset boxes per class so one NMS pass never suppresses across classes
+        selected = self._nms(boxes + class_ids[:, None] * 7680.0, scores, self.iou)[:self.max_det]
+
+        h, w = shape
+        boxes = boxes[selected]
+        boxes[:, [0, 2]] = ((boxes[:, [0, 2]] - pad[0]) / gain).clip(0, w)
+        boxes[:, [1, 3]] = ((boxes[:, [1, 3]] - pad[1]) / gain).clip(0, h)
+
+        return [
+            DetectionResult(
+                label=self.names.get(int(class_ids[i]), str(int(class_ids[i]))),
+                confidence=float(scores[i]),
+                bbox=[float(v) for v in box],
+            )
+            for i, box in zip(selected, boxes)
+        ]
+
+    @staticmethod
+    def _nms(boxes, scores, iou_threshold: float) -> List[int]:
+        """Greedy non-maximum suppression; returns kept indices by descending score"""
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        order = scores.argsort()[::-1]
+        keep: List[int] = []
+        while order.size:
+            i = order[0]
+            keep.append(int(i))
+            rest = order[1:]
+            xx1 = np.maximum(boxes[i, 0], boxes[rest, 0])
+            yy1 = np.maximum(boxes[i, 1], boxes[rest, 1])
+            xx2 = np.minimum(boxes[i, 2], boxes[rest, 2])
+            yy2 = np.minimum(boxes[i, 3], boxes[rest, 3])
+            inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+            iou = inter / (areas[i] + areas[rest] - inter + 1e-7)
+            order = rest[iou <= iou_threshold]
+        return keep
+
+
+class ImageTooLarge(ValueError):
+    """Raised when an uploaded image exceeds MAX_IMAGE_BYTES or MAX_IMAGE_PIXELS"""
+
+
+def sniff_image_format(data: bytes) -> Optional[str]:
+    """Identify JPEG, PNG or WebP from the leading magic bytes"""
+    if data[:3] == b"\xff\xd8\xff":
+        return "jpeg"
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def decode_image_data_url(data_url: str):
+    """Decode a base64 image data URL straight into an HWC BGR uint8 array.
+
+    Size and format are validated before any pixel decoding: the encoded length
+    bounds the payload, the magic bytes must be JPEG/PNG/WebP and the header's
+    dimensions must fit MAX_IMAGE_PIXELS. Raises ImageTooLarge when a limit is
+    exceeded and ValueError on other invalid input.
+    """
+    if np is None or (cv2 is None and Image is None):
+        raise ValueError("Image decoding is not available")
+    match = DATA_URL_RE.match(data_url or "")
+    if not match:
+        raise ValueError("Invalid data URL")
+    mime = (match.group(1) or "").lower()
+    if mime and not mime.startswith("image/"):
+        raise ValueError(f"Unsupported content type: {mime}")
+
+    encoded = data_url[match.end():]
+    if len(encoded) * 3 // 4 > MAX_IMAGE_BYTES + 2:
+        raise ImageTooLarge("Image exceeds maximum size")
+    try:
+        data = base64.b64decode(encoded)
+    except (binascii.Error, ValueError):
+        raise ValueError("Invalid base64 image data")
+    if not data:
+        raise ValueError("Empty image data")
+    if len(data) > MAX_IMAGE_BYTES:
+        raise ImageTooLarge("Image exceeds maximum size")
+    if sniff_image_format(data) is None:
+        raise ValueError("Unsupported image format")
+
+    pil_image = None
+    if Image is not None:
+        # Image.open only parses the header here; pixels are decoded lazily
+        try:
+            pil_image = Image.open(io.BytesIO(data))
+            width, height = pil_image.size
+        except Exception:
+            raise ValueError("Corrupt image data")
+        if width * height > MAX_IMAGE_PIXELS:
+            raise ImageTooLarge("Image dimensions exceed maximum size")
+
+    if cv2 is not None:
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    else:
+        try:
+            image = np.ascontiguousarray(np.asarray(pil_image.convert("RGB"))[..., ::-1])
+        except Exception:
+            image = None
+    if image is None:
+        raise ValueError("Corrupt image data")
+    return image
+
+
+def load_detector_backend(backend: str, model_path: str, onnx_path: str) -> Optional[DetectorBackend]:
+    """Build the configured detector backend, or None if it cannot be loaded"""
+    try:
+        if backend == "onnx":
+            if ort is None or np is None or not os.path.exists(onnx_path):
+                return None
+            return OnnxBackend(
+                onnx_path,
+                intra_op_threads=settings.ONNX_INTRA_OP_THREADS,
+                inter_op_threads=settings.ONNX_INTER_OP_THREADS,
+                imgsz=settings.AI_INPUT_SIZE,
+            )
+        if YOLO is None or not os.path.exists(model_path):
+            return None
+        return UltralyticsBackend(model_path)
+    except Exception:
+        return None
+
+
 class AIService:
     """AI utilities: image detection (YOLO), text tagging, severity, duplicates, sentiment, prediction."""
 
@@ -29,57 +340,49 @@ class AIService:
         default_path = "app/models/yolo/best.pt"
         fallback_local_path = os.path.join("app", "models", "yolo", "best.pt")
         self.model_path = default_path
+        self.onnx_model_path = settings.YOLO_ONNX_PATH
         allowed = os.getenv("YOLO_ALLOWED_LABELS", "*")
         self.allowed_labels = None if allowed.strip() == "*" else set(allowed.split(","))
 
-        self._yolo = None
-        if YOLO is not None and os.path.exists(self.model_path):
-            try:
-                self._yolo = YOLO(self.model_path)
-            except Exception:
-                self._yolo = None
+        self.backend = load_detector_backend(settings.AI_DETECTOR_BACKEND, self.model_path, self.onnx_model_path)
+
+        # Shared worker that micro-batches concurrent detection requests
+        self.engine = InferenceEngine(
+            self._predict_batch,
+            max_batch_size=settings.AI_BATCH_MAX_SIZE,
+            max_wait_ms=settings.AI_BATCH_MAX_WAIT_MS,
+            max_queue_size=settings.AI_QUEUE_MAX_SIZE,
+        )
 
     # -----------------------
     # Image Recognition (YOLO)
     # -----------------------
-    def detect_issue_from_image(self, image_path_or_url: str) -> List[DetectionResult]:
+    def detect_issue_from_image(self, image_path_or_url: Any) -> List[DetectionResult]:
         """Run YOLO inference to detect environmental issue classes and return labels with confidences.
 
-        Accepts local paths or URLs supported by the YOLO loader.
+        Accepts local paths, URLs supported by the YOLO loader, or decoded BGR
+        arrays (see decode_image_data_url). Requests are
+        queued on the inference engine and batched with concurrent callers.
         """
-        if self._yolo is None:
+        if self.backend is None:
             # Model not available; return empty list
             return []
 
         try:
-            # Use lower confidence threshold to catch more detections
-            results = self._yolo(image_path_or_url, conf=0.1)
+            return self.engine.infer(image_path_or_url, timeout=AI_INFERENCE_TIMEOUT_SECONDS)
         except Exception:
             return []
 
-        detections: List[DetectionResult] = []
-        try:
-            # ultralytics Results list
-            for result in results:  # type: ignore
-                names = result.names  # index->label mapping
-                boxes = result.boxes  # boxes with .cls and .conf
-                if boxes is None:
-                    continue
-                for b in boxes:
-                    cls_idx = int(b.cls)
-                    label = names.get(cls_idx, str(cls_idx)) if isinstance(names, dict) else str(cls_idx)
-                    conf = float(b.conf)
-                    if self.allowed_labels is not None and label.lower() not in self.allowed_labels:
-                        continue
-                    xyxy = b.xyxy[0].tolist() if hasattr(b, "xyxy") else None
-                    detections.append(DetectionResult(label=label, confidence=conf, bbox=xyxy))
-        except Exception:
-            # If schema changes, fail safe
-            return []
+    def _predict_batch(self, sources: List[Any]) -> List[List[DetectionResult]]:
+        """Run one batched forward pass and filter/sort detections per source"""
+        batch_detections = self.backend.predict(list(sources))
+        return [self._filter_detections(detections) for detections in batch_detections]
 
-        # sort high to low confidence
-        detections.sort(key=lambda d: d.confidence, reverse=True)
-        return detections
+    def _filter_detections(self, detections: List[DetectionResult]) -> List[DetectionResult]:
+        """Apply the label allow-list and sort high to low confidence"""
+        if self.allowed_labels is not None:
+            detections = [d for d in detections if d.label.lower() in self.allowed_labels]
+        return sorted(detections, key=lambda d: d.confidence, reverse=True)
 
     # -----------------------
     # NLP: simple keyword-based fallback (can be replaced with real models)
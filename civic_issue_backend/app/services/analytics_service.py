@@ -1,115 +1,354 @@
-from datetime import datetime, timedelta
-from typing import List, Optional
-from collections import Counter
+from datetime import datetime, timedelta, timezone, date, time
+from typing import Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
-from app.schemas.analytics import StatsResponse, HeatmapPoint
-from app.models.issue import Issue
+from sqlalchemy import func, and_, or_, case, cast, update, insert, delete, select, Numeric
+from sqlalchemy.dialects import postgresql, sqlite
+from app.schemas.analytics import StatsResponse, HeatmapPoint, HeatmapGrid
+from app.models.issue import Issue, IssueStatsRollup
+from app.core import geohash
+
+# Rollup counter column for each tracked status; other statuses only count towards the total
+STATUS_COLUMNS = {
+    "new": "new_count",
+    "in_progress": "in_progress_count",
+    "resolved": "resolved_count",
+}
+ROLLUP_FIELDS = ("total_count", "new_count", "in_progress_count", "resolved_count", "resolution_seconds")
+
+
+def rollup_key(issue: Issue):
+    """(department, day, category) bucket an issue is counted in"""
+    return issue.assigned_department or "", issue.created_at.date(), issue.category
+
+
+def resolution_seconds(issue: Issue, resolved_at: Optional[datetime] = None) -> float:
+    resolved_at = resolved_at or issue.resolved_at
+    if not resolved_at or not issue.created_at:
+        return 0.0
+    return (resolved_at - issue.created_at).total_seconds()
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Timestamps are stored as naive UTC; bring aware query bounds to the same form"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _midnight(day: date) -> datetime:
+    return datetime.combine(day, time.min)
+
 
 class AnalyticsService:
     def __init__(self, db: Session):
         self.db = db
 
+    # -----------------------
+    # Incremental KPI rollups
+    # -----------------------
+    def record_issue_created(self, issue: Issue):
+        """Count a newly flushed issue in its rollup bucket (same transaction as the insert)"""
+        deltas = {"total_count": 1}
+        if issue.status in STATUS_COLUMNS:
+            deltas[STATUS_COLUMNS[issue.status]] = 1
+        if issue.status == "resolved":
+            deltas["resolution_seconds"] = resolution_seconds(issue)
+        self._bump_rollup(rollup_key(issue), deltas)
+
+    def record_status_change(self, issue: Issue, old_status: str, old_resolved_at: Optional[datetime]):
+        """Move an issue between status counters after IssueService changed its status"""
+        if old_status == issue.status:
+            if issue.status == "resolved" and old_resolved_at is None and issue.resolved_at:
+                self._bump_rollup(rollup_key(issue), {"resolution_seconds": resolution_seconds(issue)})
+            return
+        deltas: Dict[str, float] = {}
+        if old_status in STATUS_COLUMNS:
+            deltas[STATUS_COLUMNS[old_status]] = -1
+        if issue.status in STATUS_COLUMNS:
+            deltas[STATUS_COLUMNS[issue.status]] = deltas.get(STATUS_COLUMNS[issue.status], 0) + 1
+        seconds = 0.0
+        if old_status == "resolved":
+            seconds -= resolution_seconds(issue, old_resolved_at)
+        if issue.status == "resolved":
+            seconds += resolution_seconds(issue)
+        if seconds:
+            deltas["resolution_seconds"] = seconds
+        if deltas:
+            self._bump_rollup(rollup_key(issue), deltas)
+
+    def record_issue_deleted(self, issue: Issue):
+        """Remove an issue from its rollup bucket before it is deleted"""
+        if issue.created_at is None:
+            return  # never counted
+        deltas = {"total_count": -1}
+        if issue.status in STATUS_COLUMNS:
+            deltas[STATUS_COLUMNS[issue.status]] = -1
+        if issue.status == "resolved":
+            deltas["resolution_seconds"] = -resolution_seconds(issue)
+        self._bump_rollup(rollup_key(issue), deltas)
+
+    def rebuild_rollups(self, batch_size: int = 1000) -> int:
+        """Recompute issue_stats_rollups from the issues table in the caller's transaction.
+
+        For bulk loads (seed scripts, manual SQL) that insert or delete issues
+        without going through IssueService. Returns the number of buckets written.
+        """
+        buckets: Dict[Tuple[str, date, str], Dict[str, float]] = {}
+        issues = self.db.execute(
+            select(Issue.assigned_department, Issue.created_at, Issue.category, Issue.status, Issue.resolved_at)
+            .where(Issue.created_at.isnot(None))
+            .execution_options(yield_per=batch_size)
+        )
+        for issue in issues:
+            bucket = buckets.setdefault(rollup_key(issue), {field: 0 for field in ROLLUP_FIELDS})
+            bucket["total_count"] += 1
+            if issue.status in STATUS_COLUMNS:
+                bucket[STATUS_COLUMNS[issue.status]] += 1
+            if issue.status == "resolved":
+                bucket["resolution_seconds"] += resolution_seconds(issue)
+
+        self.db.execute(delete(IssueStatsRollup))
+        if buckets:
+            self.db.execute(insert(IssueStatsRollup.__table__), [
+                {"department": department, "day": day, "category": category, **values}
+                for (department, day, category), values in buckets.items()
+            ])
+        return len(buckets)
+
+    def _bump_rollup(self, key, deltas: Dict[str, float]):
+        """Atomically add deltas to a rollup row, creating it if needed"""
+        department, day, category = key
+        table = IssueStatsRollup.__table__
+        dialect = self.db.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+            values = {field: 0 for field in ROLLUP_FIELDS}
+            values.update(deltas)
+            stmt = dialect_insert(table).values(department=department, day=day, category=category, **values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.department, table.c.day, table.c.category],
+                set_={field: table.c[field] + stmt.excluded[field] for field in deltas},
+            )
+            self.db.execute(stmt)
+            return
+
+        result = self.db.execute(
+            update(table)
+            .where(table.c.department == department, table.c.day == day, table.c.category == category)
+            .values({field: table.c[field] + delta for field, delta in deltas.items()})
+        )
+        if result.rowcount == 0:
+            values = {field: 0 for field in ROLLUP_FIELDS}
+            values.update(deltas)
+            self.db.execute(insert(table).values(department=department, day=day, category=category, **values))
+
+    # -----------------------
+    # Dashboard KPIs
+    # -----------------------
     def get_stats(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None, department: Optional[str] = None):
-        """Get key environmental KPI numbers for dashboard header"""
-        query = self.db.query(Issue)
-        
-        # Filter by department if provided
-        if department:
-            query = query.filter(Issue.assigned_department == department)
-        
-        # Filter by date range if provided
-        if start_date:
-            query = query.filter(Issue.created_at >= start_date)
-        if end_date:
-            query = query.filter(Issue.created_at <= end_date)
-        
-        issues = query.all()
-        
-        # Calculate stats
-        total_issues = len(issues)
-        
-        # Count by status
-        status_counts = Counter(issue.status for issue in issues)
-        pending = status_counts.get("new", 0) + status_counts.get("in_progress", 0)
-        in_progress = status_counts.get("in_progress", 0)
-        
-        # Resolved today
+        """Get key environmental KPI numbers for dashboard header.
+
+        Whole days come from issue_stats_rollups; only the partial days at the
+        edges of the requested range and the resolved-today/this-week counts
+        (bounded by the resolved_at index) touch the issues table.
+        """
+        start_date, end_date = _naive_utc(start_date), _naive_utc(end_date)
+        categories = self._category_totals(start_date, end_date, department)
+
+        total_issues = sum(c["total_count"] for c in categories.values())
+        new = sum(c["new_count"] for c in categories.values())
+        in_progress = sum(c["in_progress_count"] for c in categories.values())
+        resolved = sum(c["resolved_count"] for c in categories.values())
+        total_time = sum(c["resolution_seconds"] for c in categories.values())
+        pending = new + in_progress
+
+        # Resolved today / this week
         today = datetime.now().date()
-        resolved_today = len([
-            issue for issue in issues 
-            if issue.status == "resolved" and 
-            issue.updated_at.date() == today
-        ])
-        
-        # Resolved this week
         week_ago = datetime.now() - timedelta(days=7)
-        resolved_this_week = len([
-            issue for issue in issues 
-            if issue.status == "resolved" and 
-            issue.updated_at >= week_ago
-        ])
-        
+        resolved_query = self.db.query(
+            func.count(Issue.id),
+            func.sum(case((and_(Issue.resolved_at >= _midnight(today),
+                                Issue.resolved_at < _midnight(today + timedelta(days=1))), 1), else_=0)),
+        ).filter(Issue.status == "resolved", Issue.resolved_at >= week_ago)
+        resolved_this_week, resolved_today = self._filter_issues(resolved_query, start_date, end_date, department).one()
+
         # Average resolution time
-        resolved_issues = [issue for issue in issues if issue.status == "resolved"]
-        if resolved_issues:
-            total_time = sum(
-                (issue.updated_at - issue.created_at).total_seconds()
-                for issue in resolved_issues
-            )
-            avg_resolution_time_hours = (total_time / len(resolved_issues)) / 3600
-        else:
-            avg_resolution_time_hours = 0.0
-        
+        avg_resolution_time_hours = (total_time / resolved) / 3600 if resolved else 0.0
+
         # Top category
-        categories = Counter(issue.category for issue in issues)
-        top_category = categories.most_common(1)[0][0] if categories else "None"
-        
+        counts = {category: c["total_count"] for category, c in categories.items() if c["total_count"] > 0}
+        top_category = min(counts, key=lambda category: (-counts[category], category)) if counts else "None"
+
         return StatsResponse(
             total_issues=total_issues,
-            resolved_today=resolved_today,
+            resolved_today=resolved_today or 0,
             pending=pending,
             in_progress=in_progress,
-            resolved_this_week=resolved_this_week,
+            resolved_this_week=resolved_this_week or 0,
             avg_resolution_time_hours=round(avg_resolution_time_hours, 2),
             top_category=top_category,
         )
+
+    def _category_totals(self, start_date: Optional[datetime], end_date: Optional[datetime],
+                         department: Optional[str]) -> Dict[str, Dict[str, float]]:
+        """Per-category rollup sums for issues created in [start_date, end_date]"""
+        # Work with a half-open range; created_at <= end_date == created_at < end_date + 1us
+        end_exclusive = end_date + timedelta(microseconds=1) if end_date else None
+        first_day = None
+        if start_date:
+            first_day = start_date.date() if start_date == _midnight(start_date.date()) else start_date.date() + timedelta(days=1)
+        last_day_exclusive = end_exclusive.date() if end_exclusive else None
+
+        totals: Dict[str, Dict[str, float]] = {}
+
+        def add(category, row):
+            bucket = totals.setdefault(category, {field: 0 for field in ROLLUP_FIELDS})
+            for field, value in zip(ROLLUP_FIELDS, row):
+                bucket[field] += value or 0
+
+        if first_day and last_day_exclusive and first_day >= last_day_exclusive:
+            # Range lies within a single day: aggregate the issues directly
+            for category, *row in self._aggregate_issues(start_date, end_exclusive, department):
+                add(category, row)
+            return totals
+
+        query = self.db.query(
+            IssueStatsRollup.category,
+            *[func.sum(getattr(IssueStatsRollup, field)) for field in ROLLUP_FIELDS],
+        )
+        if department:
+            query = query.filter(IssueStatsRollup.department == department)
+        if first_day:
+            query = query.filter(IssueStatsRollup.day >= first_day)
+        if last_day_exclusive:
+            query = query.filter(IssueStatsRollup.day < last_day_exclusive)
+        for category, *row in query.group_by(IssueStatsRollup.category).all():
+            add(category, row)
+
+        # Partial days at either edge of the range
+        if start_date and start_date < _midnight(first_day):
+            for category, *row in self._aggregate_issues(start_date, _midnight(first_day), department):
+                add(category, row)
+        if end_exclusive and end_exclusive > _midnight(last_day_exclusive):
+            for category, *row in self._aggregate_issues(_midnight(last_day_exclusive), end_exclusive, department):
+                add(category, row)
+        return totals
+
+    def _aggregate_issues(self, start: datetime, end_exclusive: datetime, department: Optional[str]):
+        """Rollup-shaped GROUP BY over issues created in [start, end_exclusive)"""
+        def status_count(status):
+            return func.sum(case((Issue.status == status, 1), else_=0))
+
+        seconds = self._epoch(Issue.resolved_at) - self._epoch(Issue.created_at)
+        query = self.db.query(
+            Issue.category,
+            func.count(Issue.id),
+            status_count("new"),
+            status_count("in_progress"),
+            status_count("resolved"),
+            func.sum(case((and_(Issue.status == "resolved", Issue.resolved_at.isnot(None)), seconds), else_=0)),
+        ).filter(Issue.created_at >= start, Issue.created_at < end_exclusive)
+        if department:
+            query = query.filter(Issue.assigned_department == department)
+        return query.group_by(Issue.category).all()
+
+    def _filter_issues(self, query, start_date: Optional[datetime], end_date: Optional[datetime], department: Optional[str]):
+        if department:
+            query = query.filter(Issue.assigned_department == department)
+        if start_date:
+            query = query.filter(Issue.created_at >= start_date)
+        if end_date:
+            query = query.filter(Issue.created_at <= end_date)
+        return query
+
+    def _epoch(self, column):
+        """Seconds since an epoch for a DateTime column, per dialect"""
+        if self.db.get_bind().dialect.name == "sqlite":
+            return func.julianday(column) * 86400.0
+        return func.extract("epoch", column)
     
     def get_heatmap_data(self, status: Optional[str] = None, category: Optional[str] = None, department: Optional[str] = None):
         """Get environmental issue coordinates for pollution/waste heatmap visualization"""
-        query = self.db.query(Issue)
-        
-        # Apply filters
+        # Group by location (4 decimal places) and count in SQL
+        lat_key = func.round(cast(Issue.lat, Numeric), 4)
+        lng_key = func.round(cast(Issue.lng, Numeric), 4)
+        query = self.db.query(
+            lat_key, lng_key, func.count(Issue.id), func.min(Issue.category), func.min(Issue.status)
+        )
+        query = self._filter_heatmap(query, status, category, department)
+        rows = query.group_by(lat_key, lng_key).all()
+
+        return [
+            HeatmapPoint(lat=float(lat), lng=float(lng), count=count, category=cat, status=st)
+            for lat, lng, count, cat, st in rows
+        ]
+
+    def get_heatmap_grid(self, zoom: int, bbox: Optional[Tuple[float, float, float, float]] = None,
+                         status: Optional[str] = None, category: Optional[str] = None,
+                         department: Optional[str] = None) -> HeatmapGrid:
+        """Aggregate issues into geohash cells sized for a map zoom level.
+
+        Counting happens in SQL with GROUP BY on a prefix of the stored geohash;
+        only one row per (cell, category, status) is returned to Python. The
+        optional bbox is (min_lat, min_lng, max_lat, max_lng).
+        """
+        precision = geohash.precision_for_zoom(zoom)
+        cell = func.substr(Issue.geohash, 1, precision)
+        query = self.db.query(
+            cell, Issue.category, Issue.status,
+            func.count(Issue.id), func.sum(Issue.lat), func.sum(Issue.lng),
+        ).filter(Issue.geohash.isnot(None))
+        query = self._filter_heatmap(query, status, category, department)
+        if bbox:
+            min_lat, min_lng, max_lat, max_lng = bbox
+            prefixes = geohash.cells_for_bbox(min_lat, min_lng, max_lat, max_lng)
+            query = query.filter(
+                or_(*[and_(Issue.geohash >= prefix, Issue.geohash < geohash.prefix_upper_bound(prefix))
+                      for prefix in prefixes]),
+                Issue.lat.between(min_lat, max_lat),
+                Issue.lng.between(min_lng, max_lng),
+            )
+        rows = query.group_by(cell, Issue.category, Issue.status).all()
+
+        # Fold (cell, category, status) groups into columns
+        cells: Dict[str, int] = {}
+        lat_sums: List[float] = []
+        lng_sums: List[float] = []
+        counts: List[int] = []
+        by_category: Dict[str, List[int]] = {}
+        by_status: Dict[str, List[int]] = {}
+        for cell_id, cat, st, count, lat_sum, lng_sum in rows:
+            index = cells.get(cell_id)
+            if index is None:
+                index = cells[cell_id] = len(counts)
+                lat_sums.append(0.0)
+                lng_sums.append(0.0)
+                counts.append(0)
+                for column in list(by_category.values()) + list(by_status.values()):
+                    column.append(0)
+            lat_sums[index] += lat_sum
+            lng_sums[index] += lng_sum
+            counts[index] += count
+            by_category.setdefault(cat, [0] * len(counts))[index] += count
+            by_status.setdefault(st, [0] * len(counts))[index] += count
+
+        lat_size, lng_size = geohash.cell_size(precision)
+        return HeatmapGrid(
+            precision=precision,
+            cell_size=[lat_size, lng_size],
+            # Cell centroids keep hotspots where the issues are, not at cell centres
+            lat=[round(lat_sums[i] / counts[i], 6) for i in range(len(counts))],
+            lng=[round(lng_sums[i] / counts[i], 6) for i in range(len(counts))],
+            count=counts,
+            by_category=by_category,
+            by_status=by_status,
+        )
+
+    def _filter_heatmap(self, query, status: Optional[str], category: Optional[str], department: Optional[str]):
         if department:
             query = query.filter(Issue.assigned_department == department)
         if status:
             query = query.filter(Issue.status == status)
         if category:
             query = query.filter(Issue.category == category)
-        
-        issues = query.all()
-        
-        # Group by location and count
-        location_counts = {}
-        for issue in issues:
-            key = (round(issue.lat, 4), round(issue.lng, 4))
-            if key not in location_counts:
-                location_counts[key] = {
-                    "count": 0,
-                    "category": issue.category,
-                    "status": issue.status
-                }
-            location_counts[key]["count"] += 1
-        
-        # Convert to heatmap points
-        heatmap_points = []
-        for (lat, lng), data in location_counts.items():
-            heatmap_points.append(HeatmapPoint(
-                lat=lat,
-                lng=lng,
-                count=data["count"],
-                category=data["category"],
-                status=data["status"]
-            ))
-        
-        return heatmap_points
+        return query
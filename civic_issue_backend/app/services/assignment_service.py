@@ -0,0 +1,175 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event, func, inspect, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.issue import Issue
+from app.models.user import User
+
+# Statuses that count towards an admin's workload (users.open_issue_count)
+OPEN_STATUSES = ("new", "in_progress")
+
+# Departments never used as the general fallback
+FALLBACK_EXCLUDED_DEPARTMENTS = ("Municipal Corporation",)
+
+
+class AssignmentService:
+    """Workload-aware admin assignment backed by users.open_issue_count.
+
+    Candidate admins per department are cached in-process. Picking the least
+    loaded candidate and incrementing its counter is a single
+    ``UPDATE ... RETURNING`` statement, so concurrent creates never read the
+    same minimum and both claim it. Counters are adjusted in the caller's
+    transaction on create, status change and delete.
+    """
+
+    # department -> (loaded_at, admin ids), shared by all instances
+    _admin_cache: Dict[str, Tuple[float, Tuple[int, ...]]] = {}
+    _cache_lock = threading.Lock()
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @classmethod
+    def invalidate_cache(cls):
+        with cls._cache_lock:
+            cls._admin_cache.clear()
+
+    def assign(self, department: str) -> Optional[int]:
+        """Claim the least-loaded active admin for a department; returns its id or None"""
+        for refresh in (False, True):
+            candidates = self._candidate_admins(department, refresh=refresh)
+            if not candidates:
+                return None
+            admin_id = self._claim_least_loaded(candidates)
+            if admin_id is not None:
+                return admin_id
+            # Every cached candidate was deactivated or removed elsewhere; reload once
+        return None
+
+    def record_status_change(self, issue: Issue, old_status: str):
+        """Move an assigned issue in or out of its admin's open count"""
+        was_open = old_status in OPEN_STATUSES
+        is_open = issue.status in OPEN_STATUSES
+        if issue.assigned_admin_id and was_open != is_open:
+            self._adjust(issue.assigned_admin_id, 1 if is_open else -1)
+
+    def record_issue_deleted(self, issue: Issue):
+        if issue.assigned_admin_id and issue.status in OPEN_STATUSES:
+            self._adjust(issue.assigned_admin_id, -1)
+
+    def recount_open_issues(self):
+        """Recompute every user's open_issue_count from the issues table in the caller's transaction.
+
+        For bulk loads (seed scripts, manual SQL) that assign issues without
+        going through IssueService.
+        """
+        users, issues = User.__table__, Issue.__table__
+        open_count = (
+            select(func.count(issues.c.id))
+            .where(issues.c.assigned_admin_id == users.c.id, issues.c.status.in_(OPEN_STATUSES))
+            .scalar_subquery()
+        )
+        self.db.execute(update(users).values(open_issue_count=open_count))
+
+    def _candidate_admins(self, department: str, refresh: bool = False) -> Tuple[int, ...]:
+        now = time.monotonic()
+        if not refresh:
+            with self._cache_lock:
+                cached = self._admin_cache.get(department)
+            if cached is not None and now - cached[0] < settings.ADMIN_CACHE_TTL_SECONDS:
+                return cached[1]
+
+        active_admins = select(User.id).where(User.role == "admin", User.is_active == True)  # noqa: E712
+        admin_ids = self.db.execute(active_admins.where(User.department == department)).scalars().all()
+        # No department-specific admin: a general admin (not the Municipal Commissioner), else anyone
+        if not admin_ids:
+            admin_ids = self.db.execute(
+                active_admins.where(User.department.notin_(FALLBACK_EXCLUDED_DEPARTMENTS))
+            ).scalars().all()
+        if not admin_ids:
+            admin_ids = self.db.execute(active_admins).scalars().all()
+
+        candidates = tuple(sorted(admin_ids))
+        with self._cache_lock:
+            self._admin_cache[department] = (now, candidates)
+        return candidates
+
+    def _claim_least_loaded(self, candidates: Tuple[int, ...]) -> Optional[int]:
+        users = User.__table__
+        dialect = self.db.get_bind().dialect
+        pick = (
+            select(users.c.id)
+            .where(users.c.id.in_(candidates), users.c.role == "admin", users.c.is_active == True)  # noqa: E712
+            .order_by(users.c.open_issue_count, users.c.id)
+            .limit(1)
+        )
+        if not dialect.update_returning:
+            admin_id = self.db.execute(pick).scalar()
+            if admin_id is not None:
+                self._adjust(admin_id, 1)
+            return admin_id
+
+        def claim(subquery):
+            return self.db.execute(
+                update(users)
+                .where(users.c.id == subquery.scalar_subquery())
+                .values(open_issue_count=users.c.open_issue_count + 1)
+                .returning(users.c.id)
+            ).scalar()
+
+        if dialect.name == "postgresql":
+            # Skip admins another transaction is claiming right now rather than
+            # queueing behind it for the same row; block only if all are taken
+            admin_id = claim(pick.with_for_update(skip_locked=True))
+            if admin_id is not None:
+                return admin_id
+        return claim(pick)
+
+    def _adjust(self, admin_id: int, delta: int):
+        users = User.__table__
+        self.db.execute(
+            update(users)
+            .where(users.c.id == admin_id)
+            .values(open_issue_count=users.c.open_issue_count + delta)
+        )
+
+
+# -----------------------
+# Cache invalidation
+# -----------------------
+_ADMIN_FIELDS = ("role", "department", "is_active")
+
+
+def _mark_admins_changed(target: User):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info["admins_changed"] = True
+
+
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_delete")
+def _admin_added_or_removed(mapper, connection, target):
+    if target.role == "admin":
+        _mark_admins_changed(target)
+
+
+@event.listens_for(User, "after_update")
+def _admin_updated(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in _ADMIN_FIELDS):
+        _mark_admins_changed(target)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop("admins_changed", False):
+        AssignmentService.invalidate_cache()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("admins_changed", None)
@@ -1,51 +1,129 @@
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from jose import jwt
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.core.config import settings
+from app.core.password_hasher import hasher, pwd_ctx
+from app.core.phone_digest import phone_digest
 from app.models.user import User
 from app.schemas.user import UserUpdate
 from typing import List, Optional
 
-pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 class AuthService:
+    """Accounts and logins.
+
+    The async create_user_async/authenticate_user_async are what the routes
+    use: their bcrypt work runs in the bounded hashing pool (core.password_hasher)
+    instead of on the event loop. create_user/authenticate_user hash inline and
+    are meant for scripts.
+    """
+
     def __init__(self, db: Session):
         self.db = db
 
     def create_user(self, full_name, phone_number, password, role="citizen", department=None):
-        # Check if user already exists
-        existing_user = self.db.query(User).filter(User.phone_number == phone_number).first()
+        existing_user = self._find_user(phone_number)
         if existing_user:
             # Return existing user info instead of error to make register idempotent
-            return {
-                "id": existing_user.id,
-                "full_name": existing_user.full_name,
-                "phone_number": existing_user.phone_number,
-                "role": existing_user.role,
-                "department": existing_user.department,
-                "ward": existing_user.ward,
-                "trust_score": existing_user.trust_score,
-                "profile_picture_url": existing_user.profile_picture_url,
-                "created_at": existing_user.created_at,
-                "updated_at": existing_user.updated_at
-            }
-        
-        # Create new user
+            return self._user_dict(existing_user)
+        return self._add_user(full_name, phone_number, pwd_ctx.hash(password), role, department)
+
+    async def create_user_async(self, full_name, phone_number, password, role="citizen", department=None):
+        existing_user = self._find_user(phone_number)
+        if existing_user:
+            return self._user_dict(existing_user)
+        self._release_connection()
+        password_hash = await hasher.hash(password)
+        return self._add_user(full_name, phone_number, password_hash, role, department)
+
+    def authenticate_user(self, username, password):
+        user = self._find_user(username)
+        if not user:
+            return None
+        try:
+            verified, new_hash = pwd_ctx.verify_and_update(self._bcrypt_secret(password), user.password_hash)
+        except ValueError as e:
+            # Handle bcrypt errors gracefully
+            print(f"Password verification error: {e}")
+            return None
+        return self._login(user, verified, new_hash)
+
+    async def authenticate_user_async(self, username, password):
+        user = self._find_user(username)
+        if not user:
+            return None
+        password_hash = user.password_hash
+        self._release_connection()
+        try:
+            verified, new_hash = await hasher.verify_and_update(self._bcrypt_secret(password), password_hash)
+        except ValueError as e:
+            print(f"Password verification error: {e}")
+            return None
+        return self._login(user, verified, new_hash)
+
+    def _find_user(self, phone_number) -> Optional[User]:
+        # One probe of the unique digest index
+        return self.db.query(User).filter(User.phone_number_hash == phone_digest(phone_number)).first()
+
+    def _release_connection(self):
+        """End the read transaction so its pooled connection is not held while bcrypt runs"""
+        self.db.rollback()
+
+    def _add_user(self, full_name, phone_number, password_hash, role, department):
         user = User(
             full_name=full_name,
             phone_number=phone_number,
-            phone_number_hash=pwd_ctx.hash(phone_number),  # Encrypt phone number
-            password_hash=pwd_ctx.hash(password),
+            phone_number_hash=phone_digest(phone_number),
+            password_hash=password_hash,
             role=role,
             department=department,
             trust_score=100.0
         )
         
         self.db.add(user)
-        self.db.commit()
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # A concurrent register for the same number won the unique index
+            # while bcrypt ran; stay idempotent and return that user
+            self.db.rollback()
+            existing_user = self._find_user(phone_number)
+            if existing_user is None:
+                raise
+            return self._user_dict(existing_user)
         self.db.refresh(user)
         
+        return self._user_dict(user)
+
+    @staticmethod
+    def _bcrypt_secret(password) -> str:
+        """Password as a string within bcrypt's 72-byte limit"""
+        if isinstance(password, bytes):
+            password = password.decode('utf-8', errors='ignore')
+        password_bytes = str(password).encode('utf-8')
+        return password_bytes[:72].decode('utf-8', errors='ignore')
+
+    def _login(self, user: User, verified: bool, new_hash: Optional[str]):
+        """Tokens for a verified login, storing the upgraded hash if the cost parameters changed"""
+        if not verified:
+            return None
+        if new_hash:
+            user.password_hash = new_hash
+            self.db.commit()
+        access_token = jwt.encode(
+            {"sub": str(user.id), "exp": datetime.utcnow() + timedelta(minutes=60)}, 
+            settings.SECRET_KEY, 
+            algorithm=settings.ALGORITHM
+        )
+        refresh_token = jwt.encode(
+            {"sub": str(user.id), "exp": datetime.utcnow() + timedelta(days=7)}, 
+            settings.SECRET_KEY, 
+            algorithm=settings.ALGORITHM
+        )
+        return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+
+    @staticmethod
+    def _user_dict(user: User) -> dict:
         return {
             "id": user.id,
             "full_name": user.full_name,
@@ -59,45 +137,6 @@ class AuthService:
             "updated_at": user.updated_at
         }
 
-    def authenticate_user(self, username, password):
-        user = self.db.query(User).filter(User.phone_number == username).first()
-        if not user:
-            return None
-        
-        # Ensure password is a string and not too long for bcrypt (72 byte limit)
-        if isinstance(password, bytes):
-            password = password.decode('utf-8', errors='ignore')
-        password_str = str(password)
-        
-        # Bcrypt has a 72-byte limit, truncate if necessary
-        # Convert to bytes to check length, then truncate
-        password_bytes = password_str.encode('utf-8')
-        if len(password_bytes) > 72:
-            password_str = password_bytes[:72].decode('utf-8', errors='ignore')
-        
-        try:
-            if pwd_ctx.verify(password_str, user.password_hash):
-                access_token = jwt.encode(
-                    {"sub": str(user.id), "exp": datetime.utcnow() + timedelta(minutes=60)}, 
-                    settings.SECRET_KEY, 
-                    algorithm=settings.ALGORITHM
-                )
-                refresh_token = jwt.encode(
-                    {"sub": str(user.id), "exp": datetime.utcnow() + timedelta(days=7)}, 
-                    settings.SECRET_KEY, 
-                    algorithm=settings.ALGORITHM
-                )
-                return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
-        except ValueError as e:
-            # Handle bcrypt errors gracefully
-            print(f"Password verification error: {e}")
-            return None
-        except Exception as e:
-            print(f"Authentication error: {e}")
-            return None
-        
-        return None
-
     def get_user(self, user_id: int):
         user = self.db.query(User).filter(User.id == user_id).first()
         if not user:
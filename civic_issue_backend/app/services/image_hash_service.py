@@ -0,0 +1,175 @@
+import base64
+import io
+import os
+import re
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+try:
+    # Optional import; fingerprinting is skipped if Pillow is not available
+    from PIL import Image  # type: ignore
+except Exception:  # pragma: no cover
+    Image = None  # type: ignore
+
+HASH_BITS = 64
+HASH_BANDS = 4  # 4 x 16-bit bands: any hash within distance 3 shares at least one band exactly
+BAND_BITS = HASH_BITS // HASH_BANDS
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+FETCH_TIMEOUT_SECONDS = 5
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """A storage host must serve the image itself, not bounce the fetch elsewhere"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_opener = urllib.request.build_opener(_NoRedirect)
+
+_fetch_pool: Optional[ThreadPoolExecutor] = None
+_fetch_pool_lock = threading.Lock()
+
+
+def _get_fetch_pool() -> ThreadPoolExecutor:
+    """Shared threads for bounded remote fetches during issue creation"""
+    global _fetch_pool
+    if _fetch_pool is None:
+        with _fetch_pool_lock:
+            if _fetch_pool is None:
+                from app.core.config import settings
+                _fetch_pool = ThreadPoolExecutor(max(1, settings.IMAGE_FETCH_WORKERS), thread_name_prefix="image-fetch")
+    return _fetch_pool
+
+
+class ImageHashService:
+    """Perceptual (difference) hashing for duplicate image detection.
+
+    Hashes are 64-bit dHash values. They are split into bands so that similar
+    images can be found with indexed equality lookups (multi-index hashing)
+    instead of comparing against every stored image.
+
+    Sources are client-supplied, so only data URLs, files under the app's
+    /static root and http(s) URLs on allowed_hosts (the image storage) are
+    read. Remote reads block: the request path bounds them with compute_many's
+    timeout, background jobs fetch without one.
+    """
+
+    def __init__(self, static_root: str = "static", allowed_hosts: Optional[Iterable[str]] = None):
+        self.static_root = os.path.realpath(static_root)
+        if allowed_hosts is None:
+            from app.core.config import settings
+            allowed_hosts = settings.IMAGE_FETCH_ALLOWED_HOSTS.split(",")
+        self.allowed_hosts = {host.strip().lower() for host in allowed_hosts if host.strip()}
+
+    def is_remote(self, source: str) -> bool:
+        return bool(source) and source.startswith(("http://", "https://"))
+
+    def compute_dhash(self, source: str, allow_remote: bool = False,
+                      fetch_timeout: float = FETCH_TIMEOUT_SECONDS) -> Optional[int]:
+        """Return the 64-bit dHash of a data URL, static path or (if allow_remote) storage URL, or None"""
+        if Image is None or not source:
+            return None
+        data = self._load_bytes(source, allow_remote, fetch_timeout)
+        if not data:
+            return None
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                # 9x8 grayscale: each row yields 8 left/right gradient bits
+                small = img.convert("L").resize((9, 8), Image.LANCZOS)
+                pixels = small.tobytes()
+        except Exception:
+            return None
+
+        value = 0
+        for row in range(8):
+            offset = row * 9
+            for col in range(8):
+                value = (value << 1) | (1 if pixels[offset + col] > pixels[offset + col + 1] else 0)
+        return value
+
+    def compute_many(self, sources: List[str], allow_remote: bool = False, timeout: Optional[float] = None,
+                     max_remote: Optional[int] = None) -> Dict[str, Optional[int]]:
+        """Hash each distinct source once.
+
+        With allow_remote, up to max_remote storage URLs are fetched in parallel;
+        given a timeout, any not hashed by then (or beyond max_remote) map to None.
+        """
+        sources = list(dict.fromkeys(sources or []))
+        remote = [s for s in sources if self.is_remote(s) and self.is_allowed(s)] if allow_remote else []
+        if max_remote is not None:
+            remote = remote[:max(0, max_remote)]
+        hashes: Dict[str, Optional[int]] = {
+            source: None if self.is_remote(source) else self.compute_dhash(source) for source in sources
+        }
+        if not remote:
+            return hashes
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        fetch_timeout = min(FETCH_TIMEOUT_SECONDS, timeout) if timeout is not None else FETCH_TIMEOUT_SECONDS
+        futures = {
+            _get_fetch_pool().submit(self.compute_dhash, source, True, fetch_timeout): source for source in remote
+        }
+        done, _ = wait(futures, timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+        for future in done:
+            try:
+                hashes[futures[future]] = future.result()
+            except Exception:
+                pass
+        return hashes
+
+    def is_allowed(self, source: str) -> bool:
+        """Whether a remote URL is on the image storage allow-list"""
+        return (urlsplit(source).hostname or "").lower() in self.allowed_hosts
+
+    @staticmethod
+    def to_signed(value: int) -> int:
+        """Map an unsigned 64-bit hash into the signed BIGINT range"""
+        return value - (1 << HASH_BITS) if value >= (1 << (HASH_BITS - 1)) else value
+
+    @staticmethod
+    def to_unsigned(value: int) -> int:
+        return value + (1 << HASH_BITS) if value < 0 else value
+
+    @staticmethod
+    def bands(value: int) -> List[int]:
+        """Split an unsigned hash into HASH_BANDS integers of BAND_BITS each"""
+        mask = (1 << BAND_BITS) - 1
+        return [(value >> (BAND_BITS * i)) & mask for i in range(HASH_BANDS)]
+
+    @staticmethod
+    def hamming(a: int, b: int) -> int:
+        return bin(a ^ b).count("1")
+
+    def _load_bytes(self, source: str, allow_remote: bool = False,
+                    fetch_timeout: float = FETCH_TIMEOUT_SECONDS) -> Optional[bytes]:
+        """Read image bytes from a data URL, a /static/ path or an allowed storage URL"""
+        try:
+            if source.startswith("data:"):
+                match = re.match(r"^data:(.*?);base64,(.*)$", source, re.S)
+                if not match:
+                    return None
+                return base64.b64decode(match.group(2))
+
+            if self.is_remote(source):
+                if not allow_remote or not self.is_allowed(source):
+                    return None
+                with _opener.open(source, timeout=fetch_timeout) as resp:
+                    return resp.read(MAX_IMAGE_BYTES + 1)[:MAX_IMAGE_BYTES]
+
+            if not source.startswith("/static/"):
+                return None
+            # realpath resolves ../ and symlinks, so the file must really live under static_root
+            path = os.path.realpath(os.path.join(self.static_root, source[len("/static/"):]))
+            if not path.startswith(self.static_root + os.sep):
+                return None
+            if os.path.isfile(path) and os.path.getsize(path) <= MAX_IMAGE_BYTES:
+                with open(path, "rb") as f:
+                    return f.read()
+        except Exception:
+            return None
+        return None
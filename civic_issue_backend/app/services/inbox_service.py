@@ -0,0 +1,153 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.pagination import keyset_paginate
+from app.core.websocket import manager, user_channel
+from app.models.issue import Notification, NotificationArchive
+from app.models.user import User
+
+
+def adjust_unread_counts(db: Session, deltas: Dict[int, int]):
+    """Apply per-user deltas to users.unread_notification_count in the current transaction"""
+    rows = [{"b_user_id": user_id, "b_delta": delta} for user_id, delta in deltas.items() if delta]
+    if not rows:
+        return
+    users = User.__table__
+    db.execute(
+        update(users)
+        .where(users.c.id == bindparam("b_user_id"))
+        .values(unread_notification_count=users.c.unread_notification_count + bindparam("b_delta")),
+        rows,
+    )
+
+
+class InboxService:
+    """A user's notification inbox.
+
+    The unread badge is users.unread_notification_count, kept exact by moving
+    it in the same transaction as every change to a notification's read state
+    (queue_notifications adds to it), so reading it is a primary-key lookup
+    rather than a COUNT over the fastest-growing table. Pages are keyset
+    paginated on (created_at, id). Every change to a user's unread count is
+    pushed to their WebSocket channel as an "inbox_changed" delta, so clients
+    never re-fetch the list to refresh the badge.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        # Cursor for the page after the last list returned by this service (None on the last page)
+        self.next_cursor: Optional[str] = None
+
+    def get_notifications(self, user_id: int, limit: int = 50, cursor: Optional[str] = None,
+                          unread_only: bool = False) -> List[dict]:
+        """A page of the user's notifications, newest first"""
+        query = self.db.query(Notification).filter(Notification.user_id == user_id)
+        if unread_only:
+            query = query.filter(Notification.read == False)
+        notifications, self.next_cursor = keyset_paginate(
+            query, "created_at", Notification.created_at, Notification.id, cursor=cursor, limit=limit
+        )
+        return [
+            {
+                "id": n.id,
+                "user_id": n.user_id,
+                "issue_id": n.issue_id,
+                "type": n.type,
+                "message": n.message,
+                "read": n.read,
+                "created_at": n.created_at
+            }
+            for n in notifications
+        ]
+
+    def unread_count(self, user_id: int) -> int:
+        return self.db.execute(
+            select(User.unread_notification_count).where(User.id == user_id)
+        ).scalar() or 0
+
+    def mark_read(self, user_id: int, notification_id: int) -> Optional[int]:
+        """Mark one notification read; returns the new unread count, None if no such notification"""
+        marked = self.db.execute(
+            update(Notification.__table__)
+            .where(
+                Notification.id == notification_id,
+                Notification.user_id == user_id,
+                Notification.read == False
+            )
+            .values(read=True)
+        ).rowcount
+        if not marked:
+            exists = self.db.execute(
+                select(Notification.id).where(Notification.id == notification_id, Notification.user_id == user_id)
+            ).first()
+            if exists is None:
+                return None
+            return self.unread_count(user_id)  # Already read
+        return self._commit_read(user_id, marked)
+
+    def mark_all_read(self, user_id: int) -> int:
+        """Mark every unread notification read; returns how many were marked"""
+        if self.unread_count(user_id) == 0:
+            return 0
+        marked = self.db.execute(
+            update(Notification.__table__)
+            .where(Notification.user_id == user_id, Notification.read == False)
+            .values(read=True)
+        ).rowcount
+        self._commit_read(user_id, marked)
+        return marked
+
+    def delete_for_issue(self, issue_id: int):
+        """Delete an issue's notifications (no commit), releasing their unread counts"""
+        unread = self.db.execute(
+            select(Notification.user_id, func.count())
+            .where(Notification.issue_id == issue_id, Notification.read == False)
+            .group_by(Notification.user_id)
+        ).all()
+        adjust_unread_counts(self.db, {user_id: -count for user_id, count in unread})
+        self.db.execute(delete(Notification.__table__).where(Notification.issue_id == issue_id))
+
+    def archive_read(self, older_than_days: int, batch_size: int = 1000) -> int:
+        """Move read notifications older than the cutoff to notification_archive.
+
+        Works in batches of batch_size rows, one short transaction each, so the
+        job never holds a long write lock; returns the number archived.
+        """
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        table = Notification.__table__
+        columns = [table.c.id, table.c.user_id, table.c.issue_id, table.c.type, table.c.message, table.c.created_at]
+        archived = 0
+        while True:
+            # Old rows have the lowest ids, so the primary key scan stops early
+            ids = self.db.execute(
+                select(table.c.id)
+                .where(table.c.read == True, table.c.dispatched_at.isnot(None), table.c.created_at < cutoff)
+                .order_by(table.c.id)
+                .limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                return archived
+            self.db.execute(
+                insert(NotificationArchive.__table__).from_select(
+                    ["id", "user_id", "issue_id", "type", "message", "created_at"],
+                    select(*columns).where(table.c.id.in_(ids)),
+                )
+            )
+            self.db.execute(delete(table).where(table.c.id.in_(ids)))
+            self.db.commit()
+            archived += len(ids)
+
+    def _commit_read(self, user_id: int, marked: int) -> int:
+        adjust_unread_counts(self.db, {user_id: -marked})
+        count = self.unread_count(user_id)
+        self.db.commit()
+        publish_inbox_changed(user_id, count)
+        return count
+
+
+def publish_inbox_changed(user_id: int, unread_count: int):
+    """Tell the user's open clients their unread count changed; callable from any thread"""
+    manager.publish_threadsafe(user_channel(user_id), {"type": "inbox_changed", "unread_count": unread_count})
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+
+class InferenceEngine:
+    """Long-lived worker thread that micro-batches detection requests.
+
+    Callers submit one image at a time and get a Future back. The worker waits
+    for up to ``max_wait_ms`` after the first pending image to collect at most
+    ``max_batch_size`` images, runs them through ``predict_batch`` as a single
+    call and resolves each caller's Future with its own result.
+    """
+
+    def __init__(self, predict_batch: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 8, max_wait_ms: float = 10.0, max_queue_size: int = 256):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._stopped = False
+        self._closed = False
+
+        # Metrics
+        self._batches = 0
+        self._images = 0
+        self._errors = 0
+        self._max_queue_depth = 0
+        self._batch_sizes: Dict[int, int] = {}
+        self._last_batch_ms = 0.0
+        self._total_wait_ms = 0.0
+
+    def submit(self, source: Any) -> Future:
+        """Queue an image for inference; raises queue.Full if the engine is saturated"""
+        self._ensure_started()
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Inference engine is shut down")
+            self._queue.put_nowait((source, future, time.perf_counter()))
+        depth = self._queue.qsize()
+        with self._metrics_lock:
+            if depth > self._max_queue_depth:
+                self._max_queue_depth = depth
+        return future
+
+    def infer(self, source: Any, timeout: Optional[float] = None) -> Any:
+        """Submit an image and block until its result is ready"""
+        return self.submit(source).result(timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue-depth and batch-size metrics"""
+        with self._metrics_lock:
+            batches, images = self._batches, self._images
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "batches": batches,
+                "images": images,
+                "errors": self._errors,
+                "avg_batch_size": round(images / batches, 2) if batches else 0.0,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "last_batch_ms": round(self._last_batch_ms, 2),
+                "avg_queue_wait_ms": round(self._total_wait_ms / images, 2) if images else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+            }
+
+    def shutdown(self):
+        """Stop the worker after the current batch and fail anything still queued"""
+        with self._lock:
+            self._closed = True
+            self._stopped = True
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            try:
+                self._queue.put_nowait((None, None, 0.0))
+            except queue.Full:
+                pass  # The worker sees _stopped after its current batch
+            thread.join(timeout=5)
+        self._fail_pending()
+
+    def _fail_pending(self):
+        """Resolve every request left in the queue so callers don't wait out their timeout"""
+        while True:
+            try:
+                _, future, _ = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if future is not None and future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError("Inference engine is shut down"))
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None and not self._closed:
+                self._stopped = False
+                self._thread = threading.Thread(target=self._run, name="inference-engine", daemon=True)
+                self._thread.start()
+
+    def _collect_batch(self) -> List[tuple]:
+        """Block for the first request, then gather more until full or the deadline passes"""
+        first = self._queue.get()
+        if first[1] is None:
+            return []
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item[1] is None:
+                self._stopped = True
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while not self._stopped:
+            batch = self._collect_batch()
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            sources = [item[0] for item in batch]
+            try:
+                results = self.predict_batch(sources)
+                if len(results) != len(batch):
+                    raise RuntimeError("predict_batch returned a mismatched number of results")
+            except Exception:
+                # Isolate the failing input(s) by retrying one at a time
+                results = []
+                for source in sources:
+                    try:
+                        results.append(self.predict_batch([source])[0])
+                    except Exception as exc:
+                        results.append(exc)
+
+            with self._metrics_lock:
+                self._errors += sum(1 for result in results if isinstance(result, Exception))
+                self._last_batch_ms = (time.perf_counter() - started) * 1000.0
+                self._batches += 1
+                self._images += len(batch)
+                self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+                self._total_wait_ms += sum((started - item[2]) * 1000.0 for item in batch)
+
+            for (_, future, _), result in zip(batch, results):
+                if future.set_running_or_notify_cancel():
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
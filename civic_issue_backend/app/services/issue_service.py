@@ -1,18 +1,43 @@
 from datetime import datetime, timedelta
 from typing import List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, asc, func
-from app.models.issue import Issue, Upvote, Notification, Message
+from sqlalchemy import desc, asc, func, or_, and_, select, insert, update, delete, literal, literal_column, table, column, text, case, Integer
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from app.models.issue import Issue, Upvote, Message, ImageFingerprint
 from app.models.user import User
 from app.services.nlp_service import NLPService
+from app.services.analytics_service import AnalyticsService
+from app.services.assignment_service import AssignmentService
+from app.services.upvote_buffer import get_upvote_buffer
+from app.services.notification_service import queue_notifications
+from app.services.inbox_service import InboxService
+from app.services.image_hash_service import ImageHashService, HASH_BANDS
+from app.core import fulltext, geohash
+from app.core.pagination import keyset_paginate, encode_cursor, decode_cursor
+from app.core.websocket import manager
 import math
 import json
 from app.core.config import settings
 
+DUPLICATE_RADIUS_KM = 0.5  # Only images reported this close are considered duplicates
+MAX_RADIUS_KM = 50.0  # Largest radius accepted by nearby-issue queries
+RADIUS_APPROX_SLACK = 1.1  # Headroom on the SQL distance approximation before the exact haversine cut
+DUPLICATE_MAX_DISTANCE = HASH_BANDS - 1  # Max dHash Hamming distance guaranteed to share a band
+FINGERPRINT_BANDS = [ImageFingerprint.band0, ImageFingerprint.band1, ImageFingerprint.band2, ImageFingerprint.band3]
+
 class IssueService:
     def __init__(self, db: Session):
         self.db = db
         self.nlp_service = NLPService()
+        self.analytics_service = AnalyticsService(db)
+        self.assignment_service = AssignmentService(db)
+        self.image_hash_service = ImageHashService()
+        self._media_hashes = {}
+        # Set by create_issue when a storage image could not be hashed within the submit budget
+        self.pending_remote_fingerprints = False
+        # Cursor for the page after the last list returned by this service (None on the last page)
+        self.next_cursor: Optional[str] = None
 
     def create_issue(self, payload):
         """Create a new issue with auto-assignment and AI analysis"""
@@ -42,11 +67,12 @@ class IssueService:
         user_category = payload.category
         department = self._map_department(user_category)
         
-        # NLP analysis for priority detection and severity scoring
-        auto_priority = self.nlp_service.detect_priority(payload.description)
-        severity_score = self.nlp_service.get_severity_score(payload.description)
+        # NLP analysis for priority detection and severity scoring (single pass)
+        analysis = self.nlp_service.analyze(payload.description)
+        auto_priority = analysis["priority"]
+        severity_score = analysis["severity_score"]
         
-        # Auto-assign admin based on category and workload
+        # Auto-assign admin based on category and workload (claims the admin's open-issue slot)
         assigned_admin_id = self._assign_admin(user_category)
 
         issue = Issue(
@@ -58,6 +84,7 @@ class IssueService:
             severity_score=severity_score,
             lat=payload.lat,
             lng=payload.lng,
+            geohash=geohash.encode(payload.lat, payload.lng),
             media_urls=json.dumps(payload.media_urls or []),
             is_anonymous=bool(getattr(payload, 'is_anonymous', False)),
             assigned_department=department,
@@ -71,10 +98,12 @@ class IssueService:
         )
         
         self.db.add(issue)
-        self.db.commit()
-        self.db.refresh(issue)
+        # Persist image fingerprints for future duplicate checks
+        self.db.add_all(self._build_fingerprints(issue, payload.media_urls))
+        self.db.flush()
+        self.analytics_service.record_issue_created(issue)
         
-        # Send notification to assigned admin
+        # Notify the assigned admin (committed together with the issue)
         if assigned_admin_id:
             self._send_notification(
                 user_id=assigned_admin_id,
@@ -83,46 +112,10 @@ class IssueService:
                 message=f"New issue #{issue.id} assigned to you: {issue.description[:50]}..."
             )
         
-        # Get reporter name if not anonymous
-        reporter_name = "Anonymous"
-        if not issue.is_anonymous:
-            reporter = self.db.query(User).filter(User.id == issue.reporter_id).first()
-            if reporter:
-                reporter_name = reporter.full_name
+        self.db.commit()
+        self.db.refresh(issue)
         
-        # Get assigned admin name
-        assigned_admin_name = None
-        if issue.assigned_admin_id:
-            admin = self.db.query(User).filter(User.id == issue.assigned_admin_id).first()
-            if admin:
-                assigned_admin_name = admin.full_name
-
-        return {
-            "id": issue.id,
-            "reporter_id": issue.reporter_id,
-            "reporter_name": reporter_name,
-            "category": issue.category,
-            "status": issue.status,
-            "priority": issue.priority,
-            "severity_score": issue.severity_score,
-            "description": issue.description,
-            "lat": issue.lat,
-            "lng": issue.lng,
-            "media_urls": issue.media_urls_list,
-            "is_anonymous": bool(issue.is_anonymous),
-            "is_verified": bool(issue.is_verified),
-            "assigned_department": issue.assigned_department,
-            "assigned_admin_id": issue.assigned_admin_id,
-            "assigned_admin_name": assigned_admin_name,
-            "address_line1": issue.address_line1,
-            "address_line2": issue.address_line2,
-            "street": issue.street,
-            "landmark": issue.landmark,
-            "pincode": issue.pincode,
-            "upvote_count": issue.upvote_count,
-            "created_at": issue.created_at,
-            "updated_at": issue.updated_at
-        }
+        return self._serialize_issues([issue])[0]
 
     def get_issue(self, issue_id: int):
         """Get a single issue by ID"""
@@ -130,64 +123,24 @@ class IssueService:
         if not issue:
             return None
         
-        # Get reporter name if not anonymous
-        reporter_name = "Anonymous"
-        if not issue.is_anonymous:
-            reporter = self.db.query(User).filter(User.id == issue.reporter_id).first()
-            if reporter:
-                reporter_name = reporter.full_name
-        
-        # Get assigned admin name
-        assigned_admin_name = None
-        if issue.assigned_admin_id:
-            admin = self.db.query(User).filter(User.id == issue.assigned_admin_id).first()
-            if admin:
-                assigned_admin_name = admin.full_name
-        
-        return {
-            "id": issue.id,
-            "reporter_id": issue.reporter_id,
-            "reporter_name": reporter_name,
-            "category": issue.category,
-            "status": issue.status,
-            "priority": issue.priority,
-            "severity_score": issue.severity_score,
-            "description": issue.description,
-            "lat": issue.lat,
-            "lng": issue.lng,
-            "media_urls": issue.media_urls_list,
-            "is_anonymous": bool(issue.is_anonymous),
-            "is_verified": bool(issue.is_verified),
-            "assigned_department": issue.assigned_department,
-            "assigned_admin_id": issue.assigned_admin_id,
-            "assigned_admin_name": assigned_admin_name,
-            "address_line1": issue.address_line1,
-            "address_line2": issue.address_line2,
-            "street": issue.street,
-            "landmark": issue.landmark,
-            "pincode": issue.pincode,
-            "upvote_count": issue.upvote_count,
-            "created_at": issue.created_at,
-            "updated_at": issue.updated_at
-        }
+        return self._serialize_issues([issue])[0]
 
     def get_issues(self, lat: float = None, lng: float = None, radius: float = None, 
                    category: str = None, status: str = None,
-                   search: str = None, sort: str = "created_at", limit: int = 50, offset: int = 0):
-        """Get issues with optional filtering and sorting"""
+                   search: str = None, sort: str = None, limit: int = 50, offset: int = 0,
+                   cursor: Optional[str] = None, bbox: Optional[tuple] = None):
+        """Get issues with optional filtering and sorting.
+
+        When lat/lng/radius are given, results are restricted to the exact radius
+        and ordered by distance unless another sort is requested. ``search`` goes
+        through the full-text index (core/fulltext.py): every word must match,
+        the last one as a prefix, and results are ordered by relevance unless
+        another sort is requested. ``bbox`` is (min_lat, min_lng, max_lat,
+        max_lng). Pass the previous call's ``next_cursor`` as ``cursor`` to
+        fetch the next page.
+        """
         query = self.db.query(Issue)
-        
-        # Location-based filtering
-        if lat is not None and lng is not None and radius is not None:
-            # Simple bounding box approximation for performance
-            lat_range = radius / 111.0  # Rough conversion: 1 degree ≈ 111 km
-            lng_range = radius / (111.0 * math.cos(math.radians(lat)))
-            
-            query = query.filter(
-                Issue.lat.between(lat - lat_range, lat + lat_range),
-                Issue.lng.between(lng - lng_range, lng + lng_range)
-            )
-        
+
         # Category filtering
         if category:
             query = query.filter(Issue.category == category)
@@ -198,157 +151,297 @@ class IssueService:
         
         # Ward filtering
         
+        # Bounding box filtering
+        if bbox:
+            min_lat, min_lng, max_lat, max_lng = bbox
+            query = query.filter(Issue.lat.between(min_lat, max_lat), Issue.lng.between(min_lng, max_lng))
+
         # Search filtering
-        if search:
-            query = query.filter(Issue.description.contains(search))
-        
-        # Sorting
+        terms = fulltext.search_terms(search)
+        if search and search.strip() and not terms:
+            # Only punctuation/operators: nothing can match, rather than no filter at all
+            self.next_cursor = None
+            return []
+        within_radius = lat is not None and lng is not None and radius is not None
+        if terms and (within_radius or sort not in (None, "relevance")):
+            query = query.filter(self._search_condition(search, terms))
+        elif terms:
+            return self._search_page(query, search, terms, cursor, limit, offset)
+
+        # Location-based filtering
+        if within_radius:
+            return self._get_issues_within_radius(query, lat, lng, radius, sort or "distance", limit, offset, cursor)
+
+        # Sorting and keyset pagination
+        sort_name = "upvote_count" if sort == "upvote_count" else "created_at"
+        return self._keyset_page(query, sort_name, True, cursor, limit, offset)
+
+    def _get_issues_within_radius(self, query, lat: float, lng: float, radius: float,
+                                  sort: str, limit: int, offset: int, cursor: Optional[str] = None):
+        """Resolve a radius query via geohash prefix ranges plus an exact haversine cut.
+
+        The database narrows candidates to the covering geohash cells and
+        bounding box(es), orders them by the requested sort (distance is an
+        equirectangular approximation in squared degrees) and returns them a
+        page at a time; only those rows get the exact haversine check.
+        """
+        boxes = geohash.bounding_boxes(lat, lng, radius)
+        cells = geohash.cells_for_radius(lat, lng, radius)
+        query = query.filter(
+            or_(*[
+                and_(Issue.geohash >= cell, Issue.geohash < geohash.prefix_upper_bound(cell))
+                for cell in cells
+            ]),
+            or_(*[
+                and_(Issue.lat.between(min_lat, max_lat), Issue.lng.between(min_lng, max_lng))
+                for min_lat, min_lng, max_lat, max_lng in boxes
+            ]),
+        )
+
+        dlng = Issue.lng - lng
+        if len(boxes) > 1:
+            # Across the antimeridian, measure the short way round
+            dlng = case((dlng > 180, dlng - 360), (dlng < -180, dlng + 360), else_=dlng)
+        lng_scale = math.cos(math.radians(lat))
+        approx = ((Issue.lat - lat) * (Issue.lat - lat) + dlng * dlng * (lng_scale * lng_scale)).label("approx")
+        # The approximation drifts from haversine away from the centre; the slack keeps every true match
+        approx_bound = (radius * RADIUS_APPROX_SLACK / geohash.KM_PER_DEGREE) ** 2
+        query = query.filter(approx <= approx_bound)
+
+        # Total orders (id as tiebreak) so a cursor identifies an exact position
+        upvotes = func.coalesce(Issue.upvote_count, 0).label("upvotes")
+        created = func.coalesce(Issue.created_at, datetime.min).label("created")
         if sort == "upvote_count":
-            query = query.order_by(desc(Issue.upvote_count))
+            columns, descending = (upvotes, approx, Issue.id), (True, False, False)
         elif sort == "created_at":
-            query = query.order_by(desc(Issue.created_at))
+            columns, descending = (created, Issue.id), (True, True)
         else:
-            query = query.order_by(desc(Issue.created_at))
-        
-        # Pagination
-        issues = query.offset(offset).limit(limit).all()
-        
-        result = []
-        for issue in issues:
-            # Get reporter name - show "Anonymous" if anonymous, otherwise show actual name
-            reporter_name = "Anonymous"
-            if not issue.is_anonymous:
-                reporter = self.db.query(User).filter(User.id == issue.reporter_id).first()
-                if reporter:
-                    reporter_name = reporter.full_name
-            
-            # Get assigned admin name
-            assigned_admin_name = None
-            if issue.assigned_admin_id:
-                admin = self.db.query(User).filter(User.id == issue.assigned_admin_id).first()
-                if admin:
-                    assigned_admin_name = admin.full_name
-            
-            result.append({
-                "id": issue.id,
-                "reporter_id": issue.reporter_id,
-                "reporter_name": reporter_name,
-                "category": issue.category,
-                "status": issue.status,
-                "priority": issue.priority,
-            "severity_score": issue.severity_score,
-                "description": issue.description,
-                "lat": issue.lat,
-                "lng": issue.lng,
-                "media_urls": issue.media_urls_list,
-                "is_anonymous": bool(issue.is_anonymous),
-                "is_verified": bool(issue.is_verified),
-                "assigned_department": issue.assigned_department,
-                "assigned_admin_id": issue.assigned_admin_id,
-                "assigned_admin_name": assigned_admin_name,
-                "address_line1": issue.address_line1,
-                "address_line2": issue.address_line2,
-                "street": issue.street,
-                "landmark": issue.landmark,
-                "pincode": issue.pincode,
-                "upvote_count": issue.upvote_count,
-                "created_at": issue.created_at,
-                "updated_at": issue.updated_at
-            })
-        
+            columns, descending = (approx, Issue.id), (False, False)
+        key_names = [c.key for c in columns]
+
+        cursor_name = f"radius:{sort}"
+        after = None
+        if cursor:
+            value, _ = decode_cursor(cursor, cursor_name, descending=False)
+            after = self._radius_cursor_key(value, sort)
+            offset = 0
+
+        stmt = query.with_entities(Issue.lat, Issue.lng, *columns).order_by(
+            *[c.desc() if desc_ else c.asc() for c, desc_ in zip(columns, descending)]
+        )
+        # Fetch in order until limit + 1 rows pass the exact check (usually one round trip)
+        wanted = offset + limit + 1
+        matches = []
+        while True:
+            batch_size = wanted - len(matches)
+            batch = stmt if after is None else stmt.filter(self._after_key(columns, descending, after))
+            rows = batch.limit(batch_size).all()
+            for row in rows:
+                distance = self._calculate_distance(lat, lng, row.lat, row.lng)
+                if distance <= radius:
+                    matches.append((row, distance))
+            if len(rows) < batch_size or len(matches) >= wanted:
+                break
+            after = tuple(getattr(rows[-1], name) for name in key_names)
+
+        page = matches[offset:offset + limit]
+        self.next_cursor = None
+        if page and len(matches) > offset + limit:
+            key = [getattr(page[-1][0], name) for name in key_names]
+            if sort == "created_at":
+                key[0] = key[0].isoformat()
+            self.next_cursor = encode_cursor(cursor_name, key, page[-1][0].id, descending=False)
+        result = self._serialize_ids([row.id for row, _ in page])
+        distances = {row.id: distance for row, distance in page}
+        for item in result:
+            item["distance_km"] = round(distances[item["id"]], 3)
         return result
 
+    @staticmethod
+    def _radius_cursor_key(value, sort: str) -> tuple:
+        """Validate a radius cursor's sort key and convert it for the keyset predicate"""
+        def is_number(v):
+            return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+        def is_id(v):
+            return isinstance(v, int) and not isinstance(v, bool)
+
+        if sort == "upvote_count":
+            checks = (is_id, is_number, is_id)
+        elif sort == "created_at":
+            checks = (lambda v: isinstance(v, str), is_id)
+        else:
+            checks = (is_number, is_id)
+        if not isinstance(value, list) or len(value) != len(checks) or not all(
+                check(v) for check, v in zip(checks, value)):
+            raise ValueError("Invalid cursor")
+        if sort == "created_at":
+            try:
+                value = [datetime.fromisoformat(value[0]), value[1]]
+            except ValueError:
+                raise ValueError("Invalid cursor")
+        return tuple(value)
+
+    @staticmethod
+    def _after_key(columns, descending, values):
+        """Rows strictly after ``values`` in the (mixed direction) order of ``columns``"""
+        condition = None
+        for col, desc_, value in reversed(list(zip(columns, descending, values))):
+            beyond = col < value if desc_ else col > value
+            condition = beyond if condition is None else or_(beyond, and_(col == value, condition))
+        return condition
+
+    def _search_condition(self, search: str, terms: List[str]):
+        """Filter matching issues through the full-text index"""
+        kind = fulltext.backend(self.db.get_bind().dialect.name)
+        if kind == "fts5":
+            matches = text(
+                f"SELECT rowid FROM {fulltext.FTS_TABLE} WHERE {fulltext.FTS_TABLE} MATCH :fts_query"
+            ).bindparams(fts_query=fulltext.match_query(terms, kind)).columns(column("rowid", Integer))
+            return Issue.id.in_(matches)
+        if kind == "tsvector":
+            return literal_column("issues.search_vector").op("@@")(
+                func.to_tsquery("english", fulltext.match_query(terms, kind))
+            )
+        return Issue.description.contains(search)
+
+    def _search_page(self, query, search: str, terms: List[str], cursor: Optional[str],
+                     limit: int, offset: int) -> List[dict]:
+        """One page of matches ordered by relevance, then id.
+
+        The cursor holds the (score, id) of the last row; scores are
+        deterministic for a given query, so pages continue exactly.
+        """
+        kind = fulltext.backend(self.db.get_bind().dialect.name)
+        if kind == "fts5":
+            fts = table(fulltext.FTS_TABLE, column("rowid"))
+            match = literal_column(fulltext.FTS_TABLE).op("MATCH")(fulltext.match_query(terms, kind))
+            # bm25(): lower is more relevant
+            score = func.bm25(literal_column(fulltext.FTS_TABLE))
+            query = query.join(fts, fts.c.rowid == Issue.id).filter(match)
+        elif kind == "tsvector":
+            tsquery = func.to_tsquery("english", fulltext.match_query(terms, kind))
+            vector = literal_column("issues.search_vector")
+            score = -func.ts_rank_cd(vector, tsquery)
+            query = query.filter(vector.op("@@")(tsquery))
+        else:
+            # No full-text index: substring match, newest first
+            return self._keyset_page(query.filter(Issue.description.contains(search)), "created_at", True,
+                                     cursor, limit, offset)
+
+        ranked = query.with_entities(Issue.id.label("id"), score.label("score")).subquery()
+        stmt = select(ranked.c.id, ranked.c.score).order_by(ranked.c.score, ranked.c.id)
+        if cursor:
+            after_score, after_id = decode_cursor(cursor, "relevance", descending=False)
+            if not isinstance(after_score, (int, float)) or isinstance(after_score, bool):
+                raise ValueError("Invalid cursor")
+            stmt = stmt.where(or_(ranked.c.score > after_score,
+                                  and_(ranked.c.score == after_score, ranked.c.id > after_id)))
+        elif offset:
+            stmt = stmt.offset(offset)
+        rows = self.db.execute(stmt.limit(limit + 1)).all()
+        page = rows[:limit]
+        self.next_cursor = encode_cursor("relevance", page[-1].score, page[-1].id, descending=False) if len(rows) > limit else None
+        return self._serialize_ids([row.id for row in page])
+
+    def _serialize_ids(self, issue_ids: List[int]) -> List[dict]:
+        """Load and serialize issues, keeping the order of issue_ids"""
+        if not issue_ids:
+            return []
+        issues_by_id = {
+            issue.id: issue
+            for issue in self.db.query(Issue).filter(Issue.id.in_(issue_ids)).all()
+        }
+        return self._serialize_issues([issues_by_id[i] for i in issue_ids if i in issues_by_id])
+
     def get_user_issues(self, user_id: int):
         """Get all issues reported by a specific user"""
         issues = self.db.query(Issue).filter(
             Issue.reporter_id == user_id
         ).order_by(Issue.created_at.desc()).all()
         
-        result = []
-        for issue in issues:
-            # Get reporter name - show "Anonymous" if anonymous, otherwise show actual name
-            reporter_name = "Anonymous"
-            if not issue.is_anonymous:
-                reporter = self.db.query(User).filter(User.id == issue.reporter_id).first()
-                if reporter:
-                    reporter_name = reporter.full_name
-            
-            # Get assigned admin name
-            assigned_admin_name = None
-            if issue.assigned_admin_id:
-                admin = self.db.query(User).filter(User.id == issue.assigned_admin_id).first()
-                if admin:
-                    assigned_admin_name = admin.full_name
-            
-            result.append({
-                "id": issue.id,
-                "reporter_id": issue.reporter_id,
-                "reporter_name": reporter_name,
-                "category": issue.category,
-                "status": issue.status,
-                "priority": issue.priority,
-            "severity_score": issue.severity_score,
-                "description": issue.description,
-                "lat": issue.lat,
-                "lng": issue.lng,
-                "media_urls": issue.media_urls_list,
-                "is_anonymous": bool(issue.is_anonymous),
-                "is_verified": bool(issue.is_verified),
-                "assigned_department": issue.assigned_department,
-                "assigned_admin_id": issue.assigned_admin_id,
-                "assigned_admin_name": assigned_admin_name,
-                "address_line1": issue.address_line1,
-                "address_line2": issue.address_line2,
-                "street": issue.street,
-                "landmark": issue.landmark,
-                "pincode": issue.pincode,
-                "upvote_count": issue.upvote_count,
-                "created_at": issue.created_at,
-                "updated_at": issue.updated_at
-            })
-        
-        return result
+        return self._serialize_issues(issues)
 
     def upvote_issue(self, issue_id: int, user_id: int):
-        """Toggle upvote for an issue (upvote if not upvoted, remove if already upvoted)"""
-        # Check if user already upvoted this issue
-        existing_upvote = self.db.query(Upvote).filter(
-            Upvote.issue_id == issue_id,
-            Upvote.user_id == user_id
-        ).first()
-        
-        issue = self.db.query(Issue).filter(Issue.id == issue_id).first()
-        if not issue:
-            return {"success": False, "message": "Issue not found"}
-        
-        if existing_upvote:
-            # Remove upvote
-            self.db.delete(existing_upvote)
-            issue.upvote_count = max(0, issue.upvote_count - 1)
-            issue.updated_at = datetime.utcnow()
-            self.db.commit()
-            
-            return {
-                "success": True,
-                "action": "removed",
-                "message": "Upvote removed",
-                "issue_updated_at": issue.updated_at.isoformat()
-            }
+        """Toggle upvote for an issue (upvote if not upvoted, remove if already upvoted).
+
+        The unique (issue_id, user_id) index arbitrates concurrent toggles: an
+        insert that conflicts means the user had upvoted, so the row is deleted
+        instead. upvote_count moves by exactly +1/-1 in the same transaction, or
+        through the write-behind buffer when UPVOTE_WRITE_BEHIND is enabled.
+        """
+        now = datetime.utcnow()
+        if self._insert_upvote(issue_id, user_id, now):
+            delta = 1
         else:
-            # Create upvote
-            upvote = Upvote(issue_id=issue_id, user_id=user_id)
-            self.db.add(upvote)
-            issue.upvote_count += 1
-            issue.updated_at = datetime.utcnow()
-            self.db.commit()
-            
+            removed = self.db.execute(
+                delete(Upvote.__table__).where(Upvote.issue_id == issue_id, Upvote.user_id == user_id)
+            )
+            if removed.rowcount == 0:
+                # Neither inserted nor deleted: the issue does not exist
+                self.db.rollback()
+                return {"success": False, "message": "Issue not found"}
+            delta = -1
+
+        upvote_count = self._add_upvote_count(issue_id, delta, now)
+        self.db.commit()
+        manager.publish_issue_update(issue_id, upvote_count=upvote_count)
+
+        if delta > 0:
             return {
                 "success": True,
                 "action": "added",
                 "message": "Issue upvoted",
-                "upvoted_at": upvote.created_at.isoformat(),
-                "issue_updated_at": issue.updated_at.isoformat()
+                "upvote_count": upvote_count,
+                "upvoted_at": now.isoformat(),
+                "issue_updated_at": now.isoformat()
             }
+        return {
+            "success": True,
+            "action": "removed",
+            "message": "Upvote removed",
+            "upvote_count": upvote_count,
+            "issue_updated_at": now.isoformat()
+        }
+
+    def _insert_upvote(self, issue_id: int, user_id: int, now: datetime) -> bool:
+        """Insert the upvote if the issue exists and the user has not upvoted it yet"""
+        upvotes = Upvote.__table__
+        row = select(Issue.id, literal(user_id), literal(now, Upvote.created_at.type)).where(Issue.id == issue_id)
+        columns = [upvotes.c.issue_id, upvotes.c.user_id, upvotes.c.created_at]
+        dialect = self.db.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+            stmt = dialect_insert(upvotes).from_select(columns, row).on_conflict_do_nothing(
+                index_elements=[upvotes.c.issue_id, upvotes.c.user_id]
+            )
+            return self.db.execute(stmt).rowcount > 0
+
+        try:
+            with self.db.begin_nested():
+                return self.db.execute(insert(upvotes).from_select(columns, row)).rowcount > 0
+        except IntegrityError:
+            return False
+
+    def _add_upvote_count(self, issue_id: int, delta: int, now: datetime) -> int:
+        """Apply delta to issues.upvote_count (or buffer it) and return the resulting count"""
+        buffer = get_upvote_buffer()
+        if buffer is not None:
+            # Buffered only once the upvote row itself commits
+            staged = buffer.add_on_commit(self.db, issue_id, delta)
+            stored = self.db.execute(select(Issue.upvote_count).where(Issue.id == issue_id)).scalar() or 0
+            return max(0, stored + buffer.pending(issue_id) + staged)
+
+        issues = Issue.__table__
+        stmt = (
+            update(issues)
+            .where(issues.c.id == issue_id)
+            .values(upvote_count=issues.c.upvote_count + delta, updated_at=now)
+        )
+        if self.db.get_bind().dialect.update_returning:
+            return self.db.execute(stmt.returning(issues.c.upvote_count)).scalar()
+        self.db.execute(stmt)
+        return self.db.execute(select(issues.c.upvote_count).where(issues.c.id == issue_id)).scalar()
 
     def update_status(self, issue_id: int, status: str):
         """Update issue status"""
@@ -356,21 +449,49 @@ class IssueService:
         if not issue:
             return {"success": False, "message": "Issue not found"}
         
-        issue.status = status
-        issue.updated_at = datetime.utcnow()
+        self._apply_status_change(issue, status)
         self.db.commit()
+        self._publish_status(issue)
         
         return {"success": True, "updated_at": issue.updated_at.isoformat()}
 
+    def _apply_status_change(self, issue: Issue, status: str) -> str:
+        """Set an issue's status, maintain resolved_at and the KPI rollups; returns the old status"""
+        old_status = issue.status
+        old_resolved_at = issue.resolved_at
+        issue.status = status
+        issue.updated_at = datetime.utcnow()
+        if status == "resolved":
+            if old_status != "resolved" or issue.resolved_at is None:
+                issue.resolved_at = issue.updated_at
+        else:
+            issue.resolved_at = None
+        self.analytics_service.record_status_change(issue, old_status, old_resolved_at)
+        self.assignment_service.record_status_change(issue, old_status)
+        return old_status
+
+    def delete_issue(self, issue_id: int) -> bool:
+        """Delete an issue and its dependent rows, releasing its rollup and workload counts"""
+        issue = self.db.query(Issue).filter(Issue.id == issue_id).first()
+        if not issue:
+            return False
+
+        self.analytics_service.record_issue_deleted(issue)
+        self.assignment_service.record_issue_deleted(issue)
+        for model in (ImageFingerprint, Upvote, Message):
+            self.db.query(model).filter(model.issue_id == issue_id).delete(synchronize_session=False)
+        InboxService(self.db).delete_for_issue(issue_id)
+        self.db.delete(issue)
+        self.db.commit()
+        return True
+
     def update_issue_status_with_trust_score(self, issue_id: int, status: str, admin_id: int):
         """Update issue status and adjust user trust score accordingly"""
         issue = self.db.query(Issue).filter(Issue.id == issue_id).first()
         if not issue:
             return {"success": False, "message": "Issue not found"}
         
-        old_status = issue.status
-        issue.status = status
-        issue.updated_at = datetime.utcnow()
+        old_status = self._apply_status_change(issue, status)
         
         # Update trust score based on status change
         reporter = self.db.query(User).filter(User.id == issue.reporter_id).first()
@@ -402,12 +523,18 @@ class IssueService:
                 )
         
         self.db.commit()
+        self._publish_status(issue)
         return {"success": True, "updated_at": issue.updated_at.isoformat()}
 
+    @staticmethod
+    def _publish_status(issue: Issue):
+        """Push a committed status change to the issue's WebSocket subscribers"""
+        manager.publish_issue_update(issue.id, status=issue.status, updated_at=issue.updated_at.isoformat())
+
     def get_admin_issues(self, admin_id: int = None, status: Optional[str] = None,
                          category: Optional[str] = None, priority: Optional[str] = None,
                          sort_by: str = "created_at", sort_order: str = "desc", 
-                         limit: int = 50, offset: int = 0):
+                         limit: int = 50, offset: int = 0, cursor: Optional[str] = None):
         """Get issues assigned to specific admin"""
         query = self.db.query(Issue)
         
@@ -425,63 +552,14 @@ class IssueService:
         if priority:
             query = query.filter(Issue.priority == priority)
         
-        # Sorting
-        if sort_by == "upvote_count":
-            query = query.order_by(desc(Issue.upvote_count) if sort_order == "desc" else asc(Issue.upvote_count))
-        else:
-            query = query.order_by(desc(Issue.created_at) if sort_order == "desc" else asc(Issue.created_at))
-        
-        issues = query.offset(offset).limit(limit).all()
-        
-        result = []
-        for issue in issues:
-            # Get reporter name - show "Anonymous" if anonymous, otherwise show actual name
-            reporter_name = "Anonymous"
-            if not issue.is_anonymous:
-                reporter = self.db.query(User).filter(User.id == issue.reporter_id).first()
-                if reporter:
-                    reporter_name = reporter.full_name
-            
-            # Get assigned admin name
-            assigned_admin_name = None
-            if issue.assigned_admin_id:
-                admin = self.db.query(User).filter(User.id == issue.assigned_admin_id).first()
-                if admin:
-                    assigned_admin_name = admin.full_name
-            
-            result.append({
-                "id": issue.id,
-                "reporter_id": issue.reporter_id,
-                "reporter_name": reporter_name,
-                "category": issue.category,
-                "status": issue.status,
-                "priority": issue.priority,
-            "severity_score": issue.severity_score,
-                "description": issue.description,
-                "lat": issue.lat,
-                "lng": issue.lng,
-                "media_urls": issue.media_urls_list,
-                "is_anonymous": bool(issue.is_anonymous),
-                "is_verified": bool(issue.is_verified),
-                "assigned_department": issue.assigned_department,
-                "assigned_admin_id": issue.assigned_admin_id,
-                "assigned_admin_name": assigned_admin_name,
-                "address_line1": issue.address_line1,
-                "address_line2": issue.address_line2,
-                "street": issue.street,
-                "landmark": issue.landmark,
-                "pincode": issue.pincode,
-                "upvote_count": issue.upvote_count,
-                "created_at": issue.created_at,
-                "updated_at": issue.updated_at
-            })
-        
-        return result
+        # Sorting and keyset pagination
+        sort_name = "upvote_count" if sort_by == "upvote_count" else "created_at"
+        return self._keyset_page(query, sort_name, sort_order == "desc", cursor, limit, offset)
 
     def get_department_issues(self, department: str, status: Optional[str] = None,
                              category: Optional[str] = None, priority: Optional[str] = None,
                              sort_by: str = "created_at", sort_order: str = "desc", 
-                             limit: int = 50, offset: int = 0):
+                             limit: int = 50, offset: int = 0, cursor: Optional[str] = None):
         """Get all issues from a specific department"""
         query = self.db.query(Issue).filter(Issue.assigned_department == department)
         
@@ -494,58 +572,67 @@ class IssueService:
         if priority:
             query = query.filter(Issue.priority == priority)
         
-        # Sorting
-        if sort_by == "upvote_count":
-            query = query.order_by(desc(Issue.upvote_count) if sort_order == "desc" else asc(Issue.upvote_count))
-        else:
-            query = query.order_by(desc(Issue.created_at) if sort_order == "desc" else asc(Issue.created_at))
-        
-        issues = query.offset(offset).limit(limit).all()
-        
-        result = []
+        # Sorting and keyset pagination
+        sort_name = "upvote_count" if sort_by == "upvote_count" else "created_at"
+        return self._keyset_page(query, sort_name, sort_order == "desc", cursor, limit, offset)
+
+    def _resolve_user_names(self, issues: List[Issue]) -> dict:
+        """Resolve reporter/admin names for a page of issues with one batched query"""
+        user_ids = set()
         for issue in issues:
-            # Get reporter name - show "Anonymous" if anonymous, otherwise show actual name
-            reporter_name = "Anonymous"
             if not issue.is_anonymous:
-                reporter = self.db.query(User).filter(User.id == issue.reporter_id).first()
-                if reporter:
-                    reporter_name = reporter.full_name
-            
-            # Get assigned admin name
-            assigned_admin_name = None
+                user_ids.add(issue.reporter_id)
             if issue.assigned_admin_id:
-                admin = self.db.query(User).filter(User.id == issue.assigned_admin_id).first()
-                if admin:
-                    assigned_admin_name = admin.full_name
-            
-            result.append({
-                "id": issue.id,
-                "reporter_id": issue.reporter_id,
-                "reporter_name": reporter_name,
-                "category": issue.category,
-                "status": issue.status,
-                "priority": issue.priority,
+                user_ids.add(issue.assigned_admin_id)
+
+        if not user_ids:
+            return {}
+
+        rows = self.db.query(User.id, User.full_name).filter(User.id.in_(user_ids)).all()
+        return {user_id: full_name for user_id, full_name in rows}
+
+    def _serialize_issue(self, issue: Issue, user_names: dict) -> dict:
+        """Build the IssueOut dict for an issue using pre-resolved user names"""
+        # Show "Anonymous" if anonymous, otherwise show actual name
+        reporter_name = "Anonymous"
+        if not issue.is_anonymous:
+            reporter_name = user_names.get(issue.reporter_id, reporter_name)
+
+        assigned_admin_name = None
+        if issue.assigned_admin_id:
+            assigned_admin_name = user_names.get(issue.assigned_admin_id)
+
+        return {
+            "id": issue.id,
+            "reporter_id": issue.reporter_id,
+            "reporter_name": reporter_name,
+            "category": issue.category,
+            "status": issue.status,
+            "priority": issue.priority,
             "severity_score": issue.severity_score,
-                "description": issue.description,
-                "lat": issue.lat,
-                "lng": issue.lng,
-                "media_urls": issue.media_urls_list,
-                "is_anonymous": bool(issue.is_anonymous),
-                "is_verified": bool(issue.is_verified),
-                "assigned_department": issue.assigned_department,
-                "assigned_admin_id": issue.assigned_admin_id,
-                "assigned_admin_name": assigned_admin_name,
-                "address_line1": issue.address_line1,
-                "address_line2": issue.address_line2,
-                "street": issue.street,
-                "landmark": issue.landmark,
-                "pincode": issue.pincode,
-                "upvote_count": issue.upvote_count,
-                "created_at": issue.created_at,
-                "updated_at": issue.updated_at
-            })
-        
-        return result
+            "description": issue.description,
+            "lat": issue.lat,
+            "lng": issue.lng,
+            "media_urls": issue.media_urls_list,
+            "is_anonymous": bool(issue.is_anonymous),
+            "is_verified": bool(issue.is_verified),
+            "assigned_department": issue.assigned_department,
+            "assigned_admin_id": issue.assigned_admin_id,
+            "assigned_admin_name": assigned_admin_name,
+            "address_line1": issue.address_line1,
+            "address_line2": issue.address_line2,
+            "street": issue.street,
+            "landmark": issue.landmark,
+            "pincode": issue.pincode,
+            "upvote_count": issue.upvote_count,
+            "created_at": issue.created_at,
+            "updated_at": issue.updated_at
+        }
+
+    def _serialize_issues(self, issues: List[Issue]) -> List[dict]:
+        """Serialize a page of issues, resolving all user names in a single query"""
+        user_names = self._resolve_user_names(issues)
+        return [self._serialize_issue(issue, user_names) for issue in issues]
 
     def _analyze_category(self, description: str, media_urls: List[str] = None):
         """Analyze issue to determine category based on AI model detection"""
@@ -614,84 +701,184 @@ class IssueService:
 
     def _assign_admin(self, category: str) -> Optional[int]:
         """Assign admin based on category/department and current workload"""
-        # Map category to department
-        department = self._map_department(category)
-        
-        # Get admins from the relevant department
-        admins = self.db.query(User).filter(
-            User.role == "admin", 
-            User.is_active == True,
-            User.department == department
-        ).all()
-        
-        # If no department-specific admin, try to find a general admin (not Municipal Commissioner)
-        if not admins:
-            admins = self.db.query(User).filter(
-                User.role == "admin", 
-                User.is_active == True,
-                User.department != "Municipal Corporation"  # Avoid assigning to Municipal Commissioner
-            ).all()
-        
-        # If still no admin, get any admin as last resort
-        if not admins:
-            admins = self.db.query(User).filter(User.role == "admin", User.is_active == True).all()
-        
-        if not admins:
-            return None
-        
-        # Count current workload for each admin (issues in progress or new)
-        admin_workloads = []
-        for admin in admins:
-            workload = self.db.query(Issue).filter(
-                Issue.assigned_admin_id == admin.id,
-                Issue.status.in_(["new", "in_progress"])
-            ).count()
-            admin_workloads.append((admin.id, workload))
-        
-        # Sort by workload (ascending) and return the admin with least workload
-        admin_workloads.sort(key=lambda x: x[1])
-        return admin_workloads[0][0] if admin_workloads else None
+        return self.assignment_service.assign(self._map_department(category))
 
     def _send_notification(self, user_id: int, issue_id: int, notification_type: str, message: str):
-        """Send notification to user"""
-        notification = Notification(
-            user_id=user_id,
-            issue_id=issue_id,
-            type=notification_type,
-            message=message
-        )
-        self.db.add(notification)
-        self.db.commit()
+        """Queue a notification in the current transaction; delivered after the caller commits"""
+        queue_notifications(self.db, [{
+            "user_id": user_id,
+            "issue_id": issue_id,
+            "type": notification_type,
+            "message": message
+        }])
 
     def check_duplicate_issue(self, lat: float, lng: float, media_urls: List[str] = None, description: str = ""):
-        """Check for duplicate issues based on image similarity only"""
+        """Check for duplicate issues based on image similarity only.
+
+        Looks up stored image fingerprints near the location from the last 30 days
+        whose media URL matches exactly or whose dHash shares a band with one of
+        the new images, then confirms candidates by Hamming distance. Storage
+        URLs are fetched and hashed here too, within IMAGE_FETCH_SUBMIT_TIMEOUT_SECONDS.
+        """
         if not media_urls or len(media_urls) == 0:
             return None  # No images to check for duplicates
         
-        # Get all recent issues (last 30 days) with media files
         thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        
-        recent_issues = self.db.query(Issue).filter(
-            Issue.created_at >= thirty_days_ago,
-            Issue.media_urls.isnot(None),
-            Issue.media_urls != ""
+        hashes = [h for h in self._fingerprint_media(media_urls).values() if h is not None]
+        
+        match_terms = [ImageFingerprint.media_url.in_(media_urls)]
+        for value in hashes:
+            for band_column, band_value in zip(FINGERPRINT_BANDS, ImageHashService.bands(value)):
+                match_terms.append(band_column == band_value)
+        
+        cells = geohash.cells_for_radius(lat, lng, DUPLICATE_RADIUS_KM, max_cells=4)
+        candidates = self.db.query(
+            ImageFingerprint.issue_id, ImageFingerprint.media_url, ImageFingerprint.dhash
+        ).filter(
+            ImageFingerprint.created_at >= thirty_days_ago,
+            or_(*[
+                and_(ImageFingerprint.geohash >= cell, ImageFingerprint.geohash < geohash.prefix_upper_bound(cell))
+                for cell in cells
+            ]),
+            or_(*match_terms)
         ).all()
         
-        duplicates = []
-        for issue in recent_issues:
-            issue_media_urls = issue.media_urls_list
-            if issue_media_urls and len(issue_media_urls) > 0:
-                # Check image similarity only
-                if self._check_image_similarity(media_urls, issue_media_urls):
-                    duplicates.append({
-                        "issue_id": issue.id,
-                        "reason": "Similar images detected",
-                        "created_at": issue.created_at.isoformat(),
-                        "status": issue.status
-                    })
+        duplicate_ids = set()
+        for issue_id, media_url, dhash in candidates:
+            if media_url in media_urls:
+                duplicate_ids.add(issue_id)
+            elif dhash is not None:
+                stored = ImageHashService.to_unsigned(dhash)
+                if any(ImageHashService.hamming(stored, value) <= DUPLICATE_MAX_DISTANCE for value in hashes):
+                    duplicate_ids.add(issue_id)
+        
+        if not duplicate_ids:
+            return None
         
+        issues = self.db.query(Issue).filter(Issue.id.in_(duplicate_ids)).order_by(desc(Issue.created_at)).all()
+        duplicates = [
+            {
+                "issue_id": issue.id,
+                "reason": "Similar images detected",
+                "created_at": issue.created_at.isoformat(),
+                "status": issue.status
+            }
+            for issue in issues
+        ]
         return duplicates if duplicates else None
 
+    def _fingerprint_media(self, media_urls: List[str]) -> dict:
+        """Compute (once per service instance) the dHash of each media URL.
+
+        Storage URLs are fetched in parallel, bounded by IMAGE_FETCH_MAX_PER_ISSUE
+        and IMAGE_FETCH_SUBMIT_TIMEOUT_SECONDS; the ones that miss the budget
+        come back as None.
+        """
+        missing = [url for url in media_urls or [] if url not in self._media_hashes]
+        if missing:
+            self._media_hashes.update(self.image_hash_service.compute_many(
+                missing,
+                allow_remote=True,
+                timeout=settings.IMAGE_FETCH_SUBMIT_TIMEOUT_SECONDS,
+                max_remote=settings.IMAGE_FETCH_MAX_PER_ISSUE,
+            ))
+        return {url: self._media_hashes.get(url) for url in media_urls or []}
+
+    def _build_fingerprints(self, issue: Issue, media_urls: List[str]) -> List[ImageFingerprint]:
+        """Create fingerprint rows for an issue's images (added in the issue's transaction).
+
+        Storage images that missed the submit budget start without a hash;
+        fill_remote_fingerprints() completes them after the response.
+        """
+        fingerprints = []
+        for media_url, value in self._fingerprint_media(media_urls).items():
+            fingerprint = ImageFingerprint(issue=issue, media_url=media_url, geohash=issue.geohash)
+            if value is not None:
+                self._set_dhash(fingerprint, value)
+            elif self.image_hash_service.is_remote(media_url) and self.image_hash_service.is_allowed(media_url):
+                self.pending_remote_fingerprints = True
+            fingerprints.append(fingerprint)
+        return fingerprints
+
+    def backfill_fingerprints(self, batch_size: int = 100, allow_remote: bool = True) -> int:
+        """Fingerprint issues whose images have no image_fingerprints rows yet.
+
+        For issues from before fingerprinting or written without IssueService
+        (init_db.py, seed scripts). Works in id order, one transaction per batch,
+        and holds no connection while images are fetched. Returns the rows added.
+        """
+        added = 0
+        last_id = 0
+        while True:
+            issues = self.db.query(
+                Issue.id, Issue.media_urls, Issue.lat, Issue.lng, Issue.geohash, Issue.created_at
+            ).filter(Issue.id > last_id, Issue.media_urls.isnot(None)).order_by(Issue.id).limit(batch_size).all()
+            if not issues:
+                return added
+            last_id = issues[-1].id
+            known = {
+                (issue_id, media_url)
+                for issue_id, media_url in self.db.query(ImageFingerprint.issue_id, ImageFingerprint.media_url).filter(
+                    ImageFingerprint.issue_id.in_([issue.id for issue in issues])
+                )
+            }
+            wanted = []
+            for issue in issues:
+                try:
+                    media_urls = json.loads(issue.media_urls or "[]")
+                except (TypeError, ValueError):
+                    continue
+                for media_url in dict.fromkeys(url for url in media_urls if isinstance(url, str) and url):
+                    if (issue.id, media_url) not in known:
+                        wanted.append((issue, media_url))
+            if not wanted:
+                continue
+
+            self.db.rollback()  # Don't hold a connection while fetching
+            hashes = self.image_hash_service.compute_many([url for _, url in wanted], allow_remote=allow_remote)
+            for issue, media_url in wanted:
+                fingerprint = ImageFingerprint(
+                    issue_id=issue.id,
+                    media_url=media_url,
+                    geohash=issue.geohash or geohash.encode(issue.lat, issue.lng),
+                    # The 30-day duplicate window follows the issue's age
+                    created_at=issue.created_at or datetime.utcnow(),
+                )
+                if hashes.get(media_url) is not None:
+                    self._set_dhash(fingerprint, hashes[media_url])
+                self.db.add(fingerprint)
+            self.db.commit()
+            added += len(wanted)
+
+    def fill_remote_fingerprints(self, issue_id: int) -> int:
+        """Hash an issue's storage-hosted images (IMAGE_FETCH_ALLOWED_HOSTS); returns how many were filled"""
+        pending = [
+            (fingerprint_id, media_url)
+            for fingerprint_id, media_url in self.db.query(ImageFingerprint.id, ImageFingerprint.media_url).filter(
+                ImageFingerprint.issue_id == issue_id, ImageFingerprint.dhash.is_(None)
+            ).all()
+            if self.image_hash_service.is_remote(media_url)
+        ]
+        self.db.rollback()  # Don't hold a connection while fetching
+        hashes = {
+            fingerprint_id: self.image_hash_service.compute_dhash(media_url, allow_remote=True)
+            for fingerprint_id, media_url in pending
+        }
+        filled = 0
+        for fingerprint_id, value in hashes.items():
+            fingerprint = self.db.get(ImageFingerprint, fingerprint_id) if value is not None else None
+            if fingerprint is not None:
+                self._set_dhash(fingerprint, value)
+                filled += 1
+        if filled:
+            self.db.commit()
+        return filled
+
+    @staticmethod
+    def _set_dhash(fingerprint: ImageFingerprint, value: int):
+        fingerprint.dhash = ImageHashService.to_signed(value)
+        fingerprint.band0, fingerprint.band1, fingerprint.band2, fingerprint.band3 = ImageHashService.bands(value)
+
     def _calculate_distance(self, lat1: float, lng1: float, lat2: float, lng2: float) -> float:
         """Calculate distance between two coordinates in kilometers using Haversine formula"""
         R = 6371  # Earth's radius in kilometers
@@ -708,22 +895,6 @@ class IssueService:
         
         return distance
 
-    def _check_image_similarity(self, urls1: List[str], urls2: List[str]) -> bool:
-        """Check if images are similar (simplified check for same URLs or similar filenames)"""
-        # For now, we'll do a simple URL comparison
-        # In a real implementation, you'd use image hashing or computer vision
-        for url1 in urls1:
-            for url2 in urls2:
-                # Extract filename from URL
-                filename1 = url1.split('/')[-1].split('.')[0]
-                filename2 = url2.split('/')[-1].split('.')[0]
-                
-                # Simple similarity check (same filename or very similar)
-                if filename1 == filename2 or abs(len(filename1) - len(filename2)) <= 2:
-                    return True
-        
-        return False
-
     def _check_description_similarity(self, desc1: str, desc2: str) -> bool:
         """Check if descriptions are similar using simple text comparison"""
         # Convert to lowercase and remove common words
@@ -747,7 +918,7 @@ class IssueService:
         # Consider similar if more than 60% of words match
         return similarity > 0.6
 
-    def get_admin_issues(self, admin_id: int, status: str = None, category: str = None, priority: str = None, sort_by: str = "created_at", sort_order: str = "desc", limit: int = 50, offset: int = 0):
+    def get_admin_issues(self, admin_id: int, status: str = None, category: str = None, priority: str = None, sort_by: str = "created_at", sort_order: str = "desc", limit: int = 50, offset: int = 0, cursor: Optional[str] = None):
         """Get issues assigned to a specific admin"""
         query = self.db.query(Issue).filter(Issue.assigned_admin_id == admin_id)
         
@@ -759,70 +930,28 @@ class IssueService:
         if priority:
             query = query.filter(Issue.priority == priority)
         
-        # Apply sorting
-        if sort_by == "created_at":
-            if sort_order == "desc":
-                query = query.order_by(desc(Issue.created_at))
-            else:
-                query = query.order_by(Issue.created_at)
-        elif sort_by == "updated_at":
-            if sort_order == "desc":
-                query = query.order_by(desc(Issue.updated_at))
-            else:
-                query = query.order_by(Issue.updated_at)
-        elif sort_by == "priority":
-            if sort_order == "desc":
-                query = query.order_by(desc(Issue.priority))
-            else:
-                query = query.order_by(Issue.priority)
-        else:
-            # Default sorting
-            query = query.order_by(desc(Issue.created_at))
-        
-        # Pagination
-        issues = query.offset(offset).limit(limit).all()
-        
-        result = []
-        for issue in issues:
-            # Get reporter name - show "Anonymous" if anonymous, otherwise show actual name
-            reporter_name = "Anonymous"
-            if not issue.is_anonymous:
-                reporter = self.db.query(User).filter(User.id == issue.reporter_id).first()
-                if reporter:
-                    reporter_name = reporter.full_name
-            
-            # Get assigned admin name
-            assigned_admin_name = None
-            if issue.assigned_admin_id:
-                admin = self.db.query(User).filter(User.id == issue.assigned_admin_id).first()
-                if admin:
-                    assigned_admin_name = admin.full_name
-            
-            result.append({
-                "id": issue.id,
-                "reporter_id": issue.reporter_id,
-                "reporter_name": reporter_name,
-                "category": issue.category,
-                "status": issue.status,
-                "priority": issue.priority,
-            "severity_score": issue.severity_score,
-                "description": issue.description,
-                "lat": issue.lat,
-                "lng": issue.lng,
-                "media_urls": issue.media_urls_list,
-                "is_anonymous": bool(issue.is_anonymous),
-                "is_verified": bool(issue.is_verified),
-                "assigned_department": issue.assigned_department,
-                "assigned_admin_id": issue.assigned_admin_id,
-                "assigned_admin_name": assigned_admin_name,
-                "address_line1": issue.address_line1,
-                "address_line2": issue.address_line2,
-                "street": issue.street,
-                "landmark": issue.landmark,
-                "pincode": issue.pincode,
-                "upvote_count": issue.upvote_count,
-                "created_at": issue.created_at,
-                "updated_at": issue.updated_at
-            })
-        
-        return result
+        # Apply sorting and keyset pagination
+        if sort_by in ("created_at", "updated_at", "priority"):
+            return self._keyset_page(query, sort_by, sort_order == "desc", cursor, limit, offset)
+        # Default sorting
+        return self._keyset_page(query, "created_at", True, cursor, limit, offset)
+
+    def _keyset_page(self, query, sort_name: str, descending: bool, cursor: Optional[str],
+                     limit: int, offset: int) -> List[dict]:
+        """Order by (sort column, id), fetch one page and remember the cursor for the next one"""
+        issues, self.next_cursor = keyset_paginate(
+            query, sort_name, getattr(Issue, sort_name), Issue.id, descending, cursor, limit, offset
+        )
+        return self._serialize_issues(issues)
+
+
+def fill_remote_fingerprints(issue_id: int):
+    """Background task: fingerprint an issue's remote images with a session of its own"""
+    from app.core.db import SessionLocal
+    db = SessionLocal()
+    try:
+        IssueService(db).fill_remote_fingerprints(issue_id)
+    except Exception as e:
+        print(f"Fingerprinting images of issue {issue_id} failed: {e}")
+    finally:
+        db.close()
@@ -1,75 +1,118 @@
 from datetime import datetime
 from typing import List, Optional
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from app.models.issue import Issue, Message, Notification
+from app.models.issue import Issue, Message
 from app.models.user import User
+from app.core.db import run_db
 from app.core.websocket import manager
+from app.services.notification_service import queue_notifications
+
+def can_access_chat(access: Optional[dict], principal: dict) -> bool:
+    """Only an issue's reporter and its assigned admin may read or join its chat"""
+    if access is None:
+        return False
+    if principal["role"] == "admin":
+        return access["assigned_admin_id"] == principal["id"]
+    return access["reporter_id"] == principal["id"]
+
 
 class MessageService:
-    def __init__(self, db: Session):
+    """Issue chat.
+
+    ``db`` is a Session or an AsyncSession (see core.db.get_async_db). All
+    database work runs through run_db, so the event loop is never blocked by
+    it, and WebSocket fan-out happens only after the transaction committed.
+    """
+
+    def __init__(self, db):
         self.db = db
 
+    async def get_chat_access(self, issue_id: int) -> Optional[dict]:
+        """Reporter and assigned admin of an issue; None if no such issue"""
+        return await run_db(self.db, self._chat_access, issue_id)
+
     async def send_message(self, issue_id: int, sender_id: int, message_text: str, is_admin_message: bool = False):
         """Send a message in issue chat"""
-        # Check if issue exists
-        issue = self.db.query(Issue).filter(Issue.id == issue_id).first()
-        if not issue:
+        result = await run_db(self.db, self._store_message, issue_id, sender_id, message_text, is_admin_message)
+        if not result["success"]:
+            return result
+
+        # Chat is private: deliver to the other party only, never to issue subscribers
+        recipient_id = result.pop("recipient_id")
+        timestamp = datetime.utcnow().isoformat()
+        if recipient_id:
+            await manager.send_to_user(recipient_id, {
+                "type": "new_message",
+                "issue_id": issue_id,
+                "message": message_text,
+                "sender": "admin" if is_admin_message else "user",
+                "timestamp": timestamp
+            })
+        return result
+
+    async def get_issue_messages(self, issue_id: int) -> List[dict]:
+        """Get all messages for an issue"""
+        return await run_db(self.db, self._load_messages, issue_id)
+
+    @staticmethod
+    def _chat_access(db: Session, issue_id: int) -> Optional[dict]:
+        issue = db.execute(
+            select(Issue.reporter_id, Issue.assigned_admin_id).where(Issue.id == issue_id)
+        ).first()
+        if issue is None:
+            return None
+        return {
+            "reporter_id": issue.reporter_id,
+            "assigned_admin_id": issue.assigned_admin_id
+        }
+
+    @staticmethod
+    def _store_message(db: Session, issue_id: int, sender_id: int, message_text: str, is_admin_message: bool) -> dict:
+        """Insert the message and the other party's notification in one transaction"""
+        issue = db.execute(
+            select(Issue.reporter_id, Issue.assigned_admin_id).where(Issue.id == issue_id)
+        ).first()
+        if issue is None:
             return {"success": False, "message": "Issue not found"}
-        
-        # Create message
+
         message = Message(
             issue_id=issue_id,
             sender_id=sender_id,
             message=message_text,
             is_admin_message=is_admin_message
         )
-        
-        self.db.add(message)
-        self.db.commit()
-        
-        # Send notification to the other party
+        db.add(message)
+
+        # Notify the other party: the reporter for admin messages, else the assigned admin
         if is_admin_message:
-            # Admin sent message, notify user
-            self._send_notification(
-                user_id=issue.reporter_id,
-                issue_id=issue_id,
-                notification_type="message",
-                message=f"Admin sent a message about issue #{issue_id}: {message_text[:50]}..."
-            )
-            # Send real-time notification via WebSocket
-            await manager.send_to_user(issue.reporter_id, {
-                "type": "new_message",
-                "issue_id": issue_id,
-                "message": message_text,
-                "sender": "admin",
-                "timestamp": datetime.utcnow().isoformat()
-            })
+            recipient_id = issue.reporter_id
+            text = f"Admin sent a message about issue #{issue_id}: {message_text[:50]}..."
         else:
-            # User sent message, notify assigned admin
-            if issue.assigned_admin_id:
-                self._send_notification(
-                    user_id=issue.assigned_admin_id,
-                    issue_id=issue_id,
-                    notification_type="message",
-                    message=f"User sent a message about issue #{issue_id}: {message_text[:50]}..."
-                )
-                # Send real-time notification via WebSocket
-                await manager.send_to_user(issue.assigned_admin_id, {
-                    "type": "new_message",
-                    "issue_id": issue_id,
-                    "message": message_text,
-                    "sender": "user",
-                    "timestamp": datetime.utcnow().isoformat()
-                })
-        
-        return {"success": True, "message_id": message.id}
-
-    def get_issue_messages(self, issue_id: int):
-        """Get all messages for an issue"""
-        messages = self.db.query(Message).filter(
-            Message.issue_id == issue_id
-        ).order_by(Message.created_at.asc()).all()
-        
+            recipient_id = issue.assigned_admin_id
+            text = f"User sent a message about issue #{issue_id}: {message_text[:50]}..."
+        if recipient_id:
+            queue_notifications(db, [{
+                "user_id": recipient_id,
+                "issue_id": issue_id,
+                "type": "message",
+                "message": text
+            }])
+
+        db.flush()
+        message_id = message.id
+        db.commit()
+        return {"success": True, "message_id": message_id, "recipient_id": recipient_id}
+
+    @staticmethod
+    def _load_messages(db: Session, issue_id: int) -> List[dict]:
+        rows = db.execute(
+            select(Message, User.full_name)
+            .outerjoin(User, User.id == Message.sender_id)
+            .where(Message.issue_id == issue_id)
+            .order_by(Message.created_at.asc())
+        ).all()
+
         return [
             {
                 "id": msg.id,
@@ -78,18 +121,7 @@ class MessageService:
                 "message": msg.message,
                 "is_admin_message": msg.is_admin_message,
                 "created_at": msg.created_at,
-                "sender_name": msg.sender.full_name if msg.sender else "Unknown"
+                "sender_name": sender_name or "Unknown"
             }
-            for msg in messages
+            for msg, sender_name in rows
         ]
-
-    def _send_notification(self, user_id: int, issue_id: int, notification_type: str, message: str):
-        """Send notification to user"""
-        notification = Notification(
-            user_id=user_id,
-            issue_id=issue_id,
-            type=notification_type,
-            message=message
-        )
-        self.db.add(notification)
-        self.db.commit()
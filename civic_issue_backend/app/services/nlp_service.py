@@ -1,77 +1,178 @@
 import re
+import hashlib
+import threading
+from collections import Counter, OrderedDict
 from textblob import TextBlob
 from typing import Dict, List
 
+# High priority keywords (environmental hazards, health risks, toxic waste)
+HIGH_PRIORITY_KEYWORDS = [
+    'urgent', 'emergency', 'dangerous', 'danger', 'critical', 'severe', 'serious',
+    'toxic', 'hazardous', 'chemical', 'contaminated', 'poisonous', 'harmful',
+    'health hazard', 'public health', 'disease', 'infection', 'unsafe', 'hazard', 'risk', 'threat',
+    'blocking', 'blocked', 'stuck', 'trapped', 'flooding', 'flood', 'overflow',
+    'burning', 'smoke', 'pollution', 'toxic fumes', 'air pollution',
+    'immediate', 'asap', 'now', 'quickly', 'fast', 'rush', 'priority',
+    'biomedical waste', 'medical waste', 'e-waste', 'hazardous waste'
+]
+
+# Medium priority keywords (visible pollution, community impact, waste accumulation)
+MEDIUM_PRIORITY_KEYWORDS = [
+    'problem', 'issue', 'concern', 'trouble', 'difficulty', 'inconvenience',
+    'annoying', 'bothersome', 'uncomfortable', 'inconvenient', 'slow',
+    'garbage', 'waste', 'trash', 'litter', 'dumping', 'debris', 'rubbish',
+    'dirty', 'messy', 'unclean', 'smelly', 'foul smell', 'stinking',
+    'pollution', 'contaminated', 'polluted', 'dirty water', 'stagnant',
+    'overflow', 'overflowing', 'accumulated', 'piled up', 'scattered'
+]
+
+# Low priority keywords (minor cleanup, cosmetic issues)
+LOW_PRIORITY_KEYWORDS = [
+    'minor', 'small', 'little', 'slight', 'suggestion', 'improvement',
+    'enhancement', 'better', 'nice', 'good', 'fine', 'okay', 'acceptable',
+    'cleanup', 'routine', 'regular', 'normal', 'expected', 'planned',
+    'cosmetic', 'aesthetic', 'visual', 'appearance'
+]
+
+URGENCY_PATTERNS = [
+    re.compile(r'\b(urgent|emergency|asap|immediately|now|quickly|fast)\b'),
+    re.compile(r'\b\d+\s*(hours?|days?|minutes?)\b'),  # Time references
+    re.compile(r'\b(blocking|stuck|trapped|flooding|overflow)\b'),  # Blocking situations
+    re.compile(r'\b(toxic|hazardous|contaminated|poisonous|health hazard|public health)\b'),  # Environmental hazards
+    re.compile(r'\b(burning|smoke|pollution|toxic fumes|air pollution)\b'),  # Pollution indicators
+    re.compile(r'\b(biomedical waste|medical waste|e-waste|hazardous waste)\b'),  # Dangerous waste
+    re.compile(r'!{2,}'),  # Multiple exclamation marks
+    re.compile(r'\b(very|extremely|highly|severely)\b')  # Intensifiers
+]
+
+TIERS = ('high', 'medium', 'low')
+
+
+class KeywordEngine:
+    """Counts keyword hits for every priority tier in a single regex scan.
+
+    All keywords are compiled into one alternation (longest first) wrapped in a
+    lookahead, so every word-boundary position yields the longest keyword that
+    matches there. Shorter keywords that are word-boundary prefixes of that match
+    (e.g. 'toxic' inside 'toxic fumes') are credited too, which keeps the counts
+    identical to running one ``\\bkeyword\\b`` search per keyword.
+    """
+
+    def __init__(self, tiers: Dict[str, List[str]]):
+        self.tiers = tiers
+        self.weights = {tier: Counter(keywords) for tier, keywords in tiers.items()}
+        keywords = sorted({kw for kws in tiers.values() for kw in kws}, key=len, reverse=True)
+        alternation = '|'.join(re.escape(kw) for kw in keywords)
+        self.pattern = re.compile(r'\b(?=(' + alternation + r')\b)')
+        self.prefixes = {kw: [other for other in keywords if self._is_word_prefix(other, kw)] for kw in keywords}
+
+    @staticmethod
+    def _is_word_prefix(prefix: str, keyword: str) -> bool:
+        """True if prefix matches keyword's start and ends on a word boundary inside it"""
+        if not keyword.startswith(prefix):
+            return False
+        if len(prefix) == len(keyword):
+            return True
+        return (prefix[-1].isalnum() or prefix[-1] == '_') != (keyword[len(prefix)].isalnum() or keyword[len(prefix)] == '_')
+
+    def scan(self, text: str):
+        """Return (counts per tier, matched keywords per tier) for lowercased text"""
+        counts = dict.fromkeys(self.tiers, 0)
+        matched = {tier: set() for tier in self.tiers}
+        for match in self.pattern.finditer(text):
+            for keyword in self.prefixes[match.group(1)]:
+                for tier, weights in self.weights.items():
+                    weight = weights.get(keyword)
+                    if weight:
+                        counts[tier] += weight
+                        matched[tier].add(keyword)
+        detected = {
+            tier: [kw for kw in dict.fromkeys(keywords) if kw in matched[tier]]
+            for tier, keywords in self.tiers.items()
+        }
+        return counts, detected
+
+
+_keyword_engine = KeywordEngine({
+    'high': HIGH_PRIORITY_KEYWORDS,
+    'medium': MEDIUM_PRIORITY_KEYWORDS,
+    'low': LOW_PRIORITY_KEYWORDS,
+})
+
+
 class NLPService:
+    # Analysis results shared by all instances, keyed by a hash of the normalized text
+    _cache: "OrderedDict[str, Dict[str, any]]" = OrderedDict()
+    _cache_lock = threading.Lock()
+    cache_size = 1024
+
     def __init__(self):
-        # High priority keywords (environmental hazards, health risks, toxic waste)
-        self.high_priority_keywords = [
-            'urgent', 'emergency', 'dangerous', 'danger', 'critical', 'severe', 'serious',
-            'toxic', 'hazardous', 'chemical', 'contaminated', 'poisonous', 'harmful',
-            'health hazard', 'public health', 'disease', 'infection', 'unsafe', 'hazard', 'risk', 'threat',
-            'blocking', 'blocked', 'stuck', 'trapped', 'flooding', 'flood', 'overflow',
-            'burning', 'smoke', 'pollution', 'toxic fumes', 'air pollution',
-            'immediate', 'asap', 'now', 'quickly', 'fast', 'rush', 'priority',
-            'biomedical waste', 'medical waste', 'e-waste', 'hazardous waste'
-        ]
-        
-        # Medium priority keywords (visible pollution, community impact, waste accumulation)
-        self.medium_priority_keywords = [
-            'problem', 'issue', 'concern', 'trouble', 'difficulty', 'inconvenience',
-            'annoying', 'bothersome', 'uncomfortable', 'inconvenient', 'slow',
-            'garbage', 'waste', 'trash', 'litter', 'dumping', 'debris', 'rubbish',
-            'dirty', 'messy', 'unclean', 'smelly', 'foul smell', 'stinking',
-            'pollution', 'contaminated', 'polluted', 'dirty water', 'stagnant',
-            'overflow', 'overflowing', 'accumulated', 'piled up', 'scattered'
-        ]
-        
-        # Low priority keywords (minor cleanup, cosmetic issues)
-        self.low_priority_keywords = [
-            'minor', 'small', 'little', 'slight', 'suggestion', 'improvement',
-            'enhancement', 'better', 'nice', 'good', 'fine', 'okay', 'acceptable',
-            'cleanup', 'routine', 'regular', 'normal', 'expected', 'planned',
-            'cosmetic', 'aesthetic', 'visual', 'appearance'
-        ]
+        self.high_priority_keywords = HIGH_PRIORITY_KEYWORDS
+        self.medium_priority_keywords = MEDIUM_PRIORITY_KEYWORDS
+        self.low_priority_keywords = LOW_PRIORITY_KEYWORDS
 
-    def detect_priority(self, description: str) -> str:
-        """Detect priority level based on description text"""
+    def analyze(self, description: str) -> Dict[str, any]:
+        """Score a description once and return priority, severity and explanation"""
         if not description:
-            return "medium"
-        
+            return {
+                'priority': 'medium',
+                'severity_score': 0.5,  # Default medium severity
+                'detected_keywords': {tier: [] for tier in TIERS},
+                'sentiment_score': 0,
+                'urgency_score': 0,
+                'explanation': "Priority 'medium' detected based on keywords, sentiment, and urgency indicators"
+            }
+
         # Convert to lowercase for analysis
         text = description.lower()
-        
-        # Count keyword occurrences
-        high_count = self._count_keywords(text, self.high_priority_keywords)
-        medium_count = self._count_keywords(text, self.medium_priority_keywords)
-        low_count = self._count_keywords(text, self.low_priority_keywords)
-        
-        # Analyze sentiment
+        key = hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+        if cached is None:
+            cached = self._analyze_text(text)
+            with self._cache_lock:
+                self._cache[key] = cached
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        result = dict(cached)
+        result['detected_keywords'] = {tier: list(kws) for tier, kws in cached['detected_keywords'].items()}
+        return result
+
+    def _analyze_text(self, text: str) -> Dict[str, any]:
+        """Run keyword, sentiment and urgency analysis over lowercased text"""
+        counts, detected_keywords = _keyword_engine.scan(text)
         sentiment_score = self._analyze_sentiment(text)
-        
-        # Analyze urgency indicators
         urgency_score = self._analyze_urgency(text)
-        
-        # Calculate priority score
-        priority_score = self._calculate_priority_score(
-            high_count, medium_count, low_count, sentiment_score, urgency_score
+
+        severity_score = self._calculate_priority_score(
+            counts['high'], counts['medium'], counts['low'], sentiment_score, urgency_score
         )
-        
+
         # Determine priority level
-        if priority_score >= 0.7:
-            return "high"
-        elif priority_score >= 0.3:
-            return "medium"
+        if severity_score >= 0.7:
+            priority = "high"
+        elif severity_score >= 0.3:
+            priority = "medium"
         else:
-            return "low"
-    
-    def _count_keywords(self, text: str, keywords: List[str]) -> int:
-        """Count occurrences of keywords in text"""
-        count = 0
-        for keyword in keywords:
-            count += len(re.findall(r'\b' + re.escape(keyword) + r'\b', text))
-        return count
-    
+            priority = "low"
+
+        return {
+            'priority': priority,
+            'severity_score': severity_score,
+            'detected_keywords': detected_keywords,
+            'sentiment_score': sentiment_score,
+            'urgency_score': urgency_score,
+            'explanation': f"Priority '{priority}' detected based on keywords, sentiment, and urgency indicators"
+        }
+
+    def detect_priority(self, description: str) -> str:
+        """Detect priority level based on description text"""
+        return self.analyze(description)['priority']
+
     def _analyze_sentiment(self, text: str) -> float:
         """Analyze sentiment of the text"""
         try:
@@ -81,88 +182,35 @@ class NLPService:
             return abs(blob.sentiment.polarity) if blob.sentiment.polarity < 0 else 0
         except:
             return 0
-    
+
     def _analyze_urgency(self, text: str) -> float:
         """Analyze urgency indicators in text"""
-        urgency_patterns = [
-            r'\b(urgent|emergency|asap|immediately|now|quickly|fast)\b',
-            r'\b\d+\s*(hours?|days?|minutes?)\b',  # Time references
-            r'\b(blocking|stuck|trapped|flooding|overflow)\b',  # Blocking situations
-            r'\b(toxic|hazardous|contaminated|poisonous|health hazard|public health)\b',  # Environmental hazards
-            r'\b(burning|smoke|pollution|toxic fumes|air pollution)\b',  # Pollution indicators
-            r'\b(biomedical waste|medical waste|e-waste|hazardous waste)\b',  # Dangerous waste
-            r'!{2,}',  # Multiple exclamation marks
-            r'\b(very|extremely|highly|severely)\b'  # Intensifiers
-        ]
-        
         urgency_score = 0
-        for pattern in urgency_patterns:
-            matches = re.findall(pattern, text)
+        for pattern in URGENCY_PATTERNS:
+            matches = pattern.findall(text)
             urgency_score += len(matches) * 0.1
-        
+
         return min(urgency_score, 1.0)  # Cap at 1.0
-    
-    def _calculate_priority_score(self, high_count: int, medium_count: int, 
-                                low_count: int, sentiment_score: float, 
+
+    def _calculate_priority_score(self, high_count: int, medium_count: int,
+                                low_count: int, sentiment_score: float,
                                 urgency_score: float) -> float:
         """Calculate overall priority score"""
         # Weight the keyword counts
         keyword_score = (high_count * 0.4 + medium_count * 0.2 - low_count * 0.1)
-        
+
         # Normalize keyword score
         keyword_score = min(keyword_score / 5.0, 1.0)  # Cap at 1.0
-        
+
         # Combine with sentiment and urgency
         total_score = (keyword_score * 0.5 + sentiment_score * 0.3 + urgency_score * 0.2)
-        
+
         return min(total_score, 1.0)  # Cap at 1.0
-    
+
     def get_severity_score(self, description: str) -> float:
         """Get severity score (0-1) based on description text"""
-        if not description:
-            return 0.5  # Default medium severity
-        
-        text = description.lower()
-        
-        # Count keyword occurrences
-        high_count = self._count_keywords(text, self.high_priority_keywords)
-        medium_count = self._count_keywords(text, self.medium_priority_keywords)
-        low_count = self._count_keywords(text, self.low_priority_keywords)
-        
-        # Analyze sentiment
-        sentiment_score = self._analyze_sentiment(text)
-        
-        # Analyze urgency indicators
-        urgency_score = self._analyze_urgency(text)
-        
-        # Calculate severity score (same logic as priority but return the raw score)
-        keyword_score = (high_count * 0.4 + medium_count * 0.2 - low_count * 0.1)
-        keyword_score = min(keyword_score / 5.0, 1.0)  # Cap at 1.0
-        
-        total_score = (keyword_score * 0.5 + sentiment_score * 0.3 + urgency_score * 0.2)
-        
-        return min(total_score, 1.0)  # Cap at 1.0
+        return self.analyze(description)['severity_score']
 
     def get_priority_explanation(self, description: str) -> Dict[str, any]:
         """Get detailed explanation of priority detection"""
-        text = description.lower()
-        
-        detected_keywords = {
-            'high': [kw for kw in self.high_priority_keywords if kw in text],
-            'medium': [kw for kw in self.medium_priority_keywords if kw in text],
-            'low': [kw for kw in self.low_priority_keywords if kw in text]
-        }
-        
-        sentiment_score = self._analyze_sentiment(text)
-        urgency_score = self._analyze_urgency(text)
-        priority = self.detect_priority(description)
-        severity_score = self.get_severity_score(description)
-        
-        return {
-            'priority': priority,
-            'severity_score': severity_score,
-            'detected_keywords': detected_keywords,
-            'sentiment_score': sentiment_score,
-            'urgency_score': urgency_score,
-            'explanation': f"Priority '{priority}' detected based on keywords, sentiment, and urgency indicators"
-        }
+        return self.analyze(description)
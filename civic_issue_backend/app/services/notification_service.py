@@ -1,4 +1,320 @@
+"""
+Transactional notification outbox.
+
+queue_notifications() inserts notifications in the caller's own transaction,
+so a request commits once and a notification exists exactly when the change
+that caused it does. The notifications table doubles as the outbox: rows with
+dispatched_at NULL are claimed in batches by NotificationDispatcher, which runs
+on the event loop, pushes them to the user's WebSocket channel and the push
+channel, and marks them dispatched. Failed deliveries are retried with
+exponential backoff up to NOTIFICATION_MAX_ATTEMPTS (delivery is at least
+once). A commit that queued notifications wakes the dispatcher, so the poll
+interval only bounds the delay for retries and other workers' rows. After each
+batch the recipients also get one "inbox_changed" delta with their unread count.
+"""
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import bindparam, event, func, insert, select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.websocket import manager
+from app.models.issue import Notification
+from app.models.user import User
+from app.services.inbox_service import adjust_unread_counts
+
+MAX_RETRY_DELAY_SECONDS = 300
+
+
 class NotificationService:
     def send_push(self, user_id: int, message: str):
         print(f"Push to {user_id}: {message}")
         return True
+
+
+def queue_notifications(db: Session, notifications: Iterable[dict]) -> int:
+    """Add notifications (user_id, issue_id, type, message) to the outbox without committing.
+
+    All rows go in as one executemany INSERT, so notifying many users costs a
+    single statement, and the recipients' unread counters move with it.
+    """
+    rows = [dict(notification) for notification in notifications]
+    if rows:
+        db.execute(insert(Notification.__table__), rows)
+        unread: Dict[int, int] = {}
+        for row in rows:
+            unread[row["user_id"]] = unread.get(row["user_id"], 0) + 1
+        adjust_unread_counts(db, unread)
+        db.info["notifications_queued"] = True
+    return len(rows)
+
+
+class NotificationDispatcher:
+    """Drains the notification outbox in batches to WebSocket and push"""
+
+    def __init__(self, session_factory: Callable[[], Any], batch_size: int = 100,
+                 poll_interval: float = 1.0, max_attempts: int = 5, retry_base: float = 2.0,
+                 claim_timeout: float = 60.0, push_service: Optional[NotificationService] = None,
+                 ws_manager=None):
+        self.session_factory = session_factory
+        self.batch_size = max(1, batch_size)
+        self.poll_interval = poll_interval
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base = retry_base
+        self.claim_timeout = claim_timeout
+        self.push_service = push_service or NotificationService()
+        self.ws_manager = ws_manager or manager
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake_event: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self._batches = 0
+        self._dispatched = 0
+        self._retries = 0
+        self._gave_up = 0
+        self._errors = 0
+        self._last_lag_ms = 0.0
+        self._max_lag_ms = 0.0
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake_event = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._loop = None
+
+    def wake(self):
+        """Dispatch now instead of at the next poll; callable from any thread"""
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(self._wake_event.set)
+        except RuntimeError:  # Loop closed during shutdown
+            pass
+
+    async def dispatch_once(self) -> int:
+        """Claim one batch of due notifications and deliver it; returns the batch size"""
+        batch = await run_in_threadpool(self._claim)
+        if not batch:
+            return 0
+        results = await asyncio.gather(*(self._deliver(row) for row in batch))
+        delivered = [row for row, ok in zip(batch, results) if ok]
+        failed = [row for row, ok in zip(batch, results) if not ok]
+        unread_counts = await run_in_threadpool(self._finish, delivered, failed)
+        for user_id, unread_count in unread_counts.items():
+            await self.ws_manager.send_to_user(user_id, {"type": "inbox_changed", "unread_count": unread_count})
+        self._batches += 1
+        return len(batch)
+
+    def backlog(self) -> Dict[str, Any]:
+        """Undelivered notifications and the age of the oldest one"""
+        db = self.session_factory()
+        try:
+            pending, oldest = db.execute(
+                select(func.count(Notification.id), func.min(Notification.created_at))
+                .where(Notification.dispatched_at.is_(None))
+            ).one()
+        finally:
+            db.close()
+        return {
+            "pending": pending,
+            "oldest_age_seconds": (datetime.utcnow() - oldest).total_seconds() if oldest else 0.0,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self._batches,
+            "dispatched": self._dispatched,
+            "retries": self._retries,
+            "gave_up": self._gave_up,
+            "errors": self._errors,
+            "last_lag_ms": self._last_lag_ms,
+            "max_lag_ms": self._max_lag_ms,
+        }
+
+    def retry_delay(self, attempts: int) -> float:
+        """Backoff before the next try after `attempts` failed deliveries"""
+        return min(MAX_RETRY_DELAY_SECONDS, self.retry_base * 2 ** (attempts - 1))
+
+    async def _run(self):
+        while True:
+            self._wake_event.clear()
+            try:
+                claimed = await self.dispatch_once()
+            except Exception as e:
+                self._errors += 1
+                print(f"Notification dispatch error: {e}")
+                claimed = 0
+            if claimed >= self.batch_size:
+                continue  # More are waiting
+            try:
+                await asyncio.wait_for(self._wake_event.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _claim(self) -> List[dict]:
+        """Lease a batch of due rows so no other worker delivers them meanwhile.
+
+        A lease is just next_attempt_at moved claim_timeout ahead: if this
+        worker dies mid-batch, the rows become due again afterwards.
+        """
+        now = datetime.utcnow()
+        table = Notification.__table__
+        due = (table.c.dispatched_at.is_(None)) & (table.c.next_attempt_at <= now)
+        columns = [table.c.id, table.c.user_id, table.c.issue_id, table.c.type,
+                   table.c.message, table.c.created_at, table.c.attempts]
+        ids = select(table.c.id).where(due).order_by(table.c.next_attempt_at, table.c.id).limit(self.batch_size)
+        lease = update(table).values(next_attempt_at=now + timedelta(seconds=self.claim_timeout))
+
+        db = self.session_factory()
+        try:
+            dialect = db.get_bind().dialect
+            if dialect.name == "postgresql":
+                ids = ids.with_for_update(skip_locked=True)
+            if dialect.update_returning:
+                rows = db.execute(
+                    lease.where(table.c.id.in_(ids.scalar_subquery()), due).returning(*columns)
+                ).mappings().all()
+            else:
+                claimed = db.execute(ids).scalars().all()
+                if not claimed:
+                    return []
+                db.execute(lease.where(table.c.id.in_(claimed), due))
+                rows = db.execute(select(*columns).where(table.c.id.in_(claimed))).mappings().all()
+            db.commit()
+            return sorted((dict(row) for row in rows), key=lambda row: row["id"])
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def _deliver(self, row: dict) -> bool:
+        try:
+            await self.ws_manager.send_to_user(row["user_id"], {
+                "type": "notification",
+                "id": row["id"],
+                "issue_id": row["issue_id"],
+                "notification_type": row["type"],
+                "message": row["message"],
+                "created_at": row["created_at"].isoformat() if row["created_at"] else None,
+            })
+            return bool(await run_in_threadpool(self.push_service.send_push, row["user_id"], row["message"]))
+        except Exception as e:
+            print(f"Notification {row['id']} delivery failed: {e}")
+            return False
+
+    def _finish(self, delivered: List[dict], failed: List[dict]) -> Dict[int, int]:
+        """Mark delivered rows dispatched, reschedule failed ones or give up on them.
+
+        Returns the current unread count of each user something was delivered to.
+        """
+        now = datetime.utcnow()
+        table = Notification.__table__
+        retry = []
+        done = [row["id"] for row in delivered]
+        for row in failed:
+            attempts = row["attempts"] + 1
+            if attempts >= self.max_attempts:
+                done.append(row["id"])
+                self._gave_up += 1
+            else:
+                retry.append({
+                    "b_id": row["id"],
+                    "b_attempts": attempts,
+                    "b_next_attempt_at": now + timedelta(seconds=self.retry_delay(attempts)),
+                })
+
+        db = self.session_factory()
+        try:
+            if done:
+                db.execute(
+                    update(table).where(table.c.id.in_(done))
+                    .values(dispatched_at=now, attempts=table.c.attempts + 1)
+                )
+            if retry:
+                db.execute(
+                    update(table).where(table.c.id == bindparam("b_id"))
+                    .values(attempts=bindparam("b_attempts"), next_attempt_at=bindparam("b_next_attempt_at")),
+                    retry,
+                )
+            recipients = {row["user_id"] for row in delivered}
+            unread_counts = dict(db.execute(
+                select(User.id, User.unread_notification_count).where(User.id.in_(recipients))
+            ).all()) if recipients else {}
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise  # Leases expire, so these rows are retried later
+        finally:
+            db.close()
+
+        self._dispatched += len(delivered)
+        self._retries += len(retry)
+        for row in delivered:
+            if row["created_at"] is not None:
+                lag_ms = (now - row["created_at"]).total_seconds() * 1000.0
+                self._last_lag_ms = lag_ms
+                self._max_lag_ms = max(self._max_lag_ms, lag_ms)
+        return unread_counts
+
+
+_dispatcher: Optional[NotificationDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_notification_dispatcher() -> Optional[NotificationDispatcher]:
+    """Process-wide dispatcher when NOTIFICATION_DISPATCH_ENABLED, else None"""
+    global _dispatcher
+    if not settings.NOTIFICATION_DISPATCH_ENABLED:
+        return None
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                from app.core.db import SessionLocal
+                _dispatcher = NotificationDispatcher(
+                    SessionLocal,
+                    batch_size=settings.NOTIFICATION_BATCH_SIZE,
+                    poll_interval=settings.NOTIFICATION_POLL_INTERVAL_MS / 1000.0,
+                    max_attempts=settings.NOTIFICATION_MAX_ATTEMPTS,
+                    retry_base=settings.NOTIFICATION_RETRY_BASE_SECONDS,
+                )
+    return _dispatcher
+
+
+async def start_notification_dispatcher():
+    dispatcher = get_notification_dispatcher()
+    if dispatcher is not None:
+        await dispatcher.start()
+
+
+async def stop_notification_dispatcher():
+    if _dispatcher is not None:
+        await _dispatcher.stop()
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_after_commit(session):
+    if session.info.pop("notifications_queued", False) and _dispatcher is not None:
+        _dispatcher.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("notifications_queued", None)
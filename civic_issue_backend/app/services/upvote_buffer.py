@@ -0,0 +1,157 @@
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import bindparam, event, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.issue import Issue
+
+
+class UpvoteCounterBuffer:
+    """Write-behind buffer for issues.upvote_count.
+
+    Upvote rows are still inserted/deleted synchronously (the unique index is
+    what makes a toggle exact); only the +1/-1 on the issue row is deferred.
+    Deltas are summed per issue in memory and a background thread applies them
+    every ``flush_interval_ms`` as one executemany UPDATE, so a burst of
+    thousands of upvotes on one viral issue becomes a single row write per
+    interval instead of one contended write each. Sorting by upvote_count lags
+    by at most one interval.
+    """
+
+    def __init__(self, session_factory: Callable[[], Any], flush_interval_ms: float = 500.0):
+        self.session_factory = session_factory
+        self.flush_interval = max(0.01, flush_interval_ms / 1000.0)
+        self._pending: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        # Metrics
+        self._increments = 0
+        self._flushes = 0
+        self._rows_written = 0
+        self._errors = 0
+
+    def add(self, issue_id: int, delta: int):
+        self._ensure_started()
+        with self._lock:
+            self._pending[issue_id] = self._pending.get(issue_id, 0) + delta
+            self._increments += 1
+
+    def add_on_commit(self, session: Session, issue_id: int, delta: int) -> int:
+        """Stage a delta that reaches the buffer only if ``session`` commits.
+
+        Returns the delta staged for the issue in this transaction so far.
+        """
+        staged = session.info.setdefault("upvote_deltas", {})
+        key = (self, issue_id)
+        staged[key] = staged.get(key, 0) + delta
+        return staged[key]
+
+    def pending(self, issue_id: int) -> int:
+        """Delta not yet written for an issue"""
+        with self._lock:
+            return self._pending.get(issue_id, 0)
+
+    def flush(self) -> int:
+        """Write all pending deltas; returns the number of issue rows updated"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        rows = [{"b_issue_id": issue_id, "b_delta": delta} for issue_id, delta in pending.items() if delta]
+        if not rows:
+            return 0
+
+        issues = Issue.__table__
+        stmt = (
+            update(issues)
+            .where(issues.c.id == bindparam("b_issue_id"))
+            .values(upvote_count=issues.c.upvote_count + bindparam("b_delta"), updated_at=datetime.utcnow())
+        )
+        db = self.session_factory()
+        try:
+            db.execute(stmt, rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            self._errors += 1
+            # Put the deltas back so the next flush retries them
+            with self._lock:
+                for row in rows:
+                    self._pending[row["b_issue_id"]] = self._pending.get(row["b_issue_id"], 0) + row["b_delta"]
+            return 0
+        finally:
+            db.close()
+
+        self._flushes += 1
+        self._rows_written += len(rows)
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending_issues = len(self._pending)
+        return {
+            "pending_issues": pending_issues,
+            "increments": self._increments,
+            "flushes": self._flushes,
+            "rows_written": self._rows_written,
+            "errors": self._errors,
+            "flush_interval_ms": self.flush_interval * 1000.0,
+        }
+
+    def shutdown(self):
+        """Stop the flusher and write whatever is still pending"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="upvote-buffer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+
+_buffer: Optional[UpvoteCounterBuffer] = None
+_buffer_lock = threading.Lock()
+
+
+def get_upvote_buffer() -> Optional[UpvoteCounterBuffer]:
+    """Process-wide buffer when UPVOTE_WRITE_BEHIND is enabled, else None"""
+    global _buffer
+    if not settings.UPVOTE_WRITE_BEHIND:
+        return None
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                from app.core.db import SessionLocal
+                _buffer = UpvoteCounterBuffer(SessionLocal, settings.UPVOTE_FLUSH_INTERVAL_MS)
+    return _buffer
+
+
+def shutdown_upvote_buffer():
+    if _buffer is not None:
+        _buffer.shutdown()
+
+
+@event.listens_for(Session, "after_commit")
+def _buffer_after_commit(session):
+    for (buffer, issue_id), delta in session.info.pop("upvote_deltas", {}).items():
+        if delta:
+            buffer.add(issue_id, delta)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("upvote_deltas", None)
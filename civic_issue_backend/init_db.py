@@ -9,6 +9,9 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from app.core.db import create_tables, SessionLocal
 from app.models.user import User
 from app.models.issue import Issue, Upvote
+from app.services.analytics_service import AnalyticsService
+from app.services.assignment_service import AssignmentService
+from app.services.issue_service import IssueService
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 import random
@@ -299,6 +302,15 @@ def init_database():
         
         db.commit()
         
+        # Issues above were inserted directly, not through IssueService
+        print("Rebuilding analytics rollups and admin workloads...")
+        AnalyticsService(db).rebuild_rollups()
+        AssignmentService(db).recount_open_issues()
+        db.commit()
+        
+        print("Fingerprinting issue images for duplicate detection...")
+        IssueService(db).backfill_fingerprints()
+        
         print("Database initialized successfully!")
         print(f"Created {len(users)} users (5 admins, 5 citizens)")
         print(f"Created {len(issues)} verified issues")
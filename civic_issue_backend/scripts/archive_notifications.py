@@ -0,0 +1,40 @@
+"""Retention job for the notifications table.
+
+Moves read notifications older than NOTIFICATION_RETENTION_DAYS (or --days)
+into notification_archive in small batches, one short transaction each, so it
+can run against the live database. Schedule it daily, e.g. from cron:
+
+    cd civic_issue_backend
+    python scripts/archive_notifications.py --days 30 --batch-size 1000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.realpath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.core.config import settings  # noqa: E402
+from app.core.db import SessionLocal  # noqa: E402
+from app.services.inbox_service import InboxService  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=settings.NOTIFICATION_RETENTION_DAYS,
+                        help="archive read notifications older than this")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        archived = InboxService(db).archive_read(args.days, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(f"Archived {archived} read notifications older than {args.days} days "
+          f"in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Backfill image_fingerprints for issues that have none.
+
+Issues created before duplicate fingerprinting, or inserted without
+IssueService (init_db.py, seed_demo_environmental_issues.py, manual SQL), are
+invisible to duplicate detection until their images are fingerprinted. Storage
+URLs on IMAGE_FETCH_ALLOWED_HOSTS are fetched; pass --no-remote to record only
+the URLs (exact-match detection) without fetching. Safe to rerun:
+
+    cd civic_issue_backend
+    python scripts/backfill_fingerprints.py --batch-size 100
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.realpath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.core.db import SessionLocal  # noqa: E402
+from app.services.issue_service import IssueService  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=100, help="issues per transaction")
+    parser.add_argument("--no-remote", action="store_true", help="don't fetch storage URLs")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        added = IssueService(db).backfill_fingerprints(batch_size=args.batch_size, allow_remote=not args.no_remote)
+    finally:
+        db.close()
+    print(f"Added {added} image fingerprints in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
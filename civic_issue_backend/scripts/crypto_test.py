@@ -1,10 +1,26 @@
+"""AES-GCM payload crypto: helpers for the login protocol and a micro-benchmark.
+
+The helpers below re-derive the key and build an AESGCM object per call, as
+core/encryption.py used to. The benchmark compares them with the cached
+CryptoContext (encrypt, decrypt, the packed login fields decrypted one by
+one and as a batch, and decrypting an old-key ciphertext during rotation).
+
+    cd civic_issue_backend
+    python scripts/crypto_test.py --iterations 20000
+    python scripts/crypto_test.py --decode <base64(nonce||ciphertext)>
+"""
+import argparse
 import os
 import json
 import base64
+import sys
+import time
 from hashlib import sha256
 
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
+sys.path.insert(0, os.path.realpath(os.path.join(os.path.dirname(__file__), "..")))
+
 
 AAD = b"zz1UyP7wdPOqiAg1m4XB5w=="
 
@@ -58,16 +74,59 @@ def unpack_password_b64(packed_b64: str) -> tuple[str, str]:
     return nonce, ct
 
 
-if __name__ == "__main__":
-    # Example usage
-    # Add this at the bottom of scripts/crypto_test.py or run in a Python REPL:
-    packed = "IPleKoR15AtCAzVOSrudF5npnhKQo9/gXYwRMy5wg0rmwp4ze36GAv/SDkcueTM="
-    n, c = unpack_password_b64(packed)
-    print("Decrypted:", decrypt_json(n, c))
-    # nf, cf = encrypt_json({"fp_check": fp_value})
-    # pf = pack_password_b64(nf, cf)
-    # print("Packed fp_check:", pf)
-    # nfd, cfd = unpack_password_b64(pf)
-    # print("Unpacked fp_check json:", decrypt_json(nfd, cfd))
+def _bench(name, fn, iterations):
+    fn()  # warm up
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - started
+    print(f"{name:<34} {iterations / elapsed:>11,.0f} ops/s  {elapsed / iterations * 1e6:8.2f} us/op")
+
+
+def run_benchmarks(iterations: int):
+    from app.core import encryption
+
+    # Both sides use the same key so the legacy numbers are directly comparable
+    os.environ["ENCRYPTION_KEY"] = base64.b64encode(encryption.get_crypto_context().active_key).decode()
+    global AAD
+    AAD = encryption.AAD_VALUE
+
+    payload = {"phone_number": "9000000001", "secret": "password123"}
+    legacy_nonce, legacy_ct = encrypt_json(payload)
+    sealed = encryption.encrypt_payload(payload)
+    password = pack_password_b64(*encrypt_json({"secret": "password123"}))
+    phone = pack_password_b64(*encrypt_json({"secret": "9000000001"}))
+
+    print(f"AES-256-GCM, {len(json.dumps(payload))}-byte JSON payload, {iterations} iterations")
+    _bench("legacy encrypt (key per call)", lambda: encrypt_json(payload), iterations)
+    _bench("legacy decrypt (key per call)", lambda: decrypt_json(legacy_nonce, legacy_ct), iterations)
+    _bench("context encrypt", lambda: encryption.encrypt_payload(payload), iterations)
+    _bench("context decrypt", lambda: encryption.decrypt_payload(sealed["nonce"], sealed["ciphertext"]), iterations)
+    _bench("context decrypt with kid", lambda: encryption.decrypt_payload(
+        sealed["nonce"], sealed["ciphertext"], kid=sealed["kid"]), iterations)
+    _bench("login fields, one by one", lambda: (encryption.decrypt_packed(password),
+                                                encryption.decrypt_packed(phone)), iterations)
+    _bench("login fields, batch", lambda: encryption.decrypt_packed_many([password, phone]), iterations)
+
+    # Rotation: a ciphertext from the retired key still opens, after the active key fails
+    old_key = os.environ["ENCRYPTION_KEY"]
+    encryption.reload_crypto_context(active_key=base64.b64encode(os.urandom(32)).decode(), previous_keys=[old_key])
+    _bench("decrypt old-key ciphertext, no kid", lambda: encryption.decrypt_payload(legacy_nonce, legacy_ct), iterations)
+    encryption.reload_crypto_context()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--decode", metavar="PACKED", help="decrypt a packed base64(nonce||ciphertext) value and exit")
+    args = parser.parse_args()
+
+    if args.decode:
+        from app.core.encryption import decrypt_packed
+        print("Decrypted:", decrypt_packed(args.decode))
+        return
+    run_benchmarks(args.iterations)
 
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Concurrency benchmark for the SQLite engine settings in app/core/db.py.
+
+Runs the same mixed upvote / create / list workload through IssueService from
+several threads against a fresh SQLite file, once with SQLAlchemy's default
+connection settings (rollback journal) and once with make_engine()'s pragmas
+(WAL, synchronous=NORMAL, mmap, busy_timeout), and prints throughput, latency
+percentiles and "database is locked" errors for each.
+
+    cd civic_issue_backend
+    python scripts/db_concurrency_bench.py --threads 16 --seconds 10
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.realpath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.core import geohash  # noqa: E402
+from app.core.db import Base, make_engine  # noqa: E402
+from app.models.issue import Issue  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.schemas.issue import IssueCreate  # noqa: E402
+from app.services.analytics_service import AnalyticsService  # noqa: E402
+from app.services.assignment_service import AssignmentService  # noqa: E402
+from app.services.issue_service import IssueService  # noqa: E402
+
+CATEGORIES = ["Open Garbage Dump", "Plastic Pollution", "Drainage Blockage", "Garbage Overflow",
+              "Other Environmental Issues"]
+DEPARTMENTS = ["Municipal Waste Collection", "Pollution Control Board", "Waste Water Management",
+               "Solid Waste Management", "Environmental Authority"]
+CENTER = (19.0760, 72.8777)
+
+
+def seed(session_factory, users: int, issues: int):
+    rng = random.Random(1)
+    with session_factory() as db:
+        db.add_all([
+            User(full_name=f"Admin {i}", phone_number=f"90000{i:05d}",
+                 password_hash="x", role="admin", department=DEPARTMENTS[i % len(DEPARTMENTS)])
+            for i in range(len(DEPARTMENTS) * 2)
+        ])
+        db.add_all([
+            User(full_name=f"Citizen {i}", phone_number=f"80000{i:05d}",
+                 password_hash="x", role="citizen")
+            for i in range(users)
+        ])
+        db.flush()
+        citizen_ids = [u.id for u in db.query(User).filter(User.role == "citizen")]
+        rows = []
+        for _ in range(issues):
+            lat = CENTER[0] + rng.uniform(-0.1, 0.1)
+            lng = CENTER[1] + rng.uniform(-0.1, 0.1)
+            rows.append(Issue(reporter_id=rng.choice(citizen_ids), category=rng.choice(CATEGORIES),
+                              description="Garbage piling up near the market", lat=lat, lng=lng,
+                              geohash=geohash.encode(lat, lng), upvote_count=0))
+        db.add_all(rows)
+        db.flush()
+        AnalyticsService(db).rebuild_rollups()
+        AssignmentService(db).recount_open_issues()
+        db.commit()
+        return citizen_ids, [i.id for i in db.query(Issue.id)]
+
+
+def run(mode: str, args) -> dict:
+    path = os.path.join(tempfile.mkdtemp(prefix="db-bench-"), "bench.db")
+    engine = make_engine(f"sqlite:///{path}", tune_sqlite=(mode == "tuned"))
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    citizen_ids, issue_ids = seed(session_factory, args.users, args.issues)
+    AssignmentService.invalidate_cache()
+
+    weights = {"upvote": args.upvote, "create": args.create, "list": args.list}
+    ops, op_weights = list(weights), list(weights.values())
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def worker(seed_value):
+        rng = random.Random(seed_value)
+        local_latencies = defaultdict(list)
+        local_errors = defaultdict(int)
+        while time.perf_counter() < deadline:
+            op = rng.choices(ops, op_weights)[0]
+            db = session_factory()
+            service = IssueService(db)
+            started = time.perf_counter()
+            try:
+                if op == "upvote":
+                    service.upvote_issue(rng.choice(issue_ids), rng.choice(citizen_ids))
+                elif op == "create":
+                    service.create_issue(IssueCreate(
+                        reporter_id=rng.choice(citizen_ids), category=rng.choice(CATEGORIES),
+                        description="Overflowing garbage bins, urgent health hazard",
+                        lat=CENTER[0] + rng.uniform(-0.1, 0.1), lng=CENTER[1] + rng.uniform(-0.1, 0.1),
+                    ))
+                else:
+                    service.get_issues(sort="created_at", limit=20)
+                local_latencies[op].append(time.perf_counter() - started)
+            except OperationalError:
+                db.rollback()
+                local_errors[op] += 1
+            finally:
+                db.close()
+        with lock:
+            for op, values in local_latencies.items():
+                latencies[op].extend(values)
+            for op, count in local_errors.items():
+                errors[op] += count
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    return {"latencies": latencies, "errors": errors}
+
+
+def percentile(values, q):
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else (values[0] if values else 0.0)
+
+
+def report(mode: str, result: dict, seconds: float):
+    total = sum(len(v) for v in result["latencies"].values())
+    print(f"\n[{mode}] {total / seconds:8.1f} ops/s, {sum(result['errors'].values())} errors")
+    print(f"  {'op':<8}{'ops/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for op in ("upvote", "create", "list"):
+        values = result["latencies"].get(op, [])
+        print(f"  {op:<8}{len(values) / seconds:9.1f}{percentile(values, 50) * 1000:9.1f}"
+              f"{percentile(values, 95) * 1000:9.1f}{percentile(values, 99) * 1000:9.1f}"
+              f"{result['errors'].get(op, 0):8d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--issues", type=int, default=2000)
+    parser.add_argument("--upvote", type=int, default=50, help="relative weight of upvote toggles")
+    parser.add_argument("--create", type=int, default=10, help="relative weight of issue creates")
+    parser.add_argument("--list", type=int, default=40, help="relative weight of issue list reads")
+    parser.add_argument("--modes", default="default,tuned", help="comma separated: default,tuned")
+    args = parser.parse_args()
+
+    for mode in args.modes.split(","):
+        report(mode, run(mode, args), args.seconds)
+
+
+if __name__ == "__main__":
+    main()
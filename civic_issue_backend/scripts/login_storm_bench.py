@@ -0,0 +1,117 @@
+"""Event-loop latency under a login storm.
+
+Runs concurrent logins through AuthService on one event loop, next to a
+heartbeat task that wakes every 10 ms the way WebSocket and request handling
+would, once with bcrypt verified inline on the loop (the old behaviour) and
+once through the bounded hashing pool (core/password_hasher.py). Prints
+logins/s and how late the heartbeat ran (event-loop lag percentiles).
+
+    cd civic_issue_backend
+    python scripts/login_storm_bench.py --clients 32 --seconds 5 --rounds 12
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.realpath(os.path.join(os.path.dirname(__file__), "..")))
+
+HEARTBEAT_INTERVAL = 0.01
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def _heartbeat(lags, stop):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + HEARTBEAT_INTERVAL
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        lags.append((loop.time() - expected) * 1000.0)
+
+
+async def _storm(session_factory, users, clients, seconds, mode):
+    from app.services.auth_service import AuthService
+
+    stop = asyncio.Event()
+    lags, logins = [], 0
+
+    async def client(n):
+        nonlocal logins
+        while not stop.is_set():
+            phone = users[(n + logins) % len(users)]
+            db = session_factory()  # One session per request, as with get_db
+            try:
+                service = AuthService(db)
+                if mode == "inline":
+                    tokens = service.authenticate_user(phone, "password123")
+                else:
+                    tokens = await service.authenticate_user_async(phone, "password123")
+            finally:
+                db.close()
+            assert tokens, "login failed"
+            logins += 1
+            await asyncio.sleep(0)
+
+    heartbeat = asyncio.create_task(_heartbeat(lags, stop))
+    tasks = [asyncio.create_task(client(n)) for n in range(clients)]
+    started = time.perf_counter()
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks, heartbeat)
+    return logins / (time.perf_counter() - started), lags
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost")
+    parser.add_argument("--workers", type=int, default=None, help="hashing pool threads")
+    parser.add_argument("--modes", default="inline,pool", help="comma separated: inline,pool")
+    args = parser.parse_args()
+
+    # Settings are read at import time
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    if args.workers:
+        os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+    os.environ["PASSWORD_HASH_MAX_QUEUE"] = str(args.clients)
+    path = os.path.join(tempfile.mkdtemp(), "login_bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    from sqlalchemy.orm import sessionmaker
+    from app.core.db import Base, make_engine
+    from app.core.password_hasher import hasher, pwd_ctx
+    from app.models.user import User
+
+    engine = make_engine(os.environ["DATABASE_URL"])
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    db = session_factory()
+    password_hash = pwd_ctx.hash("password123")
+    users = [f"90000{n:05d}" for n in range(args.users)]
+    db.add_all(User(full_name=f"User {n}", phone_number=phone,
+                    password_hash=password_hash) for n, phone in enumerate(users))
+    db.commit()
+    db.close()
+
+    print(f"bcrypt rounds={args.rounds}, clients={args.clients}, pool workers={hasher.max_workers}")
+    for mode in args.modes.split(","):
+        rate, lags = asyncio.run(_storm(session_factory, users, args.clients, args.seconds, mode))
+        print(f"{mode:>6}: {rate:7.1f} logins/s | loop lag p50 {statistics.median(lags) if lags else 0:7.1f} ms"
+              f"  p99 {_percentile(lags, 99):7.1f} ms  max {max(lags, default=0):7.1f} ms  ({len(lags)} heartbeats)")
+    print("pool stats:", hasher.stats())
+    hasher.shutdown()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Rebuild the denormalized issue counters from the issues table.
+
+IssueService keeps issue_stats_rollups and users.open_issue_count up to date
+on every create, status change and delete. Rows written any other way (seed
+scripts, manual SQL such as deleting demo issues) bypass it, so run this
+afterwards to recompute the counters in one transaction:
+
+    cd civic_issue_backend
+    python scripts/rebuild_counters.py
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.realpath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.core.db import SessionLocal  # noqa: E402
+from app.services.analytics_service import AnalyticsService  # noqa: E402
+from app.services.assignment_service import AssignmentService  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=1000, help="issues fetched per round trip")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        buckets = AnalyticsService(db).rebuild_rollups(batch_size=args.batch_size)
+        AssignmentService(db).recount_open_issues()
+        db.commit()
+    finally:
+        db.close()
+    print(f"Rebuilt {buckets} issue_stats_rollups buckets and admin open-issue counts "
+          f"in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,7 @@ Usage:
 
 To remove demo data:
     DELETE FROM issues WHERE description LIKE '%[DEMO]%';
+    python scripts/rebuild_counters.py
 """
 
 import sys
@@ -22,6 +23,9 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from app.core.db import SessionLocal
 from app.models.user import User
 from app.models.issue import Issue
+from app.services.analytics_service import AnalyticsService
+from app.services.assignment_service import AssignmentService
+from app.services.issue_service import IssueService
 from datetime import datetime, timedelta
 import random
 import json
@@ -398,6 +402,13 @@ def seed_demo_issues():
         for issue in created_issues:
             db.refresh(issue)
         
+        # Issues above were inserted directly, not through IssueService
+        AnalyticsService(db).rebuild_rollups()
+        AssignmentService(db).recount_open_issues()
+        db.commit()
+        
+        IssueService(db).backfill_fingerprints()
+        
         print()
         print("=" * 60)
         print("✓ SUCCESS: Demo issues created!")
@@ -426,6 +437,7 @@ def seed_demo_issues():
         print("=" * 60)
         print("Run this SQL command:")
         print("  DELETE FROM issues WHERE description LIKE '%[DEMO]%';")
+        print("then: python scripts/rebuild_counters.py")
         print("=" * 60)
         
     except Exception as e:
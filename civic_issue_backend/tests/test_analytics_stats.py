@@ -0,0 +1,55 @@
+"""Dashboard KPIs through the /analytics/stats route."""
+import asyncio
+from datetime import datetime
+
+import httpx
+from fastapi import FastAPI
+
+from app.api import analytics
+from app.core.db import get_db
+from app.core.security import get_current_principal
+from app.models.issue import Issue
+from app.models.user import User
+from app.services.analytics_service import AnalyticsService
+
+
+def _get(session_factory, path, **params):
+    app = FastAPI()
+    app.include_router(analytics.router, prefix="/analytics")
+
+    def db_override():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = db_override
+    app.dependency_overrides[get_current_principal] = lambda: {"id": 1, "role": "admin", "department": None,
+                                                               "is_active": True}
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get(path, params=params)
+
+    return asyncio.run(run())
+
+
+def test_stats_accepts_timezone_aware_range(db, session_factory):
+    db.add(User(full_name="Citizen", phone_number="9000000001", password_hash="x"))
+    db.commit()
+    # Stored timestamps are naive UTC
+    for created_at in (datetime(2023, 12, 31, 23), datetime(2024, 1, 1, 5), datetime(2024, 1, 2, 3),
+                       datetime(2024, 1, 2, 8)):
+        db.add(Issue(reporter_id=1, category="Garbage Overflow", description="Seeded", lat=19.0, lng=72.8,
+                     created_at=created_at))
+    db.commit()
+    AnalyticsService(db).rebuild_rollups()
+    db.commit()
+
+    # 2024-01-02T12:00+05:30 is 06:30 UTC: a whole first day plus a partial second one
+    response = _get(session_factory, "/analytics/stats",
+                    start_date="2024-01-01T00:00:00Z", end_date="2024-01-02T12:00:00+05:30")
+
+    assert response.status_code == 200
+    assert response.json()["total_issues"] == 2
@@ -0,0 +1,72 @@
+"""Rebuilding denormalized counters must reproduce what IssueService maintains incrementally."""
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from app.models.issue import Issue, IssueStatsRollup
+from app.models.user import User
+from app.schemas.issue import IssueCreate
+from app.services.analytics_service import ROLLUP_FIELDS, AnalyticsService
+from app.services.assignment_service import AssignmentService
+from app.services.issue_service import IssueService
+
+
+def _rollups(db):
+    rows = db.execute(select(IssueStatsRollup).order_by(
+        IssueStatsRollup.department, IssueStatsRollup.day, IssueStatsRollup.category)).scalars()
+    return [(r.department, r.day, r.category, *(round(getattr(r, f), 3) for f in ROLLUP_FIELDS)) for r in rows]
+
+
+def _seed(db):
+    AssignmentService.invalidate_cache()
+    db.add_all([
+        User(full_name="Admin", phone_number="9000000001", password_hash="x", role="admin",
+             department="Municipal Waste Collection"),
+        User(full_name="Citizen", phone_number="9000000002", password_hash="x", role="citizen"),
+    ])
+    db.commit()
+    citizen_id = db.execute(select(User.id).where(User.role == "citizen")).scalar()
+    service = IssueService(db)
+    created = [
+        service.create_issue(IssueCreate(reporter_id=citizen_id, category=category,
+                                         description=f"Garbage dumped on the road {n}",
+                                         lat=19.0 + n, lng=72.8 + n))
+        for n, category in enumerate(["Garbage Overflow", "Open Garbage Dump", "Garbage Overflow"])
+    ]
+    service.update_status(created[0]["id"], "in_progress")
+    service.update_status(created[1]["id"], "resolved")
+    return citizen_id
+
+
+def test_rebuild_rollups_matches_incremental(db):
+    citizen_id = _seed(db)
+    incremental = _rollups(db)
+    assert incremental
+
+    # Direct inserts bypass the incremental path until the rebuild
+    seeded_at = datetime(2024, 1, 1)
+    db.add(Issue(reporter_id=citizen_id, category="Garbage Overflow", description="Seeded", status="resolved",
+                 lat=10.0, lng=70.0, created_at=seeded_at, resolved_at=seeded_at + timedelta(hours=2)))
+    db.commit()
+    assert _rollups(db) == incremental
+
+    AnalyticsService(db).rebuild_rollups()
+    db.commit()
+    rebuilt = _rollups(db)
+    assert [row for row in rebuilt if row[1] != seeded_at.date()] == incremental
+    assert ("", seeded_at.date(), "Garbage Overflow", 1, 0, 0, 1, 7200.0) in rebuilt
+
+
+def test_recount_open_issues_matches_incremental(db):
+    citizen_id = _seed(db)
+    admin = db.execute(select(User).where(User.role == "admin")).scalar_one()
+    incremental = admin.open_issue_count
+    assert incremental == 2  # one of the three assigned issues was resolved
+
+    db.add(Issue(reporter_id=citizen_id, category="Garbage Overflow", description="Seeded", status="new",
+                 lat=10.0, lng=70.0, assigned_admin_id=admin.id))
+    db.commit()
+    AssignmentService(db).recount_open_issues()
+    db.commit()
+    db.refresh(admin)
+    assert admin.open_issue_count == incremental + 1
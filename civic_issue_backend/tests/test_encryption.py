@@ -0,0 +1,62 @@
+"""Payload encryption: cached context, key IDs and rotation."""
+import base64
+import os
+
+import pytest
+
+from app.core import encryption
+
+
+@pytest.fixture(autouse=True)
+def restore_context():
+    yield
+    encryption.reload_crypto_context()
+
+
+def _packed(sealed):
+    return base64.b64encode(base64.b64decode(sealed["nonce"]) + base64.b64decode(sealed["ciphertext"])).decode()
+
+
+def test_old_ciphertexts_decrypt_during_rotation():
+    old_key = base64.b64encode(encryption.get_crypto_context().active_key).decode()
+    old = encryption.encrypt_payload({"secret": "old"})
+    assert old["kid"] == encryption.get_key_id()
+
+    new_key = base64.b64encode(os.urandom(32)).decode()
+    encryption.reload_crypto_context(active_key=new_key, previous_keys=[old_key])
+    new = encryption.encrypt_payload({"secret": "new"})
+    assert new["kid"] != old["kid"] and encryption.get_key_id() == new["kid"]
+
+    assert encryption.decrypt_payload(old["nonce"], old["ciphertext"]) == {"secret": "old"}
+    assert encryption.decrypt_payload(old["nonce"], old["ciphertext"], kid=old["kid"]) == {"secret": "old"}
+    assert encryption.decrypt_packed_many([_packed(new), None, _packed(old), "bm90LWEtY2lwaGVydGV4dA=="]) == [
+        {"secret": "new"}, None, {"secret": "old"}, None
+    ]
+    with pytest.raises(ValueError):
+        encryption.decrypt_payload(old["nonce"], old["ciphertext"], kid=new["kid"])
+
+    # Once the old key is retired for good its ciphertexts are rejected
+    encryption.reload_crypto_context(active_key=new_key, previous_keys=[])
+    with pytest.raises(ValueError):
+        encryption.decrypt_packed(_packed(old))
+
+
+def test_rotation_keeps_current_keys_by_default():
+    first = encryption.encrypt_payload({"secret": "first"})
+    encryption.reload_crypto_context(active_key=base64.b64encode(os.urandom(32)).decode())
+    second = encryption.encrypt_payload({"secret": "second"})
+    encryption.reload_crypto_context(active_key=base64.b64encode(os.urandom(32)).decode())
+
+    assert encryption.decrypt_payload(first["nonce"], first["ciphertext"], kid=first["kid"]) == {"secret": "first"}
+    assert encryption.decrypt_packed(_packed(second)) == {"secret": "second"}
+    assert len(encryption.get_crypto_context().key_ids) == 3
+
+
+@pytest.mark.parametrize("kid", [[1], {"a": 1}, 7, 1.5, True])
+def test_non_string_key_ids_are_unknown(kid):
+    sealed = encryption.encrypt_payload({"secret": "s"})
+    with pytest.raises(ValueError):
+        encryption.decrypt_payload(sealed["nonce"], sealed["ciphertext"], kid=kid)
+    with pytest.raises(ValueError):
+        encryption.decrypt_packed(_packed(sealed), kid=kid)
+    assert encryption.decrypt_packed_many([_packed(sealed)], kid=kid) == [None]
@@ -0,0 +1,95 @@
+"""Image data URLs: in-memory decoding and the 400/413 mapping on /ai routes."""
+import asyncio
+import base64
+import builtins
+import io
+import tempfile
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+np = pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+
+from app.api import ai as ai_api  # noqa: E402
+from app.services import ai_service  # noqa: E402
+from app.services.ai_service import ImageTooLarge, decode_image_data_url  # noqa: E402
+
+
+def _png_data_url(width=4, height=3, color=(255, 0, 0), mime="image/png"):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buffer, format="PNG")
+    return f"data:{mime};base64," + base64.b64encode(buffer.getvalue()).decode()
+
+
+def _no_disk(*args, **kwargs):
+    raise AssertionError("image decoding touched the filesystem")
+
+
+def test_valid_data_url_decodes_in_memory(monkeypatch):
+    data_url = _png_data_url()
+    monkeypatch.setattr(builtins, "open", _no_disk)
+    monkeypatch.setattr(tempfile, "NamedTemporaryFile", _no_disk)
+    monkeypatch.setattr(tempfile, "mkstemp", _no_disk)
+
+    image = decode_image_data_url(data_url)
+
+    assert image.shape == (3, 4, 3) and image.dtype == np.uint8
+    assert image[0, 0].tolist() == [0, 0, 255]  # BGR
+
+
+@pytest.mark.parametrize("data_url", [
+    "data:image/png;base64,!!!not-base64!!!",
+    "data:image/png;base64,",
+    _png_data_url(mime="text/plain"),
+    "data:image/png;base64," + base64.b64encode(b"GIF89a not a supported format").decode(),
+    "data:image/png;base64," + base64.b64encode(b"\x89PNG\r\n\x1a\ntruncated").decode(),
+    "image/png;base64,AAAA",
+])
+def test_invalid_data_urls_raise_value_error(data_url):
+    with pytest.raises(ValueError) as excinfo:
+        decode_image_data_url(data_url)
+    assert not isinstance(excinfo.value, ImageTooLarge)
+
+
+def test_oversized_payload_and_dimensions_raise_image_too_large(monkeypatch):
+    data_url = _png_data_url(width=64, height=64)
+    monkeypatch.setattr(ai_service, "MAX_IMAGE_BYTES", 16)
+    with pytest.raises(ImageTooLarge):
+        decode_image_data_url(data_url)
+
+    monkeypatch.setattr(ai_service, "MAX_IMAGE_BYTES", 10 * 1024 * 1024)
+    monkeypatch.setattr(ai_service, "MAX_IMAGE_PIXELS", 64 * 63)
+    with pytest.raises(ImageTooLarge):
+        decode_image_data_url(data_url)
+
+
+def _detect(monkeypatch, payload):
+    sources = []
+    monkeypatch.setattr(ai_api, "DEMO_MODE", False)
+    monkeypatch.setattr(ai_api.ai, "detect_issue_from_image", lambda source: sources.append(source) or [])
+    app = FastAPI()
+    app.include_router(ai_api.router, prefix="/ai")
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.post("/ai/detect", json=payload)
+
+    return asyncio.run(run()), sources
+
+
+def test_detect_route_maps_decode_errors(monkeypatch):
+    response, sources = _detect(monkeypatch, {"image_data_url": _png_data_url()})
+    assert response.status_code == 200
+    assert isinstance(sources[0], np.ndarray)
+
+    response, _ = _detect(monkeypatch, {"image_data_url": "data:image/png;base64,@@@"})
+    assert response.status_code == 400
+    response, _ = _detect(monkeypatch, {"image_data_url": _png_data_url(mime="application/pdf")})
+    assert response.status_code == 400
+
+    monkeypatch.setattr(ai_service, "MAX_IMAGE_BYTES", 16)
+    response, sources = _detect(monkeypatch, {"image_data_url": _png_data_url(width=64, height=64)})
+    assert response.status_code == 413
+    assert sources == []
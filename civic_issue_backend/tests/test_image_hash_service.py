@@ -0,0 +1,199 @@
+"""Image fingerprints: allowed sources, duplicate lookup and storage images at submit."""
+import base64
+import http.server
+import io
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core import geohash
+from app.core.config import settings
+from app.models.issue import ImageFingerprint, Issue
+from app.models.user import User
+from app.schemas.issue import IssueCreate
+from app.services.image_hash_service import ImageHashService
+from app.services.issue_service import IssueService
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _png():
+    buffer = io.BytesIO()
+    Image.new("RGB", (20, 20), (200, 10, 10)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_sources_outside_static_root_and_storage_hosts_are_not_read(tmp_path):
+    static = tmp_path / "static"
+    (static / "uploads").mkdir(parents=True)
+    (static / "uploads" / "a.png").write_bytes(_png())
+    (tmp_path / "secret.png").write_bytes(_png())
+    os.symlink(tmp_path / "secret.png", static / "uploads" / "link.png")
+    service = ImageHashService(static_root=str(static), allowed_hosts=["storage.example"])
+
+    assert service.compute_dhash("/static/uploads/a.png") is not None
+    assert service.compute_dhash("data:image/png;base64," + base64.b64encode(_png()).decode()) is not None
+    for source in ["/static/../secret.png", "/static/uploads/link.png", str(tmp_path / "secret.png"),
+                   f"file://{tmp_path / 'secret.png'}", "http://169.254.169.254/latest/meta-data/"]:
+        assert service.compute_dhash(source, allow_remote=True) is None, source
+
+
+# -----------------------
+# Duplicate lookup
+# -----------------------
+LAT, LNG = 19.0760, 72.8777
+
+
+def _noise_png(seed):
+    rng = random.Random(seed)
+    image = Image.new("L", (36, 32))
+    image.putdata([rng.randrange(256) for _ in range(36 * 32)])
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _data_url(png):
+    return "data:image/png;base64," + base64.b64encode(png).decode()
+
+
+def _issue(db, lat=LAT, lng=LNG, media_urls=(), created_at=None):
+    if db.query(User).count() == 0:
+        db.add(User(full_name="Citizen", phone_number="9000000001", password_hash="x"))
+        db.flush()
+    issue = Issue(reporter_id=1, category="Garbage Overflow", description="Garbage dumped", lat=lat, lng=lng,
+                  geohash=geohash.encode(lat, lng), media_urls=json.dumps(list(media_urls)),
+                  created_at=created_at or datetime.utcnow())
+    db.add(issue)
+    db.flush()
+    return issue
+
+
+def _fingerprint(db, value, lat=LAT, lng=LNG, created_at=None, media_url="/static/uploads/old.png"):
+    issue = _issue(db, lat, lng, created_at=created_at)
+    fingerprint = ImageFingerprint(issue_id=issue.id, media_url=media_url, geohash=issue.geohash,
+                                   created_at=created_at or datetime.utcnow())
+    IssueService._set_dhash(fingerprint, value)
+    db.add(fingerprint)
+    db.commit()
+    return issue.id
+
+
+def _duplicates(db, media_url, lat=LAT, lng=LNG):
+    found = IssueService(db).check_duplicate_issue(lat, lng, [media_url]) or []
+    return {d["issue_id"] for d in found}
+
+
+def _flip(value, *bits):
+    for bit in bits:
+        value ^= 1 << bit
+    return value
+
+
+def test_band_lookup_and_hamming_threshold(db):
+    new_image = _data_url(_noise_png(1))
+    value = ImageHashService().compute_dhash(new_image)
+    assert value is not None
+
+    # Distance 3 spread over three bands: the fourth band still matches exactly
+    near = _fingerprint(db, _flip(value, 0, 16, 32))
+    # Distance 4, one bit in every band: no band matches, so it is never a candidate
+    spread = _fingerprint(db, _flip(value, 0, 16, 32, 48))
+    # Distance 4 inside one band: three bands match, the Hamming check rejects it
+    clustered = _fingerprint(db, _flip(value, 0, 1, 2, 3))
+
+    found = _duplicates(db, new_image)
+    assert found == {near} and spread not in found and clustered not in found
+
+
+def test_geohash_prefilter_and_30_day_window(db):
+    new_image = _data_url(_noise_png(2))
+    value = ImageHashService().compute_dhash(new_image)
+
+    here = _fingerprint(db, value)
+    _fingerprint(db, value, lat=LAT + 0.02)  # ~2 km north, outside DUPLICATE_RADIUS_KM
+    _fingerprint(db, value, created_at=datetime.utcnow() - timedelta(days=31))
+
+    assert _duplicates(db, new_image) == {here}
+
+
+def test_exact_url_matches_without_a_hash(db):
+    issue_id = _fingerprint(db, 0, media_url="https://storage.example/a.jpg")
+    assert _duplicates(db, "https://storage.example/a.jpg") == {issue_id}
+
+
+def test_backfill_fingerprints_seeded_issues(db):
+    png = _noise_png(3)
+    seeded = _issue(db, media_urls=[_data_url(png)]).id
+    db.commit()
+    assert _duplicates(db, _data_url(png)) == set()
+
+    assert IssueService(db).backfill_fingerprints() == 1
+    assert IssueService(db).backfill_fingerprints() == 0  # rerun is a no-op
+    assert _duplicates(db, _data_url(png)) == {seeded}
+
+
+# -----------------------
+# Storage images at submit
+# -----------------------
+@pytest.fixture()
+def storage(monkeypatch):
+    """Local HTTP server standing in for S3/MinIO; paths starting /slow answer after 1s"""
+    images = {"/a.png": _noise_png(4), "/b.png": _noise_png(4), "/slow.png": _noise_png(5)}
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/slow"):
+                time.sleep(1)
+            body = images[self.path]
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(settings, "IMAGE_FETCH_ALLOWED_HOSTS", "127.0.0.1")
+    monkeypatch.setattr(settings, "IMAGE_FETCH_SUBMIT_TIMEOUT_SECONDS", 0.3)
+    monkeypatch.setattr(settings, "DEMO_MODE", False)  # demo mode skips duplicate checks
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def _create(db, media_url):
+    return IssueService(db).create_issue(IssueCreate(
+        reporter_id=1, category="Garbage Overflow", description="Garbage dumped near the market",
+        lat=LAT, lng=LNG, media_urls=[media_url]))
+
+
+def test_storage_images_are_hashed_at_submit(db, storage):
+    db.add(User(full_name="Citizen", phone_number="9000000001", password_hash="x"))
+    db.commit()
+
+    assert "id" in _create(db, f"{storage}/a.png")
+    # Same picture, different upload URL: caught by its dHash before the issue is stored
+    result = _create(db, f"{storage}/b.png")
+    assert result["success"] is False and result["duplicates"]
+
+
+def test_slow_storage_is_bounded_and_left_for_the_background(db, storage):
+    db.add(User(full_name="Citizen", phone_number="9000000001", password_hash="x"))
+    db.commit()
+
+    service = IssueService(db)
+    started = time.monotonic()
+    created = service.create_issue(IssueCreate(
+        reporter_id=1, category="Garbage Overflow", description="Garbage dumped near the market",
+        lat=LAT, lng=LNG, media_urls=[f"{storage}/slow.png"]))
+    assert time.monotonic() - started < 1
+    assert service.pending_remote_fingerprints
+
+    assert IssueService(db).fill_remote_fingerprints(created["id"]) == 1
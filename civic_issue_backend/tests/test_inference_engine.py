@@ -0,0 +1,91 @@
+"""Inference engine: batching and shutdown of queued requests."""
+import threading
+import time
+
+import pytest
+from app.services.inference_engine import InferenceEngine
+
+
+def _doubling(delay=0.0):
+    def predict_batch(sources):
+        time.sleep(delay)
+        return [source * 2 for source in sources]
+    return predict_batch
+
+
+def test_concurrent_requests_are_coalesced():
+    engine = InferenceEngine(_doubling(0.02), max_batch_size=8, max_wait_ms=50)
+    start = threading.Barrier(16)
+    results = {}
+
+    def call(n):
+        start.wait(timeout=5)
+        results[n] = engine.infer(n, timeout=5)
+
+    threads = [threading.Thread(target=call, args=(n,)) for n in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    engine.shutdown()
+
+    assert results == {n: n * 2 for n in range(16)}
+    stats = engine.stats()
+    assert stats["images"] == 16
+    assert stats["batches"] < 16
+    assert max(stats["batch_size_histogram"]) <= 8
+
+
+def test_max_wait_bounds_how_long_a_batch_collects():
+    engine = InferenceEngine(_doubling(), max_batch_size=8, max_wait_ms=300)
+    first = engine.submit(1)
+    time.sleep(0.05)
+    second = engine.submit(2)  # Arrives within the window and joins the first batch
+    assert (first.result(timeout=5), second.result(timeout=5)) == (2, 4)
+    assert engine.stats()["batch_size_histogram"] == {2: 1}
+
+    started = time.perf_counter()
+    assert engine.infer(3, timeout=5) == 6  # Alone: released once the window closes
+    assert 0.25 <= time.perf_counter() - started < 3
+    engine.shutdown()
+
+    eager = InferenceEngine(_doubling(), max_batch_size=8, max_wait_ms=0)
+    started = time.perf_counter()
+    assert eager.infer(1, timeout=5) == 2
+    assert time.perf_counter() - started < 0.25
+    eager.shutdown()
+
+
+def test_shutdown_fails_requests_still_queued():
+    entered, release = threading.Event(), threading.Event()
+
+    def predict_batch(sources):
+        entered.set()
+        release.wait(timeout=5)
+        return [source * 2 for source in sources]
+
+    engine = InferenceEngine(predict_batch, max_batch_size=1, max_wait_ms=0)
+    running = engine.submit(1)
+    assert entered.wait(timeout=5)
+    queued = [engine.submit(n) for n in range(2, 5)]
+
+    stopper = threading.Thread(target=engine.shutdown)
+    stopper.start()
+    # shutdown() closes the engine before joining the worker stuck in predict_batch
+    deadline = time.monotonic() + 5
+    while True:
+        try:
+            engine.submit(5)
+        except RuntimeError:
+            break
+        assert time.monotonic() < deadline, "engine never closed"
+        time.sleep(0.001)
+    release.set()
+    stopper.join(timeout=10)
+    assert not stopper.is_alive()
+
+    assert running.result(timeout=1) == 2
+    for future in queued:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=1)
+    assert engine.stats()["images"] == 1
@@ -0,0 +1,52 @@
+"""Full-text issue search: index kept in sync by the database, ranked prefix matches."""
+import pytest
+
+from app.models.issue import Issue
+from app.models.user import User
+from app.services.issue_service import IssueService
+
+
+def _issue(db, reporter_id, description, category="Roads", lat=19.07, lng=72.87):
+    issue = Issue(reporter_id=reporter_id, category=category, description=description, lat=lat, lng=lng)
+    db.add(issue)
+    db.commit()
+    return issue
+
+
+def _ids(db, **kwargs):
+    return [issue["id"] for issue in IssueService(db).get_issues(**kwargs)]
+
+
+# Migrated databases get the index from the migration, fresh ones from create_all
+@pytest.mark.parametrize("engine", ["migrated", "created"], indirect=True)
+def test_search_ranks_prefix_matches_and_follows_changes(db):
+    user = User(full_name="R", phone_number="1", password_hash="x")
+    db.add(user)
+    db.commit()
+    one = _issue(db, user.id, "Pothole on the main road")
+    many = _issue(db, user.id, "Potholes everywhere, pothole after pothole near the school")
+    light = _issue(db, user.id, "Street light broken", category="Electricity", lat=28.6, lng=77.2)
+
+    assert _ids(db, search="pothole") == [many.id, one.id]
+    assert _ids(db, search="main pot") == [one.id]  # last word as a prefix
+    assert _ids(db, search="pothole", bbox=(28.0, 77.0, 29.0, 78.0)) == []
+    assert _ids(db, search="light", category="Electricity") == [light.id]
+    # Searches without a single word match nothing instead of dropping the filter
+    for search in ("!!!", "-", '"*"'):
+        assert _ids(db, search=search) == []
+        assert _ids(db, search=search, sort="created_at") == []
+    assert len(_ids(db, search="   ")) == 3
+
+    service = IssueService(db)
+    assert [i["id"] for i in service.get_issues(search="pothole", limit=1)] == [many.id]
+    assert [i["id"] for i in service.get_issues(search="pothole", limit=1, cursor=service.next_cursor)] == [one.id]
+    assert service.next_cursor is None
+
+    # Upvotes and status changes leave the index alone; description edits and deletes do not
+    one.description = "Garbage pile on the main road"
+    light.upvote_count = 5
+    db.delete(many)
+    db.commit()
+    assert _ids(db, search="pothole") == []
+    assert _ids(db, search="garbage") == [one.id]
+    assert _ids(db, search="light") == [light.id]
@@ -0,0 +1,95 @@
+"""NLPService: the single-pass keyword engine and the shared analysis cache."""
+import random
+import re
+
+import pytest
+
+from app.services.nlp_service import (
+    HIGH_PRIORITY_KEYWORDS, LOW_PRIORITY_KEYWORDS, MEDIUM_PRIORITY_KEYWORDS, NLPService, _keyword_engine,
+)
+
+TIER_KEYWORDS = {"high": HIGH_PRIORITY_KEYWORDS, "medium": MEDIUM_PRIORITY_KEYWORDS, "low": LOW_PRIORITY_KEYWORDS}
+
+CORPUS = [
+    "URGENT!!! Toxic fumes from burning e-waste near the school, a serious public health hazard",
+    "Hazardous waste dumped; toxic, toxic and TOXIC. The hazard is a health-hazard risk",
+    "Garbage overflow, overflowing bins and foul smell... dirty water stagnant for 3 days",
+    "Minor litter, nice park, just a small cleanup suggestion (cosmetic)",
+    "Air pollution/smoke: pollution, polluted, contaminated -- biomedical waste & medical waste",
+    "now?now!now. fast-fast quickly; flood flooding floods",
+    "piled up rubbish, piled-up debris, scattered trash: issue/problem/concern",
+    "Nothing to see here",
+    "",
+]
+
+
+def _old_counts(text):
+    """The previous implementation: one \\bkeyword\\b findall per keyword"""
+    return {
+        tier: sum(len(re.findall(r"\b" + re.escape(kw) + r"\b", text)) for kw in keywords)
+        for tier, keywords in TIER_KEYWORDS.items()
+    }
+
+
+def _random_corpus(n=200, seed=7):
+    rng = random.Random(seed)
+    vocab = sorted({kw for kws in TIER_KEYWORDS.values() for kw in kws}) + ["the", "road", "bin", "-", "!!"]
+    separators = [" ", ", ", "-", "/", ".", "!", "  "]
+    texts = []
+    for _ in range(n):
+        words = [rng.choice(vocab) for _ in range(rng.randint(1, 12))]
+        text = words[0]
+        for word in words[1:]:
+            text += rng.choice(separators) + word
+        texts.append(text.upper() if rng.random() < 0.2 else text)
+    return texts
+
+
+def _assert_scan_matches(text):
+    counts, detected = _keyword_engine.scan(text)
+    assert counts == _old_counts(text), text
+    for tier, keywords in TIER_KEYWORDS.items():
+        assert detected[tier] == [kw for kw in dict.fromkeys(keywords)
+                                  if re.search(r"\b" + re.escape(kw) + r"\b", text)], text
+
+
+@pytest.mark.parametrize("text", CORPUS)
+def test_keyword_counts_match_per_keyword_search(text):
+    _assert_scan_matches(text.lower())
+
+
+def test_keyword_counts_match_on_random_keyword_soup():
+    for text in _random_corpus():
+        _assert_scan_matches(text.lower())
+
+
+@pytest.mark.parametrize("text", [t for t in CORPUS if t])
+def test_priority_and_severity_match_previous_scoring(text):
+    service = NLPService()
+    lowered = text.lower()
+    old = _old_counts(lowered)
+    severity = service._calculate_priority_score(old["high"], old["medium"], old["low"],
+                                                 service._analyze_sentiment(lowered),
+                                                 service._analyze_urgency(lowered))
+    priority = "high" if severity >= 0.7 else "medium" if severity >= 0.3 else "low"
+
+    assert service.get_severity_score(text) == severity
+    assert service.detect_priority(text) == priority
+
+
+def test_cache_hits_return_independent_copies():
+    service = NLPService()
+    text = "Toxic garbage overflow blocking the road"
+    first = service.analyze(text)
+    second = NLPService().analyze(text.upper())  # Same normalized text, served from the cache
+    assert first == second
+    assert first is not second
+    assert first["detected_keywords"] is not second["detected_keywords"]
+
+    first["priority"] = "low"
+    first["detected_keywords"]["high"].append("tampered")
+    first["detected_keywords"]["medium"] = []
+
+    third = service.analyze(text)
+    assert third == second
+    assert "tampered" not in third["detected_keywords"]["high"]
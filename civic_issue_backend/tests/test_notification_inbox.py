@@ -0,0 +1,95 @@
+"""Notification inbox: exact unread counters, keyset pages and archival."""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models.issue import Issue, Notification, NotificationArchive
+from app.models.user import User
+from app.services.inbox_service import InboxService
+from app.services.issue_service import IssueService
+from app.services.notification_service import queue_notifications
+
+
+@pytest.fixture()
+def users(db):
+    alice = User(full_name="Alice", phone_number="1", phone_number_hash="h1", password_hash="x")
+    bob = User(full_name="Bob", phone_number="2", phone_number_hash="h2", password_hash="x")
+    db.add_all([alice, bob])
+    db.flush()
+    issues = [Issue(reporter_id=alice.id, category="Roads", description="Pothole", lat=19.07, lng=72.87)
+              for _ in range(2)]
+    db.add_all(issues)
+    db.commit()
+    return alice.id, bob.id, [issue.id for issue in issues]
+
+
+def _queue(db, user_id, issue_id, count):
+    queue_notifications(db, [
+        {"user_id": user_id, "issue_id": issue_id, "type": "status_update", "message": f"update {n}"}
+        for n in range(count)
+    ])
+    db.commit()
+
+
+def _actual_unread(db, user_id):
+    return db.execute(
+        select(func.count()).where(Notification.user_id == user_id, Notification.read == False)  # noqa: E712
+    ).scalar()
+
+
+def test_unread_counter_stays_exact(db, users):
+    alice, bob, (issue_a, issue_b) = users
+    inbox = InboxService(db)
+    _queue(db, alice, issue_a, 3)
+    _queue(db, alice, issue_b, 2)
+    _queue(db, bob, issue_a, 4)
+
+    first = db.execute(select(Notification.id).where(Notification.user_id == alice)).scalars().first()
+    assert inbox.mark_read(alice, first) == 4
+    assert inbox.mark_read(alice, first) == 4  # already read: no double decrement
+    assert inbox.mark_read(bob, first) is None  # someone else's notification
+
+    IssueService(db).delete_issue(issue_a)
+    assert inbox.unread_count(alice) == _actual_unread(db, alice) == 2
+    assert inbox.unread_count(bob) == _actual_unread(db, bob) == 0
+
+    assert inbox.mark_all_read(alice) == 2
+    assert inbox.unread_count(alice) == 0
+
+
+def test_inbox_pages_with_cursor(db, users):
+    alice, _, (issue_a, _) = users
+    _queue(db, alice, issue_a, 7)
+    inbox = InboxService(db)
+
+    pages = [inbox.get_notifications(alice, limit=3)]
+    while inbox.next_cursor:
+        pages.append(inbox.get_notifications(alice, limit=3, cursor=inbox.next_cursor))
+
+    ids = [n["id"] for page in pages for n in page]
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert ids == sorted(ids, reverse=True) and len(set(ids)) == 7
+
+
+def test_archive_moves_only_old_read_notifications(db, users):
+    alice, _, (issue_a, _) = users
+    _queue(db, alice, issue_a, 5)
+    inbox = InboxService(db)
+    rows = db.query(Notification).order_by(Notification.id).all()
+    old = datetime.utcnow() - timedelta(days=40)
+    for row in rows[:4]:
+        row.created_at = old
+        row.dispatched_at = old
+    db.commit()
+    ids = [row.id for row in rows]
+    inbox.mark_read(alice, ids[0])
+    inbox.mark_read(alice, ids[1])
+    inbox.mark_read(alice, ids[4])  # read, but recent
+
+    assert inbox.archive_read(30, batch_size=1) == 2
+    remaining = [n.id for n in db.query(Notification).order_by(Notification.id)]
+    assert remaining == [ids[2], ids[3], ids[4]]
+    archived = db.query(NotificationArchive).order_by(NotificationArchive.id).all()
+    assert [a.id for a in archived] == ids[:2] and all(a.archived_at for a in archived)
+    assert inbox.unread_count(alice) == _actual_unread(db, alice) == 2
@@ -0,0 +1,94 @@
+"""Notification outbox: one commit per request, batched delivery with retry/backoff."""
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.issue import Issue, Notification
+from app.models.user import User
+from app.services.issue_service import IssueService
+from app.services.notification_service import NotificationDispatcher, queue_notifications
+
+
+def _seed(db: Session) -> Issue:
+    admin = User(full_name="Admin", phone_number="1", phone_number_hash="h1", password_hash="x", role="admin")
+    reporter = User(full_name="Reporter", phone_number="2", phone_number_hash="h2", password_hash="x")
+    db.add_all([admin, reporter])
+    db.flush()
+    issue = Issue(reporter_id=reporter.id, assigned_admin_id=admin.id, category="Roads",
+                  description="Pothole", lat=19.07, lng=72.87)
+    db.add(issue)
+    db.commit()
+    return issue
+
+
+class FakeManager:
+    def __init__(self):
+        self.sent = []
+
+    async def send_to_user(self, user_id, message):
+        self.sent.append((user_id, message["type"]))
+
+
+class FlakyPush:
+    """Push channel that is down for some users"""
+
+    def __init__(self, down=()):
+        self.down = set(down)
+        self.pushed = []
+
+    def send_push(self, user_id, message):
+        if user_id in self.down:
+            raise ConnectionError("push gateway unavailable")
+        self.pushed.append(user_id)
+        return True
+
+
+def test_status_change_commits_once_with_its_notification(session_factory):
+    db = session_factory()
+    issue = _seed(db)
+    commits = []
+    event.listen(db, "after_commit", lambda session: commits.append(1))
+
+    result = IssueService(db).update_issue_status_with_trust_score(issue.id, "resolved", issue.assigned_admin_id)
+
+    assert result["success"] and len(commits) == 1
+    notification = db.query(Notification).one()
+    assert notification.type == "resolved" and notification.dispatched_at is None
+    db.close()
+
+
+def test_dispatcher_delivers_batches_and_backs_off_failures(session_factory):
+    db = session_factory()
+    issue = _seed(db)
+    queue_notifications(db, [
+        {"user_id": user_id, "issue_id": issue.id, "type": "status_update", "message": f"update {n}"}
+        for n, user_id in enumerate([1, 2, 1, 2, 1])
+    ])
+    db.commit()
+
+    ws, push = FakeManager(), FlakyPush(down={2})
+    dispatcher = NotificationDispatcher(session_factory, batch_size=3, max_attempts=2, retry_base=60,
+                                        push_service=push, ws_manager=ws)
+
+    first, second, idle = (asyncio.run(dispatcher.dispatch_once()) for _ in range(3))
+
+    assert (first, second, idle) == (3, 2, 0)  # failed rows wait for their backoff
+    assert push.pushed == [1, 1, 1]
+    rows = {n.id: n for n in db.query(Notification).all()}
+    delivered = [n for n in rows.values() if n.dispatched_at is not None]
+    retrying = [n for n in rows.values() if n.dispatched_at is None]
+    assert [n.user_id for n in delivered] == [1, 1, 1]
+    assert [n.attempts for n in retrying] == [1, 1]
+    assert all((n.next_attempt_at - datetime.utcnow()).total_seconds() > 50 for n in retrying)
+
+    # Once due again, a second failure reaches max_attempts and the rows leave the outbox
+    for n in retrying:
+        n.next_attempt_at = datetime.utcnow()
+    db.commit()
+    assert asyncio.run(dispatcher.dispatch_once()) == 2
+    assert dispatcher.backlog()["pending"] == 0
+    stats = dispatcher.stats()
+    assert stats["dispatched"] == 3 and stats["retries"] == 2 and stats["gave_up"] == 2
+    db.close()
@@ -0,0 +1,113 @@
+import glob
+import os
+
+import pytest
+
+pytest.importorskip("onnxruntime")
+np = pytest.importorskip("numpy")
+
+from app.services.ai_service import OnnxBackend, UltralyticsBackend
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PT_PATH = os.getenv("YOLO_PARITY_PT_PATH", os.path.join(BACKEND_DIR, "app", "models", "yolo", "best.pt"))
+ONNX_PATH = os.getenv("YOLO_PARITY_ONNX_PATH", os.path.join(BACKEND_DIR, "app", "models", "yolo", "best.onnx"))
+CONFIDENT = 0.4
+TEST_IMAGES = sorted(glob.glob(os.path.join(BACKEND_DIR, "..", "Model_training", "test_images", "*.jpg")))
+
+# Raw head output for a 64x64 input, one column per anchor: (cx, cy, w, h, score per class)
+FIXED_PREDICTION = np.array([
+    [20, 20.5, 20, 40, 44],   # cx
+    [32, 32, 32, 32, 50],     # cy
+    [20, 20, 20, 20, 8],      # w
+    [10, 10, 10, 10, 8],      # h
+    [0.9, 0.8, 0.1, 0.05, 0.6],   # pothole
+    [0.1, 0.1, 0.7, 0.01, 0.2],   # garbage
+], dtype=np.float32)
+
+
+def _fixed_output_model(path):
+    """Write an ONNX graph that ignores its pixels and emits FIXED_PREDICTION per image"""
+    onnx = pytest.importorskip("onnx")
+    from onnx import TensorProto, helper, numpy_helper
+
+    nodes = [
+        helper.make_node("Shape", ["images"], ["input_shape"]),
+        helper.make_node("Slice", ["input_shape", "zero", "one"], ["batch"]),
+        helper.make_node("Concat", ["batch", "head_shape"], ["output_shape"], axis=0),
+        helper.make_node("Expand", ["prediction", "output_shape"], ["output0"]),
+    ]
+    initializers = [
+        numpy_helper.from_array(np.array([0], dtype=np.int64), "zero"),
+        numpy_helper.from_array(np.array([1], dtype=np.int64), "one"),
+        numpy_helper.from_array(np.array(FIXED_PREDICTION.shape, dtype=np.int64), "head_shape"),
+        numpy_helper.from_array(FIXED_PREDICTION[None], "prediction"),
+    ]
+    graph = helper.make_graph(
+        nodes, "fixed_head",
+        [helper.make_tensor_value_info("images", TensorProto.FLOAT, ["batch", 3, 64, 64])],
+        [helper.make_tensor_value_info("output0", TensorProto.FLOAT, None)],
+        initializers,
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    helper.set_model_props(model, {"names": "{0: 'pothole', 1: 'garbage'}", "imgsz": "[64, 64]"})
+    onnx.save(model, path)
+    return path
+
+
+def test_onnx_postprocessing_letterbox_nms_and_class_mapping(tmp_path):
+    backend = OnnxBackend(_fixed_output_model(str(tmp_path / "fixed.onnx")), conf=0.25, iou=0.5)
+    assert backend.imgsz == 64  # Read from the model metadata, not the constructor default
+
+    # 128x64 image: gain 0.5 and 16px of padding above and below the resized 64x32 picture
+    wide = np.zeros((64, 128, 3), dtype=np.uint8)
+    square = np.zeros((64, 64, 3), dtype=np.uint8)
+    wide_detections, square_detections = backend.predict([wide, square])
+
+    summary = [(d.label, round(d.confidence, 2), [round(v, 1) for v in d.bbox]) for d in wide_detections]
+    assert summary == [
+        ("pothole", 0.9, [20.0, 22.0, 60.0, 42.0]),      # anchor 1 overlaps it and is suppressed
+        ("garbage", 0.7, [20.0, 22.0, 60.0, 42.0]),      # same box, other class: kept
+        ("pothole", 0.6, [80.0, 60.0, 96.0, 64.0]),      # clipped to the image height
+    ]
+    # No padding and gain 1 for an image already at the input size; anchor 3 is below conf
+    assert [d.bbox for d in square_detections] == [[10.0, 27.0, 30.0, 37.0], [10.0, 27.0, 30.0, 37.0],
+                                                   [40.0, 46.0, 48.0, 54.0]]
+
+
+def _iou(a, b):
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union else 0.0
+
+
+def _assert_covered(image, detections, candidates):
+    """Every detection has a same-label candidate with an overlapping box and close score"""
+    for det in detections:
+        same_label = [d for d in candidates if d.label == det.label]
+        assert same_label, image
+        best = max(same_label, key=lambda d: _iou(d.bbox, det.bbox))
+        assert _iou(best.bbox, det.bbox) > 0.8, image
+        assert abs(best.confidence - det.confidence) < 0.05, image
+
+
+@pytest.mark.skipif(
+    not (os.path.exists(PT_PATH) and os.path.exists(ONNX_PATH) and TEST_IMAGES),
+    reason="best.pt / best.onnx weights or Model_training/test_images not available",
+)
+def test_onnx_backend_matches_torch_backend():
+    """Confident detections from the ONNX path match the ultralytics/torch path"""
+    pytest.importorskip("ultralytics")
+    torch_backend = UltralyticsBackend(PT_PATH, conf=0.25)
+    onnx_backend = OnnxBackend(ONNX_PATH, conf=0.25)
+
+    torch_results = torch_backend.predict(TEST_IMAGES)
+    onnx_results = onnx_backend.predict(TEST_IMAGES)
+
+    # torch letterboxes to a stride-aligned rectangle while the exported graph takes
+    # a fixed square input, so only detections clear of the threshold must agree
+    for image, expected, actual in zip(TEST_IMAGES, torch_results, onnx_results):
+        _assert_covered(image, [d for d in expected if d.confidence >= CONFIDENT], actual)
+        _assert_covered(image, [d for d in actual if d.confidence >= CONFIDENT], expected)
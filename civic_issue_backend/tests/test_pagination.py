@@ -0,0 +1,91 @@
+"""Keyset cursors: tampered or mismatched cursors are rejected with ValueError (400)."""
+import base64
+import json
+from datetime import datetime
+
+import pytest
+
+from app.core.pagination import encode_cursor
+from app.models.issue import Issue
+from app.models.user import User
+from app.services.issue_service import IssueService
+
+
+def _raw_cursor(*payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("sort, cursor", [
+    ("upvote_count", _raw_cursor("upvote_count", [1, 2], 5, "desc")),
+    ("upvote_count", _raw_cursor("upvote_count", "many", 5, "desc")),
+    ("upvote_count", _raw_cursor("upvote_count", 3, "5", "desc")),
+    ("created_at", _raw_cursor("created_at", {"a": 1}, 5, "desc")),
+    ("created_at", _raw_cursor("created_at", "2026-01-01", 5)),  # no direction
+    ("created_at", encode_cursor("created_at", datetime(2026, 1, 1), 5, descending=False)),
+])
+def test_bad_cursors_raise_value_error(db, sort, cursor):
+    with pytest.raises(ValueError):
+        IssueService(db).get_issues(sort=sort, cursor=cursor)
+
+
+def test_admin_sort_direction_is_part_of_the_cursor(db):
+    asc = encode_cursor("created_at", datetime(2026, 1, 1), 5, descending=False)
+    assert IssueService(db).get_admin_issues(1, sort_order="asc", cursor=asc) == []
+    with pytest.raises(ValueError):
+        IssueService(db).get_admin_issues(1, sort_order="desc", cursor=asc)
+
+
+@pytest.mark.parametrize("value", [5, [5], [5, "a"], [True, 1], {"d": 1}])
+def test_bad_radius_cursors_raise_value_error(db, value):
+    cursor = _raw_cursor("radius:distance", value, 1, "asc")
+    with pytest.raises(ValueError):
+        IssueService(db).get_issues(lat=19.0, lng=72.0, radius=5, cursor=cursor)
+
+
+@pytest.mark.parametrize("score, row_id", [({"s": 1}, 1), ("-1.5", 1), ([-1.5], 1), (-1.5, "1"), (-1.5, 1.5)])
+def test_bad_relevance_cursors_raise_value_error(db, score, row_id):
+    cursor = _raw_cursor("relevance", score, row_id, "asc")
+    with pytest.raises(ValueError):
+        IssueService(db).get_issues(search="pothole", cursor=cursor)
+
+
+def _pages(fetch):
+    service, ids, cursor = None, [], None
+    while True:
+        service, page = fetch(cursor)
+        ids.extend(item["id"] for item in page)
+        cursor = service.next_cursor
+        if cursor is None:
+            return ids
+
+
+def test_null_sort_values_page_through_boundary(db):
+    db.add(User(full_name="Admin", phone_number="9000000001", password_hash="x", role="admin"))
+    db.commit()
+    # Pages of 3 put the boundary between the counted rows and the NULL ones, then among the NULLs
+    upvotes = [2, None, 1, None, 5, None, None, 0]
+    updated = [datetime(2026, 1, n + 1) if n % 2 else None for n in range(len(upvotes))]
+    for n, (count, updated_at) in enumerate(zip(upvotes, updated)):
+        db.add(Issue(reporter_id=1, category="Pothole", description=f"Issue {n}", lat=19.0, lng=72.8,
+                     upvote_count=count, assigned_admin_id=1))
+    db.commit()
+    # Column defaults replace None on insert, so legacy NULLs are written afterwards
+    for issue, count, updated_at in zip(db.query(Issue).order_by(Issue.id), upvotes, updated):
+        db.query(Issue).filter(Issue.id == issue.id).update({"upvote_count": count, "updated_at": updated_at},
+                                                             synchronize_session=False)
+    db.commit()
+    ids = [issue.id for issue in db.query(Issue).order_by(Issue.id)]
+
+    def by_upvotes(cursor):
+        service = IssueService(db)
+        return service, service.get_issues(sort="upvote_count", limit=3, cursor=cursor)
+
+    null_ids = [i for i, count in zip(ids, upvotes) if count is None]
+    assert _pages(by_upvotes) == [ids[4], ids[0], ids[2], ids[7]] + sorted(null_ids, reverse=True)
+
+    def by_updated(cursor):
+        service = IssueService(db)
+        return service, service.get_admin_issues(1, sort_by="updated_at", sort_order="asc", limit=3, cursor=cursor)
+
+    never_updated = [i for i, value in zip(ids, updated) if value is None]
+    assert _pages(by_updated) == never_updated + [i for i, value in zip(ids, updated) if value is not None]
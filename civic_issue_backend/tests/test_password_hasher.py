@@ -0,0 +1,67 @@
+"""Password hashing pool: queue cap, metrics, rehash on login and the register race."""
+import asyncio
+import time
+
+import pytest
+from passlib.context import CryptContext
+from app.core.password_hasher import HasherBusy, PasswordHasher
+from app.models.user import User
+from app.services import auth_service
+from app.services.auth_service import AuthService
+
+
+class SlowContext:
+    def hash(self, secret):
+        time.sleep(0.05)
+        return f"hashed:{secret}"
+
+
+def test_queue_cap_rejects_excess_calls():
+    hasher = PasswordHasher(SlowContext(), max_workers=1, max_queue=2)
+
+    async def storm():
+        return await asyncio.gather(*(hasher.hash(str(n)) for n in range(5)), return_exceptions=True)
+
+    results = asyncio.run(storm())
+    hasher.shutdown()
+    assert results[:3] == ["hashed:0", "hashed:1", "hashed:2"]
+    assert all(isinstance(r, HasherBusy) for r in results[3:])
+    stats = hasher.stats()
+    assert stats["completed"] == 3 and stats["rejected"] == 2 and stats["max_pending"] == 3
+    assert stats["max_wait_ms"] >= 50  # the third call queued behind two others
+
+
+def test_login_rehashes_when_cost_changes(db, monkeypatch):
+    old = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4)
+    db.add(User(full_name="A", phone_number="9000000001",
+                password_hash=old.hash("secret")))
+    db.commit()
+
+    current = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=5)
+    hasher = PasswordHasher(current, max_workers=1)
+    monkeypatch.setattr(auth_service, "hasher", hasher)
+
+    service = AuthService(db)
+    assert asyncio.run(service.authenticate_user_async("9000000001", "wrong")) is None
+    assert asyncio.run(service.authenticate_user_async("9000000001", "secret"))["token_type"] == "bearer"
+
+    stored = db.query(User).one().password_hash
+    assert stored.startswith("$2b$05$") and current.verify("secret", stored)
+    assert hasher.stats()["rehashed"] == 1
+    hasher.shutdown()
+
+
+def test_concurrent_register_returns_the_winner(db, session_factory, monkeypatch):
+    class RacingHasher:
+        async def hash(self, secret):
+            # Another request registers the same number while bcrypt runs
+            with session_factory() as other:
+                other.add(User(full_name="Winner", phone_number="9000000002", password_hash="x"))
+                other.commit()
+            return "hashed"
+
+    monkeypatch.setattr(auth_service, "hasher", RacingHasher())
+    user = asyncio.run(AuthService(db).create_user_async("Loser", "9000000002", "secret"))
+
+    assert user["full_name"] == "Winner"
+    assert db.query(User).count() == 1
@@ -0,0 +1,47 @@
+"""Principal cache: role/department served from memory, evicted when they change."""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import security
+from app.core.security import PrincipalCache, get_current_principal
+from app.models.user import User
+
+
+def test_principal_is_loaded_once_and_evicted_on_role_change(db, monkeypatch):
+    user = User(full_name="A", phone_number="9000000001", password_hash="x", department="Water Department")
+    db.add(user)
+    db.commit()
+
+    loads = []
+    load_principal = security.load_principal
+
+    def load(user_id):
+        loads.append(user_id)
+        return load_principal(user_id)  # reads through the test SessionLocal
+
+    cache = PrincipalCache(ttl=60)
+    monkeypatch.setattr(security, "principal_cache", cache)
+    monkeypatch.setattr(security, "load_principal", load)
+
+    first = asyncio.run(get_current_principal({"id": user.id}))
+    second = asyncio.run(get_current_principal({"id": user.id}))
+    assert first == second == {"id": user.id, "role": "citizen", "department": "Water Department", "is_active": True}
+    assert loads == [user.id]
+
+    # A profile edit leaves the entry alone; a role change evicts it on commit
+    user.full_name = "B"
+    db.commit()
+    assert cache.get(user.id) is not None
+    user.role = "admin"
+    db.commit()
+    assert asyncio.run(get_current_principal({"id": user.id}))["role"] == "admin"
+    assert loads == [user.id, user.id]
+
+    # Deactivation evicts too, and the principal is refused from then on
+    user.is_active = False
+    db.commit()
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(get_current_principal({"id": user.id}))
+    assert excinfo.value.status_code == 403
@@ -0,0 +1,113 @@
+"""Query-plan regression tests: hot queries must be served by their indexes.
+
+The schema is built by running the Alembic migrations against an empty SQLite
+database, so these also catch a migration that forgets an index.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func
+
+from app.core.pagination import encode_cursor
+from app.models.issue import Issue, Notification, Upvote
+from app.services.auth_service import AuthService
+from app.services.inbox_service import InboxService
+from app.services.issue_service import IssueService
+
+
+def _plans(db, run):
+    """Execute run(db) and return the EXPLAIN QUERY PLAN text of each SELECT it issued"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        run(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    raw = db.connection().connection.driver_connection
+    return [
+        " | ".join(row[-1] for row in raw.execute("EXPLAIN QUERY PLAN " + statement, parameters))
+        for statement, parameters in statements
+    ]
+
+
+def _assert_uses(plans, index):
+    assert plans, "no SELECT was issued"
+    assert any(index in plan for plan in plans), plans
+
+
+def test_admin_issues_by_status_uses_admin_status_index(db):
+    plans = _plans(db, lambda s: s.query(Issue).filter(Issue.assigned_admin_id == 1, Issue.status == "new").all())
+    _assert_uses(plans, "ix_issues_admin_status")
+
+
+def test_department_issues_by_status_uses_department_status_index(db):
+    plans = _plans(db, lambda s: IssueService(s).get_department_issues("Water Department", status="new"))
+    _assert_uses(plans, "ix_issues_department_status_created_at")
+
+
+def test_department_issues_cursor_page_uses_index(db):
+    cursor = encode_cursor("created_at", datetime(2026, 1, 1), 100)
+    plans = _plans(db, lambda s: IssueService(s).get_department_issues("Water Department", cursor=cursor))
+    _assert_uses(plans, "ix_issues_department_created_at")
+
+
+def test_admin_issues_sorted_by_priority_uses_keyset_index(db):
+    plans = _plans(db, lambda s: IssueService(s).get_admin_issues(1, sort_by="priority"))
+    _assert_uses(plans, "ix_issues_admin_priority_id")
+
+
+def test_user_issues_use_reporter_index(db):
+    plans = _plans(db, lambda s: IssueService(s).get_user_issues(1))
+    _assert_uses(plans, "ix_issues_reporter_created_at")
+
+
+def test_recent_issue_window_uses_created_at_index(db):
+    since = datetime.utcnow() - timedelta(days=30)
+    plans = _plans(db, lambda s: s.query(Issue.id).filter(Issue.created_at >= since).all())
+    _assert_uses(plans, "ix_issues_created_at_id")
+
+
+def test_radius_query_uses_geohash_index(db):
+    plans = _plans(db, lambda s: IssueService(s).get_issues(lat=19.07, lng=72.87, radius=2))
+    _assert_uses(plans, "ix_issues_geohash_lat_lng")
+
+
+def test_unread_notifications_use_user_read_index(db):
+    plans = _plans(db, lambda s: s.query(func.count(Notification.id)).filter(
+        Notification.user_id == 1, Notification.read == False  # noqa: E712
+    ).scalar())
+    _assert_uses(plans, "ix_notifications_user_read_created_at")
+
+
+def test_inbox_page_uses_user_created_at_index(db):
+    cursor = encode_cursor("created_at", datetime(2026, 1, 1), 100)
+    plans = _plans(db, lambda s: InboxService(s).get_notifications(1, limit=20, cursor=cursor))
+    _assert_uses(plans, "ix_notifications_user_created_at_id")
+
+
+def test_outbox_claim_uses_partial_index(db):
+    plans = _plans(db, lambda s: s.query(Notification.id).filter(
+        Notification.dispatched_at.is_(None), Notification.next_attempt_at <= datetime(2026, 1, 1)
+    ).order_by(Notification.next_attempt_at, Notification.id).limit(100).all())
+    _assert_uses(plans, "ix_notifications_outbox")
+
+
+def test_upvote_lookup_uses_unique_index(db):
+    plans = _plans(db, lambda s: s.query(Upvote).filter(Upvote.issue_id == 1, Upvote.user_id == 1).first())
+    _assert_uses(plans, "uq_upvotes_issue_id_user_id")
+
+
+def test_login_lookup_uses_phone_digest_index(db):
+    plans = _plans(db, lambda s: AuthService(s)._find_user("9000000001"))
+    _assert_uses(plans, "ix_users_phone_number_hash")
+
+
+def test_issue_search_uses_fulltext_index(db):
+    plans = _plans(db, lambda s: IssueService(s).get_issues(search="pothole main"))
+    _assert_uses(plans, "VIRTUAL TABLE INDEX")
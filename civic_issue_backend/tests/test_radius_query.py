@@ -0,0 +1,104 @@
+"""Radius queries: SQL-side ordering and keyset pages, exact cut, antimeridian wrap."""
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api import issues
+from app.core import geohash
+from app.core.db import get_db
+from app.models.issue import Issue
+from app.models.user import User
+from app.services.issue_service import IssueService
+
+CENTER = (19.0, 72.8)
+
+
+def _seed(db, points):
+    db.add(User(full_name="Citizen", phone_number="9000000001", password_hash="x"))
+    db.commit()
+    start = datetime(2026, 1, 1)
+    for n, (lat, lng, upvotes) in enumerate(points):
+        db.add(Issue(reporter_id=1, category="Pothole", description=f"Issue {n}", lat=lat, lng=lng,
+                     upvote_count=upvotes, created_at=start + timedelta(hours=n % 4)))
+    db.commit()
+
+
+def _all_pages(db, sort, limit=3, **kwargs):
+    service = IssueService(db)
+    items, cursor = [], None
+    while True:
+        page = service.get_issues(sort=sort, limit=limit, cursor=cursor, **kwargs)
+        items.extend(page)
+        cursor = service.next_cursor
+        if cursor is None:
+            return items
+
+
+def test_radius_pages_match_exact_filter(db):
+    # A ring of points every ~0.9 km east, with a few inside the bbox corner but outside the circle
+    points = [(CENTER[0], CENTER[1] + n * 0.0085, n % 3) for n in range(12)]
+    points += [(CENTER[0] + 0.04, CENTER[1] + 0.04, 9), (CENTER[0] - 0.04, CENTER[1] - 0.04, 9)]
+    points.append((CENTER[0], CENTER[1] + 0.0085 * 3, None))
+    _seed(db, points)
+    radius = 5.0
+    service = IssueService(db)
+    expected = {
+        issue.id for issue in db.query(Issue).all()
+        if service._calculate_distance(CENTER[0], CENTER[1], issue.lat, issue.lng) <= radius
+    }
+    assert len(expected) == 7
+
+    by_distance = _all_pages(db, None, lat=CENTER[0], lng=CENTER[1], radius=radius)
+    assert {item["id"] for item in by_distance} == expected
+    distances = [item["distance_km"] for item in by_distance]
+    assert distances == sorted(distances) and max(distances) <= radius
+
+    by_upvotes = _all_pages(db, "upvote_count", lat=CENTER[0], lng=CENTER[1], radius=radius)
+    assert [item["id"] for item in by_upvotes] == sorted(
+        expected, key=lambda i: (-(db.get(Issue, i).upvote_count or 0), db.get(Issue, i).lng, i))
+
+    by_created = _all_pages(db, "created_at", lat=CENTER[0], lng=CENTER[1], radius=radius)
+    assert [item["id"] for item in by_created] == sorted(
+        expected, key=lambda i: (db.get(Issue, i).created_at, i), reverse=True)
+
+
+def test_radius_wraps_across_antimeridian(db):
+    _seed(db, [(10.0, 179.99, 0), (10.0, -179.99, 0), (10.0, -179.5, 0)])
+
+    east = IssueService(db).get_issues(lat=10.0, lng=179.995, radius=5)
+    west = IssueService(db).get_issues(lat=10.0, lng=-179.995, radius=5)
+
+    assert sorted(item["description"] for item in east) == ["Issue 0", "Issue 1"]
+    assert sorted(item["description"] for item in west) == ["Issue 0", "Issue 1"]
+    assert all(item["distance_km"] < 2 for item in east + west)
+
+
+def test_bounding_boxes_split_at_antimeridian():
+    assert len(geohash.bounding_boxes(10.0, 0.0, 5)) == 1
+    (_, west, _, east), (_, wrapped_west, _, wrapped_east) = geohash.bounding_boxes(10.0, 179.99, 5)
+    assert (east, wrapped_west) == (180.0, -180.0)
+    assert west < 179.99 and -180.0 < wrapped_east < -179.9
+
+
+@pytest.mark.parametrize("radius", ["-1", "0", "500"])
+def test_radius_out_of_range_is_rejected(session_factory, radius):
+    app = FastAPI()
+    app.include_router(issues.router, prefix="/issues")
+
+    def db_override():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = db_override
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get("/issues", params={"lat": 19.0, "lng": 72.8, "radius": radius})
+
+    assert asyncio.run(run()).status_code == 422
@@ -0,0 +1,112 @@
+"""Distributed rate limiter: shared limits (fakeredis), batched leases, user keys, local fallback."""
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from jose import jwt
+
+from app.core.config import settings
+from app.core.rate_limiter import RATE_LIMITS, RateLimiter, RateLimitMiddleware, parse_rate
+
+try:
+    import fakeredis
+except ImportError:  # pragma: no cover - installed from requirements-dev.txt
+    fakeredis = None
+
+NOW = 1_699_999_990.0  # 10s into a minute window
+
+
+@pytest.fixture()
+def server():
+    if fakeredis is None:
+        pytest.skip("fakeredis is not installed (pip install -r requirements-dev.txt)")
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture(params=["local", "redis"])
+def limiter(request):
+    """Per-process limits without Redis, and shared limits through fakeredis"""
+    if request.param == "local":
+        return RateLimiter()
+    return _worker(request.getfixturevalue("server"))
+
+
+def _worker(server, **kwargs):
+    return RateLimiter(fakeredis.FakeRedis(server=server), **kwargs)
+
+
+def test_workers_share_one_limit(server):
+    limit, _ = parse_rate(RATE_LIMITS["default"])
+    workers = [_worker(server) for _ in range(3)]
+
+    allowed = sum(
+        workers[i % 3].hit("default", "user:1", now=NOW)[0]
+        for i in range(limit * 2)
+    )
+
+    assert allowed == limit
+    assert workers[0].hit("default", "user:2", now=NOW)[0]
+
+
+def test_tokens_are_leased_in_batches(server):
+    limiter = _worker(server, lease_fraction=0.1)
+    limit, _ = parse_rate(RATE_LIMITS["default"])
+
+    for _ in range(limit):
+        assert limiter.hit("default", "user:1", now=NOW)[0]
+    assert not limiter.hit("default", "user:1", now=NOW)[0]
+
+    # 100 requests cost 10 Redis round-trips (plus one that found the limit used up)
+    assert limiter.stats()["leases"] == limit // limiter.lease_size(limit) + 1
+
+
+def test_window_rollover_resets_limit(server):
+    limiter = _worker(server)
+    limit, period = parse_rate(RATE_LIMITS["auth"])
+    for _ in range(limit):
+        limiter.hit("auth", "ip:1.2.3.4", now=NOW)
+
+    allowed, retry_after = limiter.hit("auth", "ip:1.2.3.4", now=NOW)
+    assert not allowed and retry_after == 50
+    assert limiter.hit("auth", "ip:1.2.3.4", now=NOW + period)[0]
+
+
+def test_falls_back_to_local_limits_without_redis():
+    class DownRedis:
+        def pipeline(self):
+            raise ConnectionError("redis down")
+
+    limiter = RateLimiter(DownRedis())
+    limit, _ = parse_rate(RATE_LIMITS["auth"])
+    allowed = sum(limiter.hit("auth", "ip:1.2.3.4", now=NOW)[0] for _ in range(limit + 5))
+
+    assert allowed == limit
+    assert limiter.stats()["redis_errors"] == 1
+
+
+def test_middleware_limits_per_user(limiter):
+    app = FastAPI()
+
+    @app.post("/auth/login")
+    def login():
+        return {"ok": True}
+
+    app.add_middleware(RateLimitMiddleware, rate_limiter=limiter)
+    limit, _ = parse_rate(RATE_LIMITS["auth"])
+
+    def bearer(user_id):
+        token = jwt.encode({"sub": str(user_id)}, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+        return {"Authorization": f"Bearer {token}"}
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            first = [await client.post("/auth/login", headers=bearer(1)) for _ in range(limit + 1)]
+            other = await client.post("/auth/login", headers=bearer(2))
+            return first, other
+
+    first, other = asyncio.run(run())
+    assert [r.status_code for r in first] == [200] * limit + [429]
+    assert first[-1].json()["error"] == "rate_limit_exceeded"
+    assert int(first[-1].headers["Retry-After"]) >= 1
+    assert other.status_code == 200
@@ -0,0 +1,21 @@
+"""Write-behind upvote buffer: deltas only count once their transaction commits."""
+from sqlalchemy import text
+
+from app.services.upvote_buffer import UpvoteCounterBuffer
+
+
+def test_deltas_reach_buffer_only_after_commit(db, session_factory):
+    buffer = UpvoteCounterBuffer(session_factory, flush_interval_ms=60_000)
+
+    db.execute(text("SELECT 1"))
+    assert buffer.add_on_commit(db, 7, 1) == 1
+    db.rollback()
+    assert buffer.pending(7) == 0
+
+    db.execute(text("SELECT 1"))
+    buffer.add_on_commit(db, 7, 1)
+    assert buffer.add_on_commit(db, 7, 1) == 2
+    assert buffer.pending(7) == 0
+    db.commit()
+    assert buffer.pending(7) == 2
+    buffer.shutdown()
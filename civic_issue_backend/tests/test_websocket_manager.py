@@ -0,0 +1,135 @@
+"""ConnectionManager fan-out: channel routing, slow consumers and cross-worker pub/sub."""
+import asyncio
+
+import pytest
+
+from app.core.websocket import ConnectionManager, InProcessBroker, RedisBroker, issue_channel
+
+
+class FakeWebSocket:
+    def __init__(self, block: bool = False):
+        self.sent = []
+        self.closed = None
+        self.block = block
+        self._release = asyncio.Event()
+
+    async def send_json(self, message):
+        if self.block:
+            await self._release.wait()
+        self.sent.append(message)
+
+    async def close(self, code=1000, reason=None):
+        self.closed = code
+
+
+async def _settle(condition=lambda: True, timeout=2.0):
+    """Let sender tasks run until condition() holds"""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        await asyncio.sleep(0.01)
+        if condition() or asyncio.get_running_loop().time() > deadline:
+            return
+
+
+def test_user_messages_reach_only_that_user():
+    async def run():
+        manager = ConnectionManager(broker=InProcessBroker())
+        alice, alice_phone, bob = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        await manager.connect(alice, 1)
+        await manager.connect(alice_phone, 1)
+        await manager.connect(bob, 2)
+
+        await manager.send_to_user(1, {"type": "new_message"})
+        await manager.broadcast({"type": "announcement"})
+        await _settle(lambda: len(bob.sent) == 1)
+        await manager.stop()
+        return alice, alice_phone, bob
+
+    alice, alice_phone, bob = asyncio.run(run())
+    assert alice.sent == alice_phone.sent == [{"type": "new_message"}, {"type": "announcement"}]
+    assert bob.sent == [{"type": "announcement"}]
+
+
+@pytest.mark.parametrize("policy", ["drop", "disconnect"])
+def test_slow_consumer_does_not_block_others(policy):
+    async def run():
+        manager = ConnectionManager(broker=InProcessBroker(), queue_size=2, slow_consumer_policy=policy)
+        slow, fast = FakeWebSocket(block=True), FakeWebSocket()
+        await manager.connect(slow, 1)
+        fast_connection = await manager.connect(fast, 2)
+
+        for i in range(10):
+            await manager.broadcast({"n": i})
+            await _settle(fast_connection.queue.empty)  # messages arrive over time; fast senders keep up
+        await _settle(lambda: len(fast.sent) == 10)
+        stats = manager.stats()
+        connected = slow in manager.connections
+        queued = list(manager.connections[slow].queue._queue) if connected else []
+        await manager.stop()
+        return slow, fast, stats, connected, queued
+
+    slow, fast, stats, connected, queued = asyncio.run(run())
+    assert [m["n"] for m in fast.sent] == list(range(10))
+    if policy == "drop":
+        assert connected and stats["dropped"] > 0
+        assert queued[-1] == {"n": 9}  # newest kept, oldest dropped
+    else:
+        assert not connected and slow.closed == 1013
+        assert stats["slow_disconnects"] == 1
+
+
+def test_issue_updates_reach_only_subscribers_coalesced():
+    async def run():
+        manager = ConnectionManager(broker=InProcessBroker(), coalesce_interval=0.05)
+        watcher, other_issue, dashboard = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        await manager.connect(watcher, broadcast=False)
+        manager.subscribe(watcher, issue_channel(1))
+        await manager.connect(other_issue, broadcast=False)
+        manager.subscribe(other_issue, issue_channel(2))
+        await manager.connect(dashboard, 5)
+
+        # A burst from request threads within one tick
+        def burst():
+            for count in range(1, 51):
+                manager.publish_issue_update(1, upvote_count=count)
+            manager.publish_issue_update(1, status="in_progress")
+
+        await asyncio.to_thread(burst)
+        await _settle(lambda: watcher.sent)
+        await asyncio.sleep(0.1)
+        stats = manager.stats()
+        await manager.stop()
+        return watcher, other_issue, dashboard, stats
+
+    watcher, other_issue, dashboard, stats = asyncio.run(run())
+    assert watcher.sent == [{
+        "type": "issue_update",
+        "issue_id": 1,
+        "upvote_count": 50,
+        "status": "in_progress",
+    }]
+    assert other_issue.sent == dashboard.sent == []
+    assert stats["issue_updates"] == 51 and stats["issue_messages"] == 1
+
+
+def test_messages_cross_workers_over_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+
+    async def run():
+        server = fakeredis.FakeServer()
+        worker_a = ConnectionManager(broker=RedisBroker(client=fakeredis.aioredis.FakeRedis(server=server)))
+        worker_b = ConnectionManager(broker=RedisBroker(client=fakeredis.aioredis.FakeRedis(server=server)))
+        await worker_a.start()
+        await worker_b.start()
+        socket = FakeWebSocket()
+        await worker_a.connect(socket, 7)
+
+        await worker_b.send_to_user(7, {"type": "new_message", "issue_id": 3})
+        await worker_b.send_to_user(8, {"type": "new_message", "issue_id": 4})
+        await _settle(lambda: socket.sent)
+        await worker_a.stop()
+        await worker_b.stop()
+        return socket
+
+    socket = asyncio.run(run())
+    assert socket.sent == [{"type": "new_message", "issue_id": 3}]